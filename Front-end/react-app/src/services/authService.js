@@ -231,6 +231,12 @@ export const authService = {
 
   // Logout user
   logout() {
+    // Revocar el token en el servidor (sin esperar la respuesta)
+    const token = sessionStorage.getItem('token') || localStorage.getItem('token')
+    if (token) {
+      api.post('/users/logout', null, { headers: { Authorization: `Bearer ${token}` } }).catch(() => {})
+    }
+    
     // Limpiar sessionStorage (sesión actual)
     sessionStorage.clear()
     
@@ -0,0 +1,122 @@
+"""
+Benchmark: Latencia de endpoints ajenos durante ráfagas de login
+
+Levanta una aplicación FastAPI en memoria con dos rutas: una que verifica
+una contraseña con bcrypt (como UserOperations.authenticate_user) y otra
+equivalente a /api/test. Mientras se disparan logins concurrentes, mide la
+latencia de /api/test en dos modos:
+
+- inline: bcrypt.checkpw dentro del handler (bloquea el event loop)
+- pool:   services.password_hasher (pool de hilos acotado)
+
+Ejecutar con: python -m bench.bcrypt_event_loop [--logins 40] [--probes 200] [--rounds 12]
+"""
+
+import asyncio
+import argparse
+import json
+import time
+
+import bcrypt
+import httpx
+from fastapi import FastAPI
+
+from services.password_hasher import PasswordHasher
+
+PASSWORD = "ContraseñaSegura123"
+
+# Intervalo entre peticiones a /api/test (segundos)
+PROBE_INTERVAL = 0.01
+
+def build_app(mode: str, hashed: str, hasher: PasswordHasher) -> FastAPI:
+    """
+    Construir la aplicación de prueba
+
+    Args:
+        mode: "inline" o "pool"
+        hashed: Hash bcrypt de PASSWORD
+        hasher: Servicio de hash usado en modo pool
+
+    Returns:
+        FastAPI: Aplicación con /login y /api/test
+    """
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            valid = bcrypt.checkpw(PASSWORD.encode("utf-8"), hashed.encode("utf-8"))
+        else:
+            valid = await hasher.verify_password(PASSWORD, hashed)
+        return {"valid": valid}
+
+    @app.get("/api/test")
+    async def test_api():
+        return {"message": "¡GastoSmart API funcionando!", "status": "success"}
+
+    return app
+
+def percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else 0.0
+
+async def run_mode(mode: str, logins: int, probes: int, rounds: int) -> dict:
+    """
+    Medir la latencia de /api/test mientras corren logins concurrentes
+
+    Args:
+        mode: "inline" o "pool"
+        logins: Logins concurrentes
+        probes: Peticiones a /api/test
+        rounds: Costo de bcrypt
+
+    Returns:
+        dict: Percentiles de latencia (ms) y métricas del pool
+    """
+    hasher = PasswordHasher(rounds=rounds)
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    app = build_app(mode, hashed, hasher)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+
+        async def probe():
+            # La latencia se mide desde el instante programado de cada petición,
+            # así un event loop bloqueado cuenta como espera (sin omisión coordinada)
+            first = time.perf_counter()
+            for i in range(probes):
+                scheduled = first + i * PROBE_INTERVAL
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/api/test")
+                latencies.append(time.perf_counter() - scheduled)
+
+        login_start = time.perf_counter()
+        await asyncio.gather(probe(), *[client.post("/login") for _ in range(logins)])
+        elapsed = time.perf_counter() - login_start
+
+    hasher.shutdown()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "probes": probes,
+        "bcrypt_rounds": rounds,
+        "elapsed_s": round(elapsed, 3),
+        "probe_p50_ms": round(percentile(latencies, 0.50), 2),
+        "probe_p99_ms": round(percentile(latencies, 0.99), 2),
+        "probe_max_ms": round(max(latencies) * 1000, 2),
+        "hasher": hasher.stats() if mode == "pool" else None
+    }
+
+async def main(logins: int, probes: int, rounds: int):
+    for mode in ("inline", "pool"):
+        print(json.dumps(await run_mode(mode, logins, probes, rounds)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia de /api/test durante ráfagas de login")
+    parser.add_argument("--logins", type=int, default=40, help="Logins concurrentes")
+    parser.add_argument("--probes", type=int, default=200, help="Peticiones a /api/test")
+    parser.add_argument("--rounds", type=int, default=12, help="Costo de bcrypt")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.probes, args.rounds))
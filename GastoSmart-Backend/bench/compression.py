@@ -0,0 +1,178 @@
+"""
+Benchmark: Compresión de respuestas por endpoint
+
+Para cuerpos con la forma de las respuestas más grandes de la API:
+
+- GET /api/transactions?limit=1000 (1000 transacciones)
+- GET /api/reports/comprehensive   (reporte completo de 12 meses)
+- GET /api/reports/user-reports    (10 reportes guardados)
+
+mide, por codificación y nivel, los bytes enviados, la relación de
+compresión y el tiempo de CPU por respuesta. Con --http también mide la
+latencia de la petición completa con y sin CompressionMiddleware.
+brotli y zstd solo aparecen si están instalados.
+
+Ejecutar con: python -m bench.compression [--repeat 20] [--http]
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from bench.json_serialization import transaction_docs
+from database.transaction_operations import TransactionOperations
+from middleware.compression import CompressionMiddleware, compressors
+from models.report import (
+    MonthlySummary, ExpenseCategoryReport, ExpenseCategoryData, DailyExpensesReport, DailyExpenseData,
+    IncomeTrendReport, IncomeTrendData, SavingsEvolutionReport, SavingsEvolutionData, FinancialReport, ReportType
+)
+from services.json_response import FastJSONResponse
+
+# Niveles a comparar por codificación (el primero es el valor por defecto del middleware)
+LEVELS = {"gzip": [6, 1, 9], "br": [4, 1, 11], "zstd": [3, 1, 19]}
+
+_CATEGORIES = ["Alimentación", "Transporte", "Vivienda", "Servicios", "Salud", "Entretenimiento", "Educación", "Otros"]
+
+def _monthly_summary(month: int) -> MonthlySummary:
+    return MonthlySummary(
+        month=f"2025-{month:02d}", year=2025, total_income=4500000 + month * 1000, total_expenses=3100000 + month * 733,
+        balance=1400000, available_balance=1400000, savings_percentage=31.1, transaction_count=86,
+        income_count=2, expense_count=84
+    )
+
+def _category_report() -> ExpenseCategoryReport:
+    return ExpenseCategoryReport(
+        period_start=date(2025, 1, 1), period_end=date(2025, 1, 31), total_expenses=3100000,
+        categories=[
+            ExpenseCategoryData(category=name, amount=380000 + i * 1234, percentage=12.5, transaction_count=10 + i)
+            for i, name in enumerate(_CATEGORIES)
+        ]
+    )
+
+def comprehensive_report() -> Dict:
+    week_start = date(2025, 1, 6)
+    return {
+        "monthly_summary": _monthly_summary(1).model_dump(),
+        "expense_categories": _category_report().model_dump(),
+        "daily_expenses": DailyExpensesReport(
+            week_start=week_start, week_end=week_start + timedelta(days=6),
+            daily_data=[
+                DailyExpenseData(day=day, expense_date=week_start + timedelta(days=i), amount=98000 + i * 321, transaction_count=3)
+                for i, day in enumerate(["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"])
+            ],
+            total_week_expenses=700000, average_daily_expense=100000
+        ).model_dump(),
+        "income_trend": IncomeTrendReport(
+            period_start=date(2024, 2, 1), period_end=date(2025, 1, 31),
+            monthly_data=[IncomeTrendData(month=f"M{i}", year=2024, amount=4500000 + i * 997, transaction_count=2) for i in range(12)],
+            total_income=54000000, average_monthly_income=4500000, growth_rate=1.2
+        ).model_dump(),
+        "savings_evolution": SavingsEvolutionReport(
+            period_start=date(2024, 2, 1), period_end=date(2025, 1, 31),
+            monthly_data=[
+                SavingsEvolutionData(month=f"M{i}", year=2024, savings_amount=1400000 * (i + 1), monthly_savings=1400000 + i * 13, savings_rate=31.1)
+                for i in range(12)
+            ],
+            total_savings=16800000, average_monthly_savings=1400000, savings_growth_rate=0.8
+        ).model_dump(),
+        "generated_at": datetime(2025, 1, 31, 12, 0, 0),
+    }
+
+def user_reports(count: int = 10) -> List[Dict]:
+    return [
+        FinancialReport(
+            user_id="665f1c2ab1e4a3d2c9f0a001", report_type=ReportType.MONTHLY_SUMMARY,
+            period_start=date(2025, month, 1), period_end=date(2025, month, 28),
+            monthly_summary=_monthly_summary(month), expense_category_report=_category_report()
+        ).model_dump()
+        for month in range(1, count + 1)
+    ]
+
+def payloads() -> Dict[str, bytes]:
+    """Cuerpos JSON tal como los envía la API (orjson)"""
+    transactions = [TransactionOperations._document_to_dict(doc) for doc in transaction_docs(1000)]
+    return {
+        "GET /api/transactions?limit=1000": FastJSONResponse(transactions).body,
+        "GET /api/reports/comprehensive": FastJSONResponse(comprehensive_report()).body,
+        "GET /api/reports/user-reports": FastJSONResponse(user_reports()).body,
+    }
+
+def _cpu_ms(compress, body: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        compress(body)
+        best = min(best, time.process_time() - start)
+    return round(best * 1000, 3)
+
+def bench_codecs(repeat: int) -> List[dict]:
+    """Bytes y CPU por respuesta para cada endpoint, codificación y nivel"""
+    available = list(compressors())
+    results = []
+    for endpoint, body in payloads().items():
+        results.append({"bench": "codec", "endpoint": endpoint, "encoding": "identity", "bytes": len(body)})
+        for encoding in available:
+            for level in LEVELS[encoding]:
+                compress = compressors(gzip_level=level, brotli_quality=level, zstd_level=level)[encoding]
+                compressed = compress(body)
+                cpu_ms = _cpu_ms(compress, body, repeat)
+                results.append({
+                    "bench": "codec",
+                    "endpoint": endpoint,
+                    "encoding": encoding,
+                    "level": level,
+                    "bytes": len(compressed),
+                    "ratio": round(len(body) / len(compressed), 2),
+                    "cpu_ms": cpu_ms,
+                    "mb_per_s": round(len(body) / 1e6 / (cpu_ms / 1000), 1) if cpu_ms else None,
+                })
+    return results
+
+async def bench_http(repeat: int) -> List[dict]:
+    """Latencia de la petición completa con y sin el middleware (mejor de repeat)"""
+    bodies = payloads()
+    app = FastAPI()
+
+    @app.get("/{index}")
+    async def endpoint(index: int):
+        return FastJSONResponse(json.loads(list(bodies.values())[index]))
+
+    results = []
+    for mode, asgi_app in (("identity", app), ("compressed", CompressionMiddleware(app))):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+            for index, endpoint_name in enumerate(bodies):
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = await client.get(f"/{index}", headers={"Accept-Encoding": "zstd, br, gzip"})
+                    best = min(best, time.perf_counter() - start)
+                results.append({
+                    "bench": "http",
+                    "endpoint": endpoint_name,
+                    "mode": mode,
+                    "content_encoding": response.headers.get("content-encoding", "identity"),
+                    "wire_bytes": int(response.headers["content-length"]),
+                    "ms": round(best * 1000, 2),
+                })
+    return results
+
+async def main(repeat: int, http: bool):
+    for result in bench_codecs(repeat):
+        print(json.dumps(result, ensure_ascii=False))
+    if http:
+        for result in await bench_http(repeat):
+            print(json.dumps(result, ensure_ascii=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes y CPU de la compresión de respuestas por endpoint")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones (se toma la mejor)")
+    parser.add_argument("--http", action="store_true", help="Medir también la petición completa con y sin middleware")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.repeat, args.http))
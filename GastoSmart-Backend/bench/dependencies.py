@@ -0,0 +1,134 @@
+"""
+Benchmark: Costo de resolver las dependencias de operaciones por petición
+
+Compara dos formas de entregar las operaciones a las rutas:
+
+- per-request: como antes, una dependencia síncrona (se ejecuta en el
+  threadpool) construye TransactionOperations, GoalOperations,
+  CachedReportOperations, UserOperations (con su EmailService) y
+  UserSettingsOperations en cada petición
+- app:         services.app_services.get_services devuelve las instancias
+  creadas una sola vez (en lifespan)
+
+Mide el tiempo de construcción aislado y la latencia de una ruta mínima
+con cada dependencia, sin tocar la base de datos (el cliente no conecta).
+
+Ejecutar con: python -m bench.dependencies [--requests 5000] [--concurrency 50]
+"""
+
+import asyncio
+import argparse
+import json
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database.transaction_operations import TransactionOperations
+from database.goal_operations import GoalOperations
+from database.user_operations import UserOperations
+from database.user_settings_operations import UserSettingsOperations
+from services.app_services import AppServices, get_services
+from services.email_service import EmailService
+from services.report_cache import CachedReportOperations
+
+MODES = ("per-request", "app")
+
+def build_operations(db) -> dict:
+    """Construir las operaciones como lo hacían las dependencias de cada router"""
+    return {
+        "transactions": TransactionOperations(db.transactions, db.monthly_rollups, db.data_versions),
+        "goals": GoalOperations(db.goals, db.transactions, db.monthly_rollups, db.data_versions),
+        "reports": CachedReportOperations(db),
+        "users": UserOperations(db, EmailService(db)),
+        "user_settings": UserSettingsOperations(db),
+    }
+
+def bench_construction(db, repeat: int) -> dict:
+    """Microsegundos para construir todas las operaciones una vez"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build_operations(db)
+    elapsed = time.perf_counter() - start
+    return {"bench": "construction", "repeat": repeat, "us_per_build": round(elapsed / repeat * 1e6, 1)}
+
+def build_app(mode: str, db) -> FastAPI:
+    """
+    Construir la aplicación de prueba
+
+    Args:
+        mode: Uno de MODES
+        db: Base de datos (sin conexión)
+
+    Returns:
+        FastAPI: Aplicación con /api/goals/{goal_id}
+    """
+    app = FastAPI()
+
+    if mode == "per-request":
+        def get_operations() -> dict:
+            return build_operations(db)
+    else:
+        app.state.services = AppServices(db)
+
+        async def get_operations(services: AppServices = Depends(get_services)) -> AppServices:
+            return services
+
+    @app.get("/api/goals/{goal_id}")
+    async def get_goal(goal_id: str, operations = Depends(get_operations)):
+        return {"id": goal_id}
+
+    return app
+
+async def run_mode(mode: str, db, requests: int, concurrency: int) -> dict:
+    """
+    Medir throughput y latencia media de la ruta en un modo
+
+    Args:
+        mode: Uno de MODES
+        db: Base de datos (sin conexión)
+        requests: Peticiones totales
+        concurrency: Peticiones simultáneas
+
+    Returns:
+        dict: Peticiones por segundo y microsegundos por petición
+    """
+    app = build_app(mode, db)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(f"/api/goals/{i:024x}")
+
+        async def worker():
+            while not queue.empty():
+                await client.get(queue.get_nowait())
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "bench": "http",
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "requests_per_s": round(requests / elapsed, 1),
+        "us_per_request": round(elapsed / requests * 1e6, 1),
+    }
+
+async def main(requests: int, concurrency: int):
+    client = AsyncIOMotorClient("mongodb://localhost:27017", connect=False)
+    db = client.gastosmart_bench
+    print(json.dumps(bench_construction(db, 2000)))
+    for mode in MODES:
+        print(json.dumps(await run_mode(mode, db, requests, concurrency)))
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costo de las dependencias de operaciones por petición")
+    parser.add_argument("--requests", type=int, default=5000, help="Peticiones totales")
+    parser.add_argument("--concurrency", type=int, default=50, help="Peticiones simultáneas")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,147 @@
+"""
+Benchmark: Conversión y serialización de listados de transacciones y metas
+
+Compara, para 1k y 10k documentos:
+
+- convert: _document_to_response (modelo Pydantic) frente a _document_to_dict
+- http:    la respuesta completa de una ruta FastAPI con
+    - model:        modelos + response_model (validación y serialización de FastAPI)
+    - model-orjson: modelos + response_model con default_response_class orjson
+    - fast:         diccionarios devueltos en FastJSONResponse (sin validación)
+
+Ejecutar con: python -m bench.json_serialization [--sizes 1000 10000] [--repeat 5]
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from database.transaction_operations import TransactionOperations
+from database.goal_operations import GoalOperations
+from models.transaction import TransactionResponse
+from models.goal import GoalResponse
+from services.json_response import FastJSONResponse
+
+def transaction_docs(count: int) -> List[dict]:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    return [{
+        "_id": ObjectId(),
+        "user_id": "665f1c2ab1e4a3d2c9f0a001",
+        "type": "expense" if i % 5 else "income",
+        "amount": 35000 + i,
+        "category": "Alimentación",
+        "description": "Mercado",
+        "date": now - timedelta(hours=i),
+        "created_at": now - timedelta(hours=i),
+        "updated_at": None,
+        "currency": "COP",
+    } for i in range(count)]
+
+def goal_docs(count: int) -> List[dict]:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    return [{
+        "_id": ObjectId(),
+        "user_id": "665f1c2ab1e4a3d2c9f0a001",
+        "name": f"Meta {i}",
+        "description": None,
+        "category": "Viajes",
+        "target_amount": 5000000,
+        "current_amount": 1250000,
+        "target_date": "2026-06-30",
+        "created_at": now,
+        "updated_at": None,
+        "status": "active",
+        "progress_percentage": 25.0,
+        "currency": "COP",
+        "is_public": False,
+        "is_main": i == 0,
+    } for i in range(count)]
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+def bench_convert(size: int, repeat: int) -> List[dict]:
+    """Milisegundos para convertir size documentos (mejor de repeat)"""
+    results = []
+    for name, ops, docs in (
+        ("TransactionOperations", TransactionOperations(None), transaction_docs(size)),
+        ("GoalOperations", GoalOperations(None), goal_docs(size)),
+    ):
+        results.append({
+            "bench": "convert",
+            "operations": name,
+            "rows": size,
+            "document_to_response_ms": _best(lambda: [ops._document_to_response(d) for d in docs], repeat),
+            "document_to_dict_ms": _best(lambda: [ops._document_to_dict(d) for d in docs], repeat),
+        })
+    return results
+
+def build_app(docs: List[dict], goals: List[dict], orjson_default: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse) if orjson_default else FastAPI()
+    transactions = TransactionOperations(None)
+    goal_ops = GoalOperations(None)
+
+    @app.get("/model/transactions", response_model=List[TransactionResponse])
+    async def model_transactions():
+        return [transactions._document_to_response(d) for d in docs]
+
+    @app.get("/fast/transactions", response_model=List[TransactionResponse])
+    async def fast_transactions():
+        return FastJSONResponse([transactions._document_to_dict(d) for d in docs])
+
+    @app.get("/model/goals", response_model=List[GoalResponse])
+    async def model_goals():
+        return [goal_ops._document_to_response(d) for d in goals]
+
+    @app.get("/fast/goals", response_model=List[GoalResponse])
+    async def fast_goals():
+        return FastJSONResponse([goal_ops._document_to_dict(d) for d in goals])
+
+    return app
+
+async def bench_http(size: int, repeat: int) -> List[dict]:
+    """Milisegundos por petición completa (mejor de repeat)"""
+    docs, goals = transaction_docs(size), goal_docs(size)
+    results = []
+    for mode, orjson_default, prefix in (("model", False, "model"), ("model-orjson", True, "model"), ("fast", False, "fast")):
+        app = build_app(docs, goals, orjson_default)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for resource in ("transactions", "goals"):
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = await client.get(f"/{prefix}/{resource}")
+                    best = min(best, time.perf_counter() - start)
+                assert response.status_code == 200 and len(response.json()) == size
+                results.append({
+                    "bench": "http", "mode": mode, "resource": resource, "rows": size,
+                    "ms": round(best * 1000, 2), "bytes": len(response.content)
+                })
+    return results
+
+async def main(sizes: List[int], repeat: int):
+    for size in sizes:
+        for result in bench_convert(size, repeat):
+            print(json.dumps(result))
+        for result in await bench_http(size, repeat):
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversión y serialización de listados")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Número de documentos")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones (se toma la mejor)")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.repeat))
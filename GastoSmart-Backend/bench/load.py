@@ -0,0 +1,239 @@
+"""
+Prueba de carga HTTP de extremo a extremo
+
+Cada usuario virtual inicia sesión con una cuenta creada por bench.seed y
+repite una mezcla ponderada de operaciones: listado, búsqueda y estadísticas
+de transacciones, todos los reportes GET de /api/reports, metas y abonos.
+Al final imprime en JSON el throughput total y, por ruta, el número de
+peticiones, errores y percentiles p50/p95/p99.
+
+Con --output se guarda el resultado y con --compare se muestra la variación
+frente a una ejecución anterior (p. ej. del commit previo).
+
+Ejecutar con: python -m bench.load [--base-url http://127.0.0.1:8000] [--users 50] [--duration 30]
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.seed import BENCH_PASSWORD, bench_email
+
+# (nombre, peso, método, ruta, parámetros); las rutas usan la plantilla como nombre
+def _scenarios(today: date) -> List[tuple]:
+    week_start = today - timedelta(days=today.weekday())
+    return [
+        ("GET /api/transactions/", 20, "GET", "/api/transactions/", {"limit": 50}),
+        ("GET /api/transactions/search/query", 8, "GET", "/api/transactions/search/query", {"query": "Mercado"}),
+        ("GET /api/transactions/stats/summary", 6, "GET", "/api/transactions/stats/summary", None),
+        ("GET /api/reports/monthly-summary/{year}/{month}", 5, "GET", f"/api/reports/monthly-summary/{today.year}/{today.month}", None),
+        ("GET /api/reports/expense-categories", 5, "GET", "/api/reports/expense-categories", None),
+        ("GET /api/reports/daily-expenses", 5, "GET", "/api/reports/daily-expenses", {"week_start": week_start.isoformat()}),
+        ("GET /api/reports/income-trend", 4, "GET", "/api/reports/income-trend", {"months": 8}),
+        ("GET /api/reports/savings-evolution", 4, "GET", "/api/reports/savings-evolution", {"months": 8}),
+        ("GET /api/reports/comprehensive", 6, "GET", "/api/reports/comprehensive", None),
+        ("GET /api/reports/user-reports", 2, "GET", "/api/reports/user-reports", None),
+        ("GET /api/reports/stats", 2, "GET", "/api/reports/stats", None),
+        ("GET /api/reports/categories", 2, "GET", "/api/reports/categories", None),
+        ("GET /api/reports/months-available", 2, "GET", "/api/reports/months-available", None),
+        ("GET /api/goals/", 6, "GET", "/api/goals/", None),
+        ("POST /api/goals/{goal_id}/contribute", 4, "POST", None, None),
+        ("POST /api/users/login", 1, "POST", "/api/users/login", None),
+    ]
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else 0.0
+
+class LoadStats:
+    """Latencias y errores acumulados por ruta"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, seconds: float, status_code: Optional[int]) -> None:
+        self.latencies.setdefault(route, []).append(seconds)
+        status_key = str(status_code) if status_code is not None else "error"
+        statuses = self.statuses.setdefault(route, {})
+        statuses[status_key] = statuses.get(status_key, 0) + 1
+        if status_code is None or status_code >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors.get(route, 0),
+                "statuses": self.statuses.get(route, {}),
+                "rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 0.50), 2),
+                "p95_ms": round(percentile(samples, 0.95), 2),
+                "p99_ms": round(percentile(samples, 0.99), 2),
+                "max_ms": round(max(samples) * 1000, 2),
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        all_samples = [s for samples in self.latencies.values() for s in samples]
+        return {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(all_samples, 0.50), 2),
+            "p95_ms": round(percentile(all_samples, 0.95), 2),
+            "p99_ms": round(percentile(all_samples, 0.99), 2),
+            "routes": routes,
+        }
+
+async def _timed(client: httpx.AsyncClient, stats: LoadStats, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        stats.record(route, time.perf_counter() - start, None)
+        return None
+    stats.record(route, time.perf_counter() - start, response.status_code)
+    return response
+
+async def _login(client: httpx.AsyncClient, stats: LoadStats, email: str) -> Optional[Dict]:
+    response = await _timed(
+        client, stats, "POST /api/users/login", "POST", "/api/users/login",
+        json={"email": email, "password": BENCH_PASSWORD}
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()
+
+async def virtual_user(client: httpx.AsyncClient, stats: LoadStats, index: int, deadline: float, rng: random.Random) -> None:
+    """
+    Ejecutar la mezcla de operaciones con una cuenta sintética hasta el límite de tiempo
+
+    Args:
+        client: Cliente HTTP compartido
+        stats: Acumulador de resultados
+        index: Número del usuario sintético
+        deadline: Instante (perf_counter) en que se detiene
+        rng: Generador aleatorio de este usuario
+    """
+    email = bench_email(index)
+    session = await _login(client, stats, email)
+    if session is None:
+        return
+    headers = {"Authorization": f"Bearer {session['access_token']}"}
+    # Las rutas de metas identifican al usuario por parámetro de consulta
+    user_params = {"user_id": session["user"]["id"]}
+
+    goals = await _timed(client, stats, "GET /api/goals/", "GET", "/api/goals/", params=user_params, headers=headers)
+    goal_ids = [g["id"] for g in goals.json() if g.get("status") == "active"] if goals is not None and goals.status_code == 200 else []
+
+    scenarios = _scenarios(date.today())
+    weights = [s[1] for s in scenarios]
+    while time.perf_counter() < deadline:
+        route, _, method, url, params = rng.choices(scenarios, weights)[0]
+        if route == "POST /api/users/login":
+            session = await _login(client, stats, email) or session
+            headers = {"Authorization": f"Bearer {session['access_token']}"}
+        elif route == "POST /api/goals/{goal_id}/contribute":
+            if not goal_ids:
+                continue
+            await _timed(
+                client, stats, route, "POST", f"/api/goals/{rng.choice(goal_ids)}/contribute",
+                params=user_params, json={"amount": 1000, "description": "Abono de prueba de carga"}, headers=headers
+            )
+        elif url.startswith("/api/goals/"):
+            await _timed(client, stats, route, method, url, params={**(params or {}), **user_params}, headers=headers)
+        else:
+            await _timed(client, stats, route, method, url, params=params, headers=headers)
+
+def compare(current: Dict, baseline: Dict) -> Dict:
+    """
+    Variación porcentual de throughput y percentiles frente a una ejecución anterior
+
+    Args:
+        current: Resultado de esta ejecución
+        baseline: Resultado guardado con --output
+
+    Returns:
+        dict: Cambios por ruta (valores positivos en latencia indican regresión)
+    """
+    def delta(new, old):
+        return round((new - old) / old * 100, 1) if old else None
+
+    changes = {
+        "throughput_rps_pct": delta(current["throughput_rps"], baseline["throughput_rps"]),
+        "p99_ms_pct": delta(current["p99_ms"], baseline["p99_ms"]),
+        "routes": {},
+    }
+    for route, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if before:
+            changes["routes"][route] = {
+                "rps_pct": delta(now["rps"], before["rps"]),
+                "p50_ms_pct": delta(now["p50_ms"], before["p50_ms"]),
+                "p95_ms_pct": delta(now["p95_ms"], before["p95_ms"]),
+                "p99_ms_pct": delta(now["p99_ms"], before["p99_ms"]),
+            }
+    return changes
+
+async def run(base_url: str, users: int, duration: float, first_user: int, seed: int) -> Dict:
+    """
+    Lanzar los usuarios virtuales y medir
+
+    Args:
+        base_url: URL del servidor
+        users: Usuarios virtuales simultáneos
+        duration: Segundos de carga
+        first_user: Índice de la primera cuenta sintética
+        seed: Semilla aleatoria
+
+    Returns:
+        dict: Configuración y resumen de resultados
+    """
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[
+            virtual_user(client, stats, first_user + i, deadline, random.Random(seed + i))
+            for i in range(users)
+        ])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "base_url": base_url,
+        "users": users,
+        "duration_s": duration,
+        **stats.summary(elapsed),
+    }
+
+async def main(args):
+    result = await run(args.base_url, args.users, args.duration, args.first_user, args.seed)
+    if args.compare:
+        with open(args.compare) as f:
+            result["compare"] = compare(result, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP con percentiles por ruta")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="URL del servidor")
+    parser.add_argument("--users", type=int, default=50, help="Usuarios virtuales simultáneos")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--first-user", type=int, default=0, help="Índice de la primera cuenta sintética")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    parser.add_argument("--output", help="Guardar el resultado JSON en este archivo")
+    parser.add_argument("--compare", help="Resultado JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
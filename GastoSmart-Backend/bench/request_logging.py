@@ -0,0 +1,128 @@
+"""
+Benchmark: Costo del middleware de registro de peticiones
+
+Levanta una aplicación FastAPI en memoria con una ruta equivalente a
+/api/test y una con parámetro de ruta, y mide el throughput con:
+
+- none:      sin middleware de registro
+- print:     el antiguo @app.middleware("http") con seis print por petición
+- asgi:      middleware.RequestLoggingMiddleware (QueueHandler + QueueListener)
+- asgi-slow: RequestLoggingMiddleware registrando solo peticiones lentas
+
+La salida de los modos con registro se escribe en un archivo temporal para
+que la terminal no distorsione la comparación.
+
+Ejecutar con: python -m bench.request_logging [--requests 5000] [--concurrency 50]
+"""
+
+import asyncio
+import argparse
+import contextlib
+import json
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from middleware.request_logging import (
+    RequestLoggingMiddleware, start_request_log_listener, stop_request_log_listener
+)
+
+MODES = ("none", "print", "asgi", "asgi-slow")
+
+def build_app(mode: str) -> FastAPI:
+    """
+    Construir la aplicación de prueba
+
+    Args:
+        mode: Uno de MODES
+
+    Returns:
+        FastAPI: Aplicación con /api/test y /api/goals/{goal_id}
+    """
+    app = FastAPI()
+
+    if mode == "print":
+        @app.middleware("http")
+        async def log_requests(request: Request, call_next):
+            start_time = time.time()
+            print(f"\n{'='*80}")
+            print(f"[REQUEST] {request.method} {request.url.path}")
+            print(f"[HEADERS] Authorization: {'Present' if 'authorization' in request.headers else 'Missing'}")
+            print(f"[HEADERS] Origin: {request.headers.get('origin', 'N/A')}")
+
+            response = await call_next(request)
+
+            process_time = time.time() - start_time
+            print(f"[RESPONSE] Status: {response.status_code} | Time: {process_time:.2f}s")
+            print(f"{'='*80}\n")
+
+            return response
+    elif mode == "asgi":
+        app.add_middleware(RequestLoggingMiddleware, sample_rate=1.0, slow_only=False)
+    elif mode == "asgi-slow":
+        app.add_middleware(RequestLoggingMiddleware, slow_only=True)
+
+    @app.get("/api/test")
+    async def test_api():
+        return {"message": "¡GastoSmart API funcionando!", "status": "success"}
+
+    @app.get("/api/goals/{goal_id}")
+    async def get_goal(goal_id: str):
+        return {"id": goal_id}
+
+    return app
+
+async def run_mode(mode: str, requests: int, concurrency: int) -> dict:
+    """
+    Medir el throughput de la aplicación en un modo
+
+    Args:
+        mode: Uno de MODES
+        requests: Peticiones totales
+        concurrency: Peticiones simultáneas
+
+    Returns:
+        dict: Peticiones por segundo y bytes de registro escritos
+    """
+    app = build_app(mode)
+    transport = httpx.ASGITransport(app=app)
+
+    with tempfile.TemporaryFile("w+") as sink, contextlib.redirect_stdout(sink):
+        start_request_log_listener(stream=sink)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            queue = asyncio.Queue()
+            for i in range(requests):
+                queue.put_nowait("/api/test" if i % 2 else f"/api/goals/{i:024x}")
+
+            async def worker():
+                while not queue.empty():
+                    await client.get(queue.get_nowait())
+
+            start = time.perf_counter()
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+            elapsed = time.perf_counter() - start
+        stop_request_log_listener()
+        log_bytes = sink.tell()
+
+    return {
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 1),
+        "log_bytes": log_bytes
+    }
+
+async def main(requests: int, concurrency: int):
+    for mode in MODES:
+        print(json.dumps(await run_mode(mode, requests, concurrency)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput con y sin middleware de registro")
+    parser.add_argument("--requests", type=int, default=5000, help="Peticiones totales")
+    parser.add_argument("--concurrency", type=int, default=50, help="Peticiones simultáneas")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency))
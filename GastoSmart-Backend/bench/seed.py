@@ -0,0 +1,318 @@
+"""
+Generador de datos sintéticos para pruebas de carga
+
+Crea N usuarios activos con transacciones, metas y abonos distribuidos de
+forma realista (salario mensual, gastos frecuentes de bajo monto con cola
+larga, actividad desigual entre usuarios) mediante inserciones masivas en un
+mongod local. Escala desde miles hasta millones de transacciones.
+
+Todos los usuarios comparten la contraseña BENCH_PASSWORD y el correo
+bench-user-<n>@bench.gastosmart.co, que es lo que usa bench.load para iniciar
+sesión. Al terminar se regeneran los acumulados mensuales y se crean los
+índices.
+
+Por seguridad la base por defecto es gastosmart_bench en localhost; el
+servidor debe arrancarse contra la misma base:
+
+    MONGODB_URL=mongodb://localhost:27017 DATABASE_NAME=gastosmart_bench uvicorn main:app
+
+Ejecutar con: python -m bench.seed [--users 1000] [--transactions 150] [--drop]
+"""
+
+import os
+import math
+import time
+import json
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import bcrypt
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from database.indexes import ensure_indexes
+from database.rollup_operations import RollupOperations
+from models.goal import GoalCategory
+
+BENCH_MONGODB_URL = os.getenv("BENCH_MONGODB_URL", "mongodb://localhost:27017")
+BENCH_DATABASE_NAME = os.getenv("BENCH_DATABASE_NAME", "gastosmart_bench")
+BENCH_PASSWORD = "BenchPassword123!"
+BENCH_EMAIL_DOMAIN = "bench.gastosmart.co"
+
+# Peso relativo y monto mediano (COP) de cada categoría de gasto
+EXPENSE_PROFILE = {
+    "Alimentación": (30, 35000),
+    "Transporte": (20, 12000),
+    "Vivienda": (2, 1200000),
+    "Servicios públicos": (4, 150000),
+    "Salud": (4, 80000),
+    "Educación": (2, 400000),
+    "Entretenimiento": (12, 60000),
+    "Ropa": (6, 120000),
+    "Ahorros": (2, 200000),
+    "Otros": (8, 45000),
+}
+INCOME_EXTRA_CATEGORIES = ["Freelance", "Ventas", "Bonificaciones", "Inversiones"]
+DESCRIPTIONS = {
+    "Alimentación": ["Mercado", "Almuerzo", "Restaurante", "Panadería", "Domicilio"],
+    "Transporte": ["Taxi", "Bus", "Gasolina", "Parqueadero", "Peaje"],
+    "Vivienda": ["Arriendo", "Administración"],
+    "Servicios públicos": ["Luz", "Agua", "Gas", "Internet", "Celular"],
+    "Salud": ["Farmacia", "Consulta médica", "EPS"],
+    "Educación": ["Curso en línea", "Libros", "Matrícula"],
+    "Entretenimiento": ["Cine", "Streaming", "Concierto", "Videojuegos"],
+    "Ropa": ["Zapatos", "Camisa", "Chaqueta"],
+    "Ahorros": ["CDT", "Fondo de inversión"],
+    "Otros": ["Regalo", "Mascota", "Ferretería"],
+}
+
+def bench_email(index: int) -> str:
+    """Correo del usuario sintético número index"""
+    return f"bench-user-{index}@{BENCH_EMAIL_DOMAIN}"
+
+def _lognormal_amount(rng: random.Random, median: float, sigma: float = 0.6) -> float:
+    """Monto con distribución log-normal redondeado a centenas de peso"""
+    return max(100.0, round(median * math.exp(rng.gauss(0, sigma)), -2))
+
+def _random_datetime(rng: random.Random, start: datetime, end: datetime) -> datetime:
+    return start + timedelta(seconds=rng.uniform(0, (end - start).total_seconds()))
+
+def generate_user(index: int, password_hash: str, rng: random.Random, now: datetime, months: int) -> Dict:
+    """Documento de un usuario activo con presupuesto configurado"""
+    salary = _lognormal_amount(rng, 2800000, 0.5)
+    return {
+        "first_name": f"Bench{index}",
+        "last_name": "Usuario",
+        "email": bench_email(index),
+        "password": password_hash,
+        "initial_budget": round(salary * 0.8, -3),
+        "budget_period": "mensual",
+        "budget_configured": True,
+        "registration_date": now - timedelta(days=30 * months),
+        "is_active": True,
+        "email_verified": True,
+        "last_access": None,
+        "currency": "COP",
+        "timezone": "America/Bogota",
+        "_salary": salary,
+    }
+
+def generate_transactions(
+    user_id: str, salary: float, count: int, rng: random.Random, now: datetime, months: int
+) -> Iterator[Dict]:
+    """
+    Transacciones de un usuario: un salario por mes, ingresos extra ocasionales
+    y gastos repartidos por categoría
+    """
+    start = now - timedelta(days=30 * months)
+    categories = list(EXPENSE_PROFILE)
+    weights = [EXPENSE_PROFILE[c][0] for c in categories]
+
+    for month in range(months):
+        pay_day = start + timedelta(days=30 * month + rng.randint(0, 4), hours=rng.randint(6, 10))
+        yield _transaction(user_id, "income", round(salary, -3), "Salario", "Pago de nómina", pay_day)
+        if rng.random() < 0.25:
+            category = rng.choice(INCOME_EXTRA_CATEGORIES)
+            yield _transaction(
+                user_id, "income", _lognormal_amount(rng, salary * 0.2), category, category,
+                _random_datetime(rng, start + timedelta(days=30 * month), start + timedelta(days=30 * (month + 1)))
+            )
+
+    for _ in range(max(0, count - months)):
+        category = rng.choices(categories, weights)[0]
+        yield _transaction(
+            user_id, "expense", _lognormal_amount(rng, EXPENSE_PROFILE[category][1]), category,
+            rng.choice(DESCRIPTIONS[category]), _random_datetime(rng, start, now)
+        )
+
+def _transaction(user_id: str, kind: str, amount: float, category: str, description: str, when: datetime) -> Dict:
+    return {
+        "user_id": user_id,
+        "type": kind,
+        "amount": amount,
+        "category": category,
+        "description": description,
+        "date": when,
+        "currency": "COP",
+        "created_at": when,
+        "updated_at": None,
+    }
+
+def generate_goals(
+    user_id: str, salary: float, goals: int, contributions: int, rng: random.Random, now: datetime, months: int
+) -> Iterator[Dict]:
+    """
+    Metas de un usuario (la primera es la principal) con sus abonos
+
+    Yields:
+        dict: Meta con los abonos (monto, fecha) pendientes en "_contributions"
+    """
+    start = now - timedelta(days=30 * months)
+    for g in range(goals):
+        category = rng.choice(list(GoalCategory)).value
+        target = round(_lognormal_amount(rng, salary * 3, 0.8), -4)
+        created = _random_datetime(rng, start, now - timedelta(days=7))
+        goal = {
+            "user_id": user_id,
+            "name": f"{category} {g + 1}",
+            "description": None,
+            "category": category,
+            "target_amount": target,
+            "current_amount": 0.0,
+            "target_date": (now + timedelta(days=rng.randint(60, 720))).date().isoformat(),
+            "currency": "COP",
+            "is_public": False,
+            "is_main": g == 0,
+            "status": "active",
+            "created_at": created,
+            "updated_at": None,
+        }
+
+        contribution_docs = []
+        for _ in range(rng.randint(0, contributions * 2)):
+            amount = round(_lognormal_amount(rng, target / max(contributions * 2, 1), 0.5), -3)
+            if goal["current_amount"] + amount > target:
+                break
+            goal["current_amount"] += amount
+            contribution_docs.append((amount, _random_datetime(rng, created, now)))
+
+        goal["progress_percentage"] = min(100.0, goal["current_amount"] / target * 100) if target else 0.0
+        if goal["current_amount"] >= target:
+            goal["status"] = "completed"
+        goal["_contributions"] = contribution_docs
+        yield goal
+
+async def _insert_batches(db: AsyncIOMotorDatabase, collection: str, docs: List[Dict], batch_size: int, slots: asyncio.Semaphore):
+    """Insertar documentos en lotes no ordenados con concurrencia acotada"""
+    async def insert(batch):
+        async with slots:
+            await db[collection].insert_many(batch, ordered=False)
+
+    await asyncio.gather(*[insert(docs[i:i + batch_size]) for i in range(0, len(docs), batch_size)])
+
+async def drop_bench_data(db: AsyncIOMotorDatabase) -> None:
+    """Eliminar los usuarios sintéticos y todos sus datos"""
+    users = await db.users.find({"email": {"$regex": f"@{BENCH_EMAIL_DOMAIN}$"}}, {"_id": 1}).to_list(None)
+    user_ids = [str(u["_id"]) for u in users]
+    for start in range(0, len(user_ids), 10000):
+        chunk = user_ids[start:start + 10000]
+        for collection in ("transactions", "goals", "monthly_rollups", "data_versions"):
+            field = "_id" if collection == "data_versions" else "user_id"
+            await db[collection].delete_many({field: {"$in": chunk}})
+    await db.users.delete_many({"email": {"$regex": f"@{BENCH_EMAIL_DOMAIN}$"}})
+
+async def seed(
+    db: AsyncIOMotorDatabase, users: int, transactions: int, goals: int, contributions: int,
+    months: int, batch_size: int, concurrency: int, seed_value: int
+) -> Dict:
+    """
+    Generar e insertar los datos sintéticos
+
+    Args:
+        db: Base de datos destino
+        users: Número de usuarios
+        transactions: Transacciones promedio por usuario (la distribución tiene cola larga)
+        goals: Metas máximas por usuario
+        contributions: Abonos promedio por meta
+        months: Meses de historia
+        batch_size: Documentos por insert_many
+        concurrency: Lotes simultáneos
+        seed_value: Semilla del generador aleatorio
+
+    Returns:
+        dict: Documentos insertados por colección y tiempo empleado
+    """
+    rng = random.Random(seed_value)
+    now = datetime.now().replace(microsecond=0)
+    slots = asyncio.Semaphore(concurrency)
+    # Un solo hash para todos: bcrypt por usuario haría el seeding de millones inviable
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    counts = {"users": 0, "transactions": 0, "goals": 0, "goal_contributions": 0}
+    started = time.perf_counter()
+
+    # Procesar por bloques de usuarios para acotar la memoria
+    users_per_block = max(1, batch_size // max(1, transactions))
+    for block_start in range(0, users, users_per_block):
+        block = range(block_start, min(users, block_start + users_per_block))
+        user_docs = [generate_user(i, password_hash, rng, now, months) for i in block]
+        salaries = [doc.pop("_salary") for doc in user_docs]
+        result = await db.users.insert_many(user_docs, ordered=False)
+        counts["users"] += len(user_docs)
+
+        transaction_docs = []
+        goal_docs = []
+        for user_id, salary in zip(result.inserted_ids, salaries):
+            # Actividad desigual: pocos usuarios concentran muchas transacciones
+            count = max(months, int(rng.paretovariate(2.0) * transactions / 2))
+            transaction_docs.extend(generate_transactions(str(user_id), salary, count, rng, now, months))
+            goal_docs.extend(generate_goals(str(user_id), salary, rng.randint(1, max(1, goals)), contributions, rng, now, months))
+
+        pending_contributions = [goal.pop("_contributions") for goal in goal_docs]
+        if goal_docs:
+            goal_result = await db.goals.insert_many(goal_docs, ordered=False)
+            counts["goals"] += len(goal_docs)
+            for goal, goal_id, contribution_list in zip(goal_docs, goal_result.inserted_ids, pending_contributions):
+                for amount, when in contribution_list:
+                    transaction_docs.append({
+                        "user_id": goal["user_id"],
+                        "type": "goal_contribution",
+                        "amount": amount,
+                        "category": goal["category"],
+                        "description": f"Abono a meta: {goal['name']}",
+                        "date": when,
+                        "created_at": when,
+                        "currency": "COP",
+                        "goal_id": str(goal_id),
+                        "goal_name": goal["name"],
+                    })
+                    counts["goal_contributions"] += 1
+
+        await _insert_batches(db, "transactions", transaction_docs, batch_size, slots)
+        counts["transactions"] += len(transaction_docs)
+        print(f"  {counts['users']}/{users} usuarios, {counts['transactions']} transacciones", flush=True)
+
+    insert_seconds = time.perf_counter() - started
+    await RollupOperations(db.monthly_rollups).rebuild(db.transactions)
+    await ensure_indexes(db)
+
+    return {
+        **counts,
+        "insert_s": round(insert_seconds, 2),
+        "total_s": round(time.perf_counter() - started, 2),
+        "transactions_per_s": round(counts["transactions"] / insert_seconds, 1) if insert_seconds else None,
+    }
+
+async def main(args):
+    client = AsyncIOMotorClient(args.mongodb_url)
+    db = client[args.database]
+    try:
+        if args.drop:
+            print("Eliminando datos sintéticos anteriores...")
+            await drop_bench_data(db)
+        print(f"Generando {args.users} usuarios en {args.database}...")
+        result = await seed(
+            db, args.users, args.transactions, args.goals, args.contributions,
+            args.months, args.batch_size, args.concurrency, args.seed
+        )
+        print(json.dumps(result))
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos para pruebas de carga")
+    parser.add_argument("--users", type=int, default=1000, help="Número de usuarios")
+    parser.add_argument("--transactions", type=int, default=150, help="Transacciones promedio por usuario")
+    parser.add_argument("--goals", type=int, default=4, help="Metas máximas por usuario")
+    parser.add_argument("--contributions", type=int, default=6, help="Abonos promedio por meta")
+    parser.add_argument("--months", type=int, default=18, help="Meses de historia")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Documentos por insert_many")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lotes simultáneos")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    parser.add_argument("--drop", action="store_true", help="Eliminar antes los datos sintéticos existentes")
+    parser.add_argument("--mongodb-url", default=BENCH_MONGODB_URL, help="URL del mongod (local)")
+    parser.add_argument("--database", default=BENCH_DATABASE_NAME, help="Base de datos destino")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -1,55 +1,84 @@
-from motor.motor_asyncio import AsyncIOMotorClient #Cliente asíncrono para FastAPI
-from pymongo import MongoClient #Cliente síncrono para operaciones que lo requieran
+from motor.motor_asyncio import AsyncIOMotorClient #Cliente asíncrono compartido por toda la aplicación
+import asyncio #Para precalentar el pool de conexiones en paralelo
 import os #Para obtener las variables de entorno
 from dotenv import load_dotenv #Para cargar las variables de entorno
+from services.metrics import mongo_event_listeners #Métricas de comandos y del pool
+from services.slow_queries import slow_query_recorder #Registro de consultas lentas
 
-#SINCRONICO: una cosa a la vez
 #ASINCRONICO: varias cosas a la vez
+#Se usa un único cliente para toda la aplicación: nunca se bloquea el event loop
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Configuración de MongoDB
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "gastosmart")
+# Configuración de MongoDB (MONGO_URI/MONGO_DB se aceptan por compatibilidad)
+MONGODB_URL = os.getenv("MONGODB_URL", os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+DATABASE_NAME = os.getenv("DATABASE_NAME", os.getenv("MONGO_DB", "gastosmart"))
 
-# Cliente asíncrono para FastAPI
+# Configuración del pool de conexiones
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+
+# Compresión de protocolo: se negocia con el servidor en orden de preferencia
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+
+# Cliente asíncrono compartido (uno por proceso)
 async_client = None
 
-# Cliente síncrono para operaciones que lo requieran
-sync_client = None
+def _client_options() -> dict:
+    """Opciones del cliente compartido a partir de las variables de entorno"""
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "event_listeners": mongo_event_listeners() + [slow_query_recorder],
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+async def _warm_up_pool(client: AsyncIOMotorClient):
+    """
+    Abrir minPoolSize conexiones antes de atender peticiones
+
+    Cada ping concurrente toma una conexión distinta del pool, de modo que
+    las primeras peticiones no pagan el handshake (TCP/TLS/autenticación).
+    """
+    warm_connections = max(1, MONGO_MIN_POOL_SIZE)
+    await asyncio.gather(*[client.admin.command('ping') for _ in range(warm_connections)])
 
 async def connect_to_mongo():
     """Conectar a MongoDB"""
-    global async_client, sync_client
+    global async_client
+    if async_client is not None:
+        return
     try:
-        async_client = AsyncIOMotorClient(MONGODB_URL)
-        sync_client = MongoClient(MONGODB_URL)
-        
-        # Verificar conexión
-        await async_client.admin.command('ping')
-        print(f"Conectado a MongoDB: {DATABASE_NAME}")
-        
+        async_client = AsyncIOMotorClient(MONGODB_URL, **_client_options())
+        slow_query_recorder.attach(async_client, asyncio.get_running_loop())
+
+        # Verificar conexión y precalentar el pool
+        await _warm_up_pool(async_client)
+        print(f"Conectado a MongoDB: {DATABASE_NAME} (pool {MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE})")
+
     except Exception as e:
         print(f"Error conectando a MongoDB: {e}")
         raise e
 
 async def close_mongo_connection():
     """Cerrar conexión a MongoDB"""
-    global async_client, sync_client
+    global async_client
     if async_client:
+        slow_query_recorder.detach()
         async_client.close()
-    if sync_client:
-        sync_client.close()
+        async_client = None
 
-def get_database():
-    """Obtener instancia de la base de datos"""
-    if sync_client is None:
+def get_client() -> AsyncIOMotorClient:
+    """Obtener el cliente compartido de MongoDB"""
+    if async_client is None:
         raise Exception("Base de datos no conectada")
-    return sync_client[DATABASE_NAME]
+    return async_client
 
 async def get_async_database():
     """Obtener instancia asíncrona de la base de datos"""
-    if async_client is None:
-        raise Exception("Base de datos no conectada")
-    return async_client[DATABASE_NAME]
\ No newline at end of file
+    return get_client()[DATABASE_NAME]
@@ -0,0 +1,71 @@
+"""
+Operaciones de Base de Datos para Versiones de Datos por Usuario
+
+Este archivo mantiene la colección `data_versions`: un contador por usuario
+que se incrementa en cada escritura de transacciones o metas. Las cachés de
+reportes incluyen esta versión en sus claves, por lo que cualquier escritura
+deja obsoletas las entradas anteriores sin invalidarlas una por una.
+"""
+
+from datetime import datetime
+from typing import Iterable
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DataVersionOperations:
+    """
+    Clase para manejar las versiones de datos de los usuarios
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        """
+        Inicializar operaciones de versiones
+
+        Args:
+            collection: Colección MongoDB para versiones de datos
+        """
+        self.collection = collection
+
+    async def bump(self, user_id: str) -> None:
+        """
+        Incrementar la versión de datos de un usuario
+
+        Args:
+            user_id: ID del usuario cuyos datos cambiaron
+        """
+        await self.collection.update_one(
+            {"_id": user_id},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now()}},
+            upsert=True
+        )
+
+    async def bump_many(self, user_ids: Iterable[str]) -> None:
+        """
+        Incrementar la versión de datos de varios usuarios
+
+        Args:
+            user_ids: IDs de los usuarios cuyos datos cambiaron
+        """
+        now = datetime.now()
+        requests = [
+            UpdateOne({"_id": user_id}, {"$inc": {"version": 1}, "$set": {"updated_at": now}}, upsert=True)
+            for user_id in user_ids
+        ]
+        if requests:
+            await self.collection.bulk_write(requests, ordered=False)
+
+    async def get_version(self, user_id: str) -> int:
+        """
+        Obtener la versión de datos actual de un usuario
+
+        Args:
+            user_id: ID del usuario
+
+        Returns:
+            int: Versión actual (0 si el usuario nunca ha escrito datos)
+        """
+        doc = await self.collection.find_one({"_id": user_id}, {"version": 1})
+        return doc["version"] if doc else 0
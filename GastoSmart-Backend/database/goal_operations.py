@@ -13,26 +13,53 @@ from models.goal import (
     GoalStats, GoalTrend, MonthlySavings, MonthlyContribution, DailyContribution,
     GoalStatus, GoalCategory
 )
+from database.rollup_operations import RollupOperations
+from database.data_version_operations import DataVersionOperations
+from database.projections import projection, select_fields
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Campos que expone GoalResponse; los listados solo leen estos
+RESPONSE_PROJECTION = {
+    "user_id": 1, "name": 1, "description": 1, "category": 1, "target_amount": 1,
+    "current_amount": 1, "target_date": 1, "created_at": 1, "updated_at": 1,
+    "status": 1, "progress_percentage": 1, "currency": 1, "is_public": 1, "is_main": 1
+}
+
 class GoalOperations:
     """
     Clase para manejar operaciones de base de datos de metas
     """
     
-    def __init__(self, collection: AsyncIOMotorCollection, transactions_collection: Optional[AsyncIOMotorCollection] = None):
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        transactions_collection: Optional[AsyncIOMotorCollection] = None,
+        rollups_collection: Optional[AsyncIOMotorCollection] = None,
+        versions_collection: Optional[AsyncIOMotorCollection] = None
+    ):
         """
         Inicializar operaciones de metas
         
         Args:
             collection: Colección MongoDB para metas
             transactions_collection: Colección MongoDB para transacciones (opcional)
+            rollups_collection: Colección MongoDB para acumulados mensuales (opcional)
+            versions_collection: Colección MongoDB para versiones de datos (opcional)
         """
         self.collection = collection
         self.transactions_collection = transactions_collection
+        self.rollups = RollupOperations(rollups_collection) if rollups_collection is not None else None
+        self.versions = DataVersionOperations(versions_collection) if versions_collection is not None else None
+
+    async def bump_version(self, user_id: str) -> None:
+        """Marcar que los datos del usuario cambiaron (invalida sus reportes en caché)"""
+        if self.versions is not None:
+            await self.versions.bump(user_id)
     
     async def create_goal(self, user_id: str, goal_data: GoalCreate) -> GoalResponse:
         """
@@ -73,9 +100,10 @@ class GoalOperations:
             # Insertar en la base de datos
             result = await self.collection.insert_one(goal_doc)
             logger.info(f"Meta insertada en colección 'goals' - inserted_id: {result.inserted_id}")
+            await self.bump_version(user_id)
             
             # Obtener la meta creada
-            created_goal = await self.collection.find_one({"_id": result.inserted_id})
+            created_goal = await self.collection.find_one({"_id": result.inserted_id}, RESPONSE_PROJECTION)
             
             if created_goal:
                 logger.info(f"Meta creada confirmada - _id: {created_goal['_id']}, name: {created_goal['name']}, is_main: {created_goal.get('is_main', False)}")
@@ -103,7 +131,7 @@ class GoalOperations:
             goal_doc = await self.collection.find_one({
                 "_id": ObjectId(goal_id),
                 "user_id": user_id
-            })
+            }, RESPONSE_PROJECTION)
             
             return self._document_to_response(goal_doc) if goal_doc else None
             
@@ -117,7 +145,9 @@ class GoalOperations:
         status: Optional[GoalStatus] = None,
         category: Optional[GoalCategory] = None,
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        as_dicts: bool = False,
+        fields: Optional[List[str]] = None
     ) -> List[GoalResponse]:
         """
         Obtener metas de un usuario con filtros
@@ -128,6 +158,8 @@ class GoalOperations:
             category: Filtrar por categoría
             skip: Número de metas a saltar
             limit: Límite de metas a devolver
+            as_dicts: Devolver diccionarios listos para serializar en vez de modelos
+            fields: Campos a devolver (solo con as_dicts; None para todos)
             
         Returns:
             List[GoalResponse]: Lista de metas
@@ -142,11 +174,12 @@ class GoalOperations:
                 query["category"] = category.value
             
             # Ejecutar consulta ordenada por fecha de creación
-            cursor = self.collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
+            read_projection = projection(fields) if fields else RESPONSE_PROJECTION
+            cursor = self.collection.find(query, read_projection).sort("created_at", -1).skip(skip).limit(limit)
             goals = []
             
             async for doc in cursor:
-                goals.append(self._document_to_response(doc))
+                goals.append(self._document_to_dict(doc, fields) if as_dicts else self._document_to_response(doc))
             
             return goals
             
@@ -205,11 +238,13 @@ class GoalOperations:
             if result.modified_count == 0:
                 return None
             
+            await self.bump_version(user_id)
+            
             # Obtener la meta actualizada
             updated_goal = await self.collection.find_one({
                 "_id": ObjectId(goal_id),
                 "user_id": user_id
-            })
+            }, RESPONSE_PROJECTION)
             
             # Recalcular progreso
             if updated_goal:
@@ -226,6 +261,92 @@ class GoalOperations:
             logger.error(f"Error al actualizar meta {goal_id}: {e}")
             return None
     
+    async def _apply_contribution(
+        self,
+        goal_filter: Dict[str, Any],
+        user_id: str,
+        contribution: GoalContribution,
+        default_category: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aplicar un abono de forma atómica y registrar su transacción
+        
+        El incremento, el nuevo progreso y el estado se calculan en el
+        servidor con una actualización por pipeline. La condición $expr
+        impide que abonos concurrentes superen el monto objetivo.
+        
+        Args:
+            goal_filter: Filtro que identifica la meta
+            user_id: ID del usuario propietario
+            contribution: Datos del abono
+            default_category: Categoría de la transacción si la meta no tiene
+            
+        Returns:
+            dict: Documento de la meta actualizada o None si no existe
+            
+        Raises:
+            ValueError: Si el abono excede el monto restante
+        """
+        amount = contribution.amount
+        goal_doc = await self.collection.find_one_and_update(
+            {**goal_filter, "$expr": {"$lte": [{"$add": ["$current_amount", amount]}, "$target_amount"]}},
+            [
+                {"$set": {"current_amount": {"$add": ["$current_amount", amount]}, "updated_at": datetime.now()}},
+                {"$set": {
+                    "progress_percentage": {
+                        "$min": [100.0, {"$multiply": [{"$divide": ["$current_amount", "$target_amount"]}, 100]}]
+                    },
+                    "status": {
+                        "$cond": [{"$gte": ["$current_amount", "$target_amount"]}, GoalStatus.COMPLETED.value, "$status"]
+                    }
+                }}
+            ],
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if goal_doc is None:
+            # Solo en el caso de fallo: distinguir "no existe" de "excede el objetivo"
+            current = await self.collection.find_one(goal_filter, {"target_amount": 1, "current_amount": 1})
+            if not current:
+                return None
+            remaining_amount = current["target_amount"] - current["current_amount"]
+            raise ValueError(f"El monto del abono (${amount:,.0f}) excede el monto restante (${remaining_amount:,.0f})")
+        
+        logger.info(f"Meta {goal_doc['_id']} actualizada - current_amount: {goal_doc['current_amount']}")
+        
+        # Registrar transacción de abono a meta
+        if self.transactions_collection is not None:
+            try:
+                # Usar fecha personalizada o fecha actual
+                contribution_datetime = datetime.combine(
+                    contribution.contribution_date if contribution.contribution_date else date.today(),
+                    datetime.now().time()
+                )
+                
+                transaction_doc = {
+                    "user_id": user_id,
+                    "type": "goal_contribution",
+                    "amount": amount,
+                    "category": goal_doc.get("category", default_category),
+                    "description": contribution.description or f"Abono a meta: {goal_doc['name']}",
+                    "date": contribution_datetime,
+                    "created_at": datetime.now(),
+                    "currency": "COP",
+                    "goal_id": str(goal_doc["_id"]),
+                    "goal_name": goal_doc["name"]
+                }
+                await self.transactions_collection.insert_one(transaction_doc)
+                if self.rollups is not None:
+                    await self.rollups.apply(transaction_doc)
+                logger.info(f"Transacción de abono registrada para meta {goal_doc['_id']}")
+            except Exception as trans_error:
+                logger.error(f"Error al registrar transacción de abono: {trans_error}")
+                # No fallar si la transacción no se registra
+        
+        await self.bump_version(user_id)
+        
+        return goal_doc
+    
     async def contribute_to_main_goal(
         self, 
         user_id: str, 
@@ -240,94 +361,25 @@ class GoalOperations:
             
         Returns:
             GoalResponse: Meta principal actualizada o None
+            
+        Raises:
+            ValueError: Si el abono excede el monto restante
         """
         try:
-            logger.info(f"Buscando meta principal para user_id: {user_id}")
+            logger.info(f"Abonando a meta principal para user_id: {user_id}")
             
-            # Buscar la meta principal del usuario
-            goal_doc = await self.collection.find_one({
-                "user_id": user_id,
-                "is_main": True
-            })
+            goal_doc = await self._apply_contribution(
+                {"user_id": user_id, "is_main": True}, user_id, contribution, "Meta Principal"
+            )
             
             if not goal_doc:
                 logger.warning(f"No se encontró meta principal para user_id: {user_id}")
                 return None
             
-            logger.info(f"Meta principal encontrada: {goal_doc['_id']} - {goal_doc['name']}")
-            
-            # Validar que el abono no exceda el monto restante
-            remaining_amount = goal_doc["target_amount"] - goal_doc["current_amount"]
-            if contribution.amount > remaining_amount:
-                raise ValueError(f"El monto del abono (${contribution.amount:,.0f}) excede el monto restante (${remaining_amount:,.0f})")
-            
-            # Calcular nuevo monto
-            new_amount = goal_doc["current_amount"] + contribution.amount
-            
-            # Verificar que no exceda el objetivo (doble verificación)
-            if new_amount > goal_doc["target_amount"]:
-                new_amount = goal_doc["target_amount"]
-            
-            # Actualizar la meta
-            update_doc = {
-                "current_amount": new_amount,
-                "updated_at": datetime.now()
-            }
-            
-            # Calcular nuevo progreso
-            progress = (new_amount / goal_doc["target_amount"]) * 100
-            update_doc["progress_percentage"] = min(progress, 100.0)
-            
-            # Actualizar estado si se alcanzó el 100%
-            if progress >= 100:
-                update_doc["status"] = GoalStatus.COMPLETED.value
-            
-            result = await self.collection.update_one(
-                {"_id": goal_doc["_id"], "user_id": user_id},
-                {"$set": update_doc}
-            )
-            
-            if result.modified_count == 0:
-                logger.warning(f"No se pudo actualizar la meta principal {goal_doc['_id']}")
-                return None
-            
-            logger.info(f"Meta principal actualizada - modified_count: {result.modified_count}")
-            
-            # Registrar transacción de abono a meta
-            if self.transactions_collection is not None:
-                try:
-                    # Usar fecha personalizada o fecha actual
-                    contribution_datetime = datetime.combine(
-                        contribution.contribution_date if contribution.contribution_date else date.today(),
-                        datetime.now().time()
-                    )
-                    
-                    transaction_doc = {
-                        "user_id": user_id,
-                        "type": "goal_contribution",
-                        "amount": contribution.amount,
-                        "category": goal_doc.get("category", "Meta Principal"),
-                        "description": contribution.description or f"Abono a meta: {goal_doc['name']}",
-                        "date": contribution_datetime,
-                        "created_at": datetime.now(),
-                        "currency": "COP",
-                        "goal_id": str(goal_doc["_id"]),
-                        "goal_name": goal_doc["name"]
-                    }
-                    await self.transactions_collection.insert_one(transaction_doc)
-                    logger.info(f"Transacción de abono registrada para meta principal")
-                except Exception as trans_error:
-                    logger.error(f"Error al registrar transacción de abono: {trans_error}")
-                    # No fallar si la transacción no se registra
-            
-            # Obtener la meta actualizada
-            updated_goal = await self.collection.find_one({
-                "_id": goal_doc["_id"],
-                "user_id": user_id
-            })
-            
-            return self._document_to_response(updated_goal)
+            return self._document_to_response(goal_doc)
             
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Error al abonar a meta principal del usuario {user_id}: {e}")
             return None
@@ -348,95 +400,67 @@ class GoalOperations:
             
         Returns:
             GoalResponse: Meta actualizada o None
+            
+        Raises:
+            ValueError: Si el abono excede el monto restante
         """
         try:
             logger.info(f"Abonando a meta {goal_id} para user_id: {user_id}")
             
-            # Obtener la meta actual
-            goal_doc = await self.collection.find_one({
-                "_id": ObjectId(goal_id),
-                "user_id": user_id
-            })
+            goal_doc = await self._apply_contribution(
+                {"_id": ObjectId(goal_id), "user_id": user_id}, user_id, contribution, "Meta"
+            )
             
             if not goal_doc:
                 logger.warning(f"Meta {goal_id} no encontrada para user_id: {user_id}")
                 return None
             
-            # Validar que el abono no exceda el monto restante
-            remaining_amount = goal_doc["target_amount"] - goal_doc["current_amount"]
-            if contribution.amount > remaining_amount:
-                raise ValueError(f"El monto del abono (${contribution.amount:,.0f}) excede el monto restante (${remaining_amount:,.0f})")
-            
-            # Calcular nuevo monto
-            new_amount = goal_doc["current_amount"] + contribution.amount
+            return self._document_to_response(goal_doc)
             
-            # Verificar que no exceda el objetivo (doble verificación)
-            if new_amount > goal_doc["target_amount"]:
-                new_amount = goal_doc["target_amount"]
-            
-            # Actualizar la meta
-            update_doc = {
-                "current_amount": new_amount,
-                "updated_at": datetime.now()
-            }
-            
-            # Calcular nuevo progreso
-            progress = (new_amount / goal_doc["target_amount"]) * 100
-            update_doc["progress_percentage"] = min(progress, 100.0)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error al abonar a meta {goal_id}: {e}")
+            return None
+    
+    async def set_main_goal(self, goal_id: str, user_id: str) -> Optional[GoalResponse]:
+        """
+        Establecer una meta como principal del usuario (desmarca las demás)
+        
+        Args:
+            goal_id: ID de la meta
+            user_id: ID del usuario propietario
             
-            # Actualizar estado si se alcanzó el 100%
-            if progress >= 100:
-                update_doc["status"] = GoalStatus.COMPLETED.value
+        Returns:
+            GoalResponse: Meta establecida como principal o None si no existe
+        """
+        try:
+            object_id = ObjectId(goal_id)
+        except InvalidId:
+            return None
+        now = datetime.now()
+        modified = 0
+        try:
+            cleared = await self.collection.update_many(
+                {"user_id": user_id, "is_main": True},
+                {"$set": {"is_main": False, "updated_at": now}}
+            )
+            modified += cleared.modified_count
             
             result = await self.collection.update_one(
-                {"_id": ObjectId(goal_id), "user_id": user_id},
-                {"$set": update_doc}
+                {"_id": object_id, "user_id": user_id},
+                {"$set": {"is_main": True, "updated_at": now}}
             )
-            
+            modified += result.modified_count
             if result.modified_count == 0:
-                logger.warning(f"No se pudo actualizar la meta {goal_id}")
                 return None
             
-            logger.info(f"Meta {goal_id} actualizada - modified_count: {result.modified_count}")
-            
-            # Registrar transacción de abono a meta
-            if self.transactions_collection is not None:
-                try:
-                    # Usar fecha personalizada o fecha actual
-                    contribution_datetime = datetime.combine(
-                        contribution.contribution_date if contribution.contribution_date else date.today(),
-                        datetime.now().time()
-                    )
-                    
-                    transaction_doc = {
-                        "user_id": user_id,
-                        "type": "goal_contribution",
-                        "amount": contribution.amount,
-                        "category": goal_doc.get("category", "Meta"),
-                        "description": contribution.description or f"Abono a meta: {goal_doc['name']}",
-                        "date": contribution_datetime,
-                        "created_at": datetime.now(),
-                        "currency": "COP",
-                        "goal_id": goal_id,
-                        "goal_name": goal_doc["name"]
-                    }
-                    await self.transactions_collection.insert_one(transaction_doc)
-                    logger.info(f"Transacción de abono registrada para meta {goal_id}")
-                except Exception as trans_error:
-                    logger.error(f"Error al registrar transacción de abono: {trans_error}")
-                    # No fallar si la transacción no se registra
-            
-            # Obtener la meta actualizada
-            updated_goal = await self.collection.find_one({
-                "_id": ObjectId(goal_id),
-                "user_id": user_id
-            })
-            
-            return self._document_to_response(updated_goal)
-            
-        except Exception as e:
-            logger.error(f"Error al abonar a meta {goal_id}: {e}")
-            return None
+            updated_goal = await self.collection.find_one({"_id": object_id, "user_id": user_id}, RESPONSE_PROJECTION)
+            return self._document_to_response(updated_goal) if updated_goal else None
+        finally:
+            # Aunque la meta no exista, la anterior ya pudo quedar desmarcada
+            if modified:
+                await self.bump_version(user_id)
     
     async def delete_goal(self, goal_id: str, user_id: str) -> bool:
         """
@@ -455,6 +479,9 @@ class GoalOperations:
                 "user_id": user_id
             })
             
+            if result.deleted_count > 0:
+                await self.bump_version(user_id)
+            
             return result.deleted_count > 0
             
         except Exception as e:
@@ -762,7 +789,7 @@ class GoalOperations:
             goal_doc = await self.collection.find_one({
                 "_id": ObjectId(goal_id),
                 "user_id": user_id
-            })
+            }, {"_id": 1})
             
             if not goal_doc:
                 logger.warning(f"Meta {goal_id} no encontrada para user_id: {user_id}")
@@ -850,3 +877,47 @@ class GoalOperations:
             is_public=doc.get("is_public", False),
             is_main=doc.get("is_main", False)
         )
+    
+    @staticmethod
+    def _document_to_dict(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Convertir documento MongoDB a un diccionario con la forma de GoalResponse
+        
+        Ruta rápida de los listados: evita construir y validar un modelo por
+        documento; la respuesta se serializa directamente con orjson.
+        
+        Args:
+            doc: Documento de MongoDB (con RESPONSE_PROJECTION o la de fields)
+            fields: Campos a devolver además de id (None para todos)
+            
+        Returns:
+            dict: Meta lista para serializar
+        """
+        # target_date se guarda como ISO (fecha o fecha y hora); la API expone solo la fecha
+        target_date = doc.get("target_date")
+        if isinstance(target_date, str):
+            target_date = target_date[:10]
+        elif isinstance(target_date, datetime):
+            target_date = target_date.date()
+        
+        def number(field):
+            value = doc.get(field)
+            return float(value) if value is not None else None
+        
+        return select_fields({
+            "id": str(doc["_id"]),
+            "user_id": doc.get("user_id"),
+            "name": doc.get("name"),
+            "description": doc.get("description"),
+            "category": doc.get("category"),
+            "target_amount": number("target_amount"),
+            "current_amount": number("current_amount"),
+            "target_date": target_date,
+            "created_at": doc.get("created_at"),
+            "updated_at": doc.get("updated_at"),
+            "status": doc.get("status"),
+            "progress_percentage": number("progress_percentage"),
+            "currency": doc.get("currency", "COP"),
+            "is_public": doc.get("is_public", False),
+            "is_main": doc.get("is_main", False)
+        }, fields)
@@ -0,0 +1,330 @@
+"""
+Registro de Índices de MongoDB para GastoSmart
+
+Este archivo declara los índices que necesitan las consultas de las clases
+*Operations y los servicios, junto con las consultas canónicas que deben
+resolverse con esos índices. Los índices se crean de forma idempotente al
+iniciar la aplicación (ver `lifespan` en main.py) y las consultas canónicas
+se verifican con `python -m scripts.verify_indexes`.
+"""
+
+from typing import Any, Dict, List
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Índices por colección: cada entrada define las claves y un nombre estable
+INDEX_REGISTRY: Dict[str, List[Dict[str, Any]]] = {
+    "transactions": [
+        # Listado paginado por cursor (orden + desempate por _id) y reportes por fechas
+        {"keys": [("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], "name": "user_date_id"},
+        {"keys": [("user_id", ASCENDING), ("amount", DESCENDING), ("_id", DESCENDING)], "name": "user_amount_id"},
+        {"keys": [("user_id", ASCENDING), ("category", DESCENDING), ("_id", DESCENDING)], "name": "user_category_id"},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], "name": "user_created_at_id"},
+        # Reportes de gastos/ingresos, abonos y listados filtrados por tipo
+        {
+            "keys": [("user_id", ASCENDING), ("type", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+            "name": "user_type_date_id",
+        },
+        # Búsqueda de texto por usuario (requiere igualdad en user_id)
+        {
+            "keys": [("user_id", ASCENDING), ("description", TEXT), ("category", TEXT)],
+            "name": "user_text",
+            "options": {"default_language": "spanish", "weights": {"category": 2, "description": 1}},
+        },
+        # Abonos diarios/mensuales por meta
+        {
+            "keys": [("user_id", ASCENDING), ("goal_id", ASCENDING), ("type", ASCENDING), ("date", DESCENDING)],
+            "name": "user_goal_type_date",
+        },
+    ],
+    "goals": [
+        # Búsqueda de la meta principal
+        {"keys": [("user_id", ASCENDING), ("is_main", ASCENDING)], "name": "user_is_main"},
+        # Listado de metas ordenado por fecha de creación
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING)], "name": "user_created_at"},
+    ],
+    "reports": [
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING)], "name": "user_created_at"},
+    ],
+    "users": [
+        # Login, registro y recuperación de contraseña buscan por correo
+        {"keys": [("email", ASCENDING)], "name": "email"},
+    ],
+    "user_settings": [
+        {"keys": [("user_id", ASCENDING)], "name": "user_id"},
+        # Antes de borrar las miniaturas de una foto se comprueba que nadie más la use
+        {"keys": [("profile_picture_hash", ASCENDING)], "name": "profile_picture_hash", "options": {"sparse": True}},
+    ],
+    "profile_pictures.files": [
+        # Miniaturas de una foto (al eliminarla); GridFS ya indexa filename
+        {"keys": [("metadata.hash", ASCENDING)], "name": "metadata_hash"},
+    ],
+    "verification_codes": [
+        # Código más reciente sin usar para un correo y propósito (igualdad, orden
+        # y al final el rango de expires_at, que se filtra sin leer documentos)
+        {
+            "keys": [
+                ("email", ASCENDING), ("purpose", ASCENDING), ("used", ASCENDING),
+                ("created_at", DESCENDING), ("expires_at", ASCENDING),
+            ],
+            "name": "email_purpose_used_created_at_expires_at",
+        },
+        # Los códigos se eliminan solos al expirar
+        {"keys": [("expires_at", ASCENDING)], "name": "expires_at_ttl", "options": {"expireAfterSeconds": 0}},
+    ],
+    "recommendations": [
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING)], "name": "user_created_at"},
+    ],
+    "revoked_tokens": [
+        # Los registros se eliminan cuando el token revocado ya habría expirado
+        {"keys": [("expires_at", ASCENDING)], "name": "expires_at_ttl", "options": {"expireAfterSeconds": 0}},
+        {"keys": [("jti", ASCENDING)], "name": "jti", "options": {"sparse": True}},
+        {"keys": [("user_id", ASCENDING)], "name": "user_id", "options": {"sparse": True}},
+    ],
+    "monthly_rollups": [
+        # Clave del acumulado (período = año*100 + mes); única para los upserts con $inc
+        # y los ReplaceOne de la regeneración por usuario
+        {
+            "keys": [("user_id", ASCENDING), ("period", ASCENDING), ("type", ASCENDING), ("category", ASCENDING)],
+            "name": "user_period_type_category",
+            "options": {"unique": True},
+        },
+    ],
+}
+
+# Índices reemplazados por versiones más completas; se eliminan al arrancar
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    "transactions": ["user_date", "user_type_date"],
+    "verification_codes": ["email_purpose_used_created_at"],
+}
+
+# Valores de ejemplo para las consultas canónicas (solo se usan con explain)
+_SAMPLE_USER_ID = "000000000000000000000000"
+_SAMPLE_DATE_FROM = datetime(2025, 1, 1)
+_SAMPLE_DATE_TO = datetime(2025, 1, 31, 23, 59, 59)
+
+# Consultas canónicas emitidas por las clases *Operations y EmailService
+CANONICAL_QUERIES: List[Dict[str, Any]] = [
+    {
+        "name": "TransactionOperations.get_user_transactions",
+        "collection": "transactions",
+        "filter": {"user_id": _SAMPLE_USER_ID},
+        "sort": [("date", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "TransactionOperations.get_user_transactions (tipo y fechas)",
+        "collection": "transactions",
+        "filter": {
+            "user_id": _SAMPLE_USER_ID,
+            "type": "expense",
+            "date": {"$gte": _SAMPLE_DATE_FROM, "$lte": _SAMPLE_DATE_TO},
+        },
+        "sort": [("date", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "TransactionOperations.get_user_transactions_page (cursor)",
+        "collection": "transactions",
+        "filter": {
+            "user_id": _SAMPLE_USER_ID,
+            "$or": [
+                {"date": {"$lt": _SAMPLE_DATE_TO}},
+                {"date": _SAMPLE_DATE_TO, "_id": {"$lt": ObjectId(_SAMPLE_USER_ID)}},
+            ],
+        },
+        "sort": [("date", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "TransactionOperations.get_user_transactions_page (monto)",
+        "collection": "transactions",
+        "filter": {"user_id": _SAMPLE_USER_ID},
+        "sort": [("amount", ASCENDING), ("_id", ASCENDING)],
+    },
+    {
+        "name": "TransactionOperations.search_transactions",
+        "collection": "transactions",
+        "filter": {
+            "user_id": _SAMPLE_USER_ID,
+            "$or": [{"$text": {"$search": "mercado"}}, {"amount": 50000.0}],
+        },
+    },
+    {
+        "name": "TransactionOperations.get_transaction_stats",
+        "collection": "transactions",
+        "pipeline": [
+            {"$match": {"user_id": _SAMPLE_USER_ID, "date": {"$gte": _SAMPLE_DATE_FROM, "$lte": _SAMPLE_DATE_TO}}},
+            {"$group": {"_id": "$type", "total_amount": {"$sum": "$amount"}}},
+        ],
+    },
+    {
+        "name": "ReportOperations.generate_expense_category_report",
+        "collection": "transactions",
+        "pipeline": [
+            {"$match": {
+                "user_id": _SAMPLE_USER_ID,
+                "type": "expense",
+                "date": {"$gte": _SAMPLE_DATE_FROM, "$lte": _SAMPLE_DATE_TO},
+            }},
+            {"$group": {"_id": "$category", "total_amount": {"$sum": "$amount"}}},
+        ],
+    },
+    {
+        "name": "RollupOperations.get_rollups",
+        "collection": "monthly_rollups",
+        "filter": {"user_id": _SAMPLE_USER_ID, "period": {"$gte": 202406, "$lte": 202501}, "count": {"$gt": 0}},
+    },
+    {
+        "name": "GoalOperations.get_daily_contributions_by_goal",
+        "collection": "transactions",
+        "pipeline": [
+            {"$match": {
+                "user_id": _SAMPLE_USER_ID,
+                "type": "goal_contribution",
+                "goal_id": _SAMPLE_USER_ID,
+                "date": {"$gte": _SAMPLE_DATE_FROM, "$lt": _SAMPLE_DATE_TO},
+            }},
+            {"$group": {"_id": {"$dayOfMonth": "$date"}, "total_amount": {"$sum": "$amount"}}},
+        ],
+    },
+    {
+        "name": "GoalOperations.contribute_to_main_goal",
+        "collection": "goals",
+        "filter": {"user_id": _SAMPLE_USER_ID, "is_main": True},
+    },
+    {
+        "name": "GoalOperations.get_user_goals",
+        "collection": "goals",
+        "filter": {"user_id": _SAMPLE_USER_ID},
+        "sort": [("created_at", DESCENDING)],
+    },
+    {
+        "name": "ReportOperations.get_user_reports",
+        "collection": "reports",
+        "filter": {"user_id": _SAMPLE_USER_ID},
+        "sort": [("created_at", DESCENDING)],
+    },
+    {
+        "name": "UserOperations.authenticate_user",
+        "collection": "users",
+        "filter": {"email": "canonical@gastosmart.app"},
+    },
+    {
+        "name": "EmailService.verify_code",
+        "collection": "verification_codes",
+        "filter": {
+            "email": "canonical@gastosmart.app",
+            "purpose": "registration",
+            "used": False,
+            "expires_at": {"$gt": _SAMPLE_DATE_FROM},
+        },
+        "sort": [("created_at", DESCENDING)],
+    },
+]
+
+def build_index_models(specs: List[Dict[str, Any]]) -> List[IndexModel]:
+    """
+    Convertir las especificaciones del registro a IndexModel de pymongo
+
+    Args:
+        specs: Especificaciones de índices de una colección
+
+    Returns:
+        List[IndexModel]: Modelos listos para create_indexes
+    """
+    models = []
+    for spec in specs:
+        options = dict(spec.get("options", {}))
+        models.append(IndexModel(spec["keys"], name=spec["name"], **options))
+    return models
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """
+    Crear todos los índices del registro (operación idempotente)
+
+    MongoDB no hace nada si el índice ya existe con la misma definición,
+    por lo que es seguro ejecutarlo en cada arranque.
+
+    Args:
+        db: Base de datos MongoDB
+
+    Returns:
+        Dict[str, List[str]]: Nombres de índices asegurados por colección
+    """
+    for collection_name, names in OBSOLETE_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection_name].drop_index(name)
+                logger.info(f"Índice obsoleto eliminado en '{collection_name}': {name}")
+
+    ensured = {}
+    for collection_name, specs in INDEX_REGISTRY.items():
+        names = await db[collection_name].create_indexes(build_index_models(specs))
+        ensured[collection_name] = names
+        logger.info(f"Índices asegurados en '{collection_name}': {', '.join(names)}")
+    return ensured
+
+def _find_stages(plan: Any, stage_name: str) -> bool:
+    """
+    Buscar recursivamente una etapa en la salida de explain()
+
+    Args:
+        plan: Documento (o fragmento) devuelto por explain
+        stage_name: Nombre de la etapa a buscar (p. ej. "COLLSCAN")
+
+    Returns:
+        bool: True si la etapa aparece en el plan
+    """
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage_name:
+            return True
+        return any(_find_stages(value, stage_name) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_find_stages(item, stage_name) for item in plan)
+    return False
+
+async def explain_canonical_query(db: AsyncIOMotorDatabase, query: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ejecutar explain() sobre una consulta canónica
+
+    Args:
+        db: Base de datos MongoDB
+        query: Entrada de CANONICAL_QUERIES
+
+    Returns:
+        dict: {"name": str, "collection": str, "collscan": bool}
+    """
+    collection = db[query["collection"]]
+
+    if "pipeline" in query:
+        plan = await db.command({
+            "explain": {"aggregate": query["collection"], "pipeline": query["pipeline"], "cursor": {}},
+            "verbosity": "queryPlanner"
+        })
+    else:
+        cursor = collection.find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        plan = await cursor.explain()
+
+    return {
+        "name": query["name"],
+        "collection": query["collection"],
+        "collscan": _find_stages(plan, "COLLSCAN")
+    }
+
+async def verify_canonical_queries(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """
+    Verificar que ninguna consulta canónica use COLLSCAN
+
+    Args:
+        db: Base de datos MongoDB
+
+    Returns:
+        List[dict]: Resultado de explain por consulta
+    """
+    return [await explain_canonical_query(db, query) for query in CANONICAL_QUERIES]
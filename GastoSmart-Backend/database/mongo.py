@@ -1,12 +1,8 @@
 # database/mongo.py
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DB_NAME = os.getenv("MONGO_DB", "gastosmart")
-
-client = AsyncIOMotorClient(MONGO_URI)
-db = client[DB_NAME]
+from motor.motor_asyncio import AsyncIOMotorCollection
+from database.connection import get_client, DATABASE_NAME
 
 # Colecciones usadas por el servicio de recomendaciones
-recommendations_collection = db["recommendations"]
+# Se resuelven sobre el cliente compartido creado en connect_to_mongo()
+def get_recommendations_collection() -> AsyncIOMotorCollection:
+    return get_client()[DATABASE_NAME]["recommendations"]
@@ -0,0 +1,202 @@
+"""
+Operaciones de Base de Datos para Fotos de Perfil
+
+Las miniaturas se guardan en GridFS (bucket `profile_pictures`) con el
+nombre `<hash>/<tamaño>`. El hash es el del contenido original, así que una
+URL de miniatura nunca cambia de contenido y se puede cachear como inmutable.
+
+Varios usuarios pueden compartir una foto (mismo hash). Antes de eliminar las
+miniaturas se marcan con `metadata.deleting`; mientras están marcadas cuentan
+como ausentes, así que quien empiece a usar la foto en ese intervalo las
+vuelve a subir en lugar de confiar en archivos que están por eliminarse.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket, AsyncIOMotorGridOut
+from pymongo import ASCENDING
+from gridfs.errors import NoFile
+import logging
+
+from services.profile_pictures import PROFILE_PICTURE_SIZES, THUMBNAIL_CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURE_BUCKET = "profile_pictures"
+
+# Tamaño de los chunks de GridFS (las miniaturas suelen caber en uno)
+PROFILE_PICTURE_CHUNK_BYTES = 255 * 1024
+
+def thumbnail_filename(picture_hash: str, size: int) -> str:
+    """Nombre en GridFS de una miniatura"""
+    return f"{picture_hash}/{size}"
+
+def thumbnail_url(picture_hash: str, size: int) -> str:
+    """URL pública (inmutable) de una miniatura"""
+    return f"/api/user-settings/profile-picture/{picture_hash}/{size}"
+
+class ProfilePictureOperations:
+    """
+    Clase para guardar y leer miniaturas de fotos de perfil en GridFS
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.bucket = AsyncIOMotorGridFSBucket(
+            db, bucket_name=PROFILE_PICTURE_BUCKET, chunk_size_bytes=PROFILE_PICTURE_CHUNK_BYTES
+        )
+        self.files_collection = db[f"{PROFILE_PICTURE_BUCKET}.files"]
+
+    async def missing_sizes(self, picture_hash: str, sizes: Tuple[int, ...] = PROFILE_PICTURE_SIZES) -> List[int]:
+        """
+        Tamaños de una foto que aún no están guardados
+
+        Args:
+            picture_hash: Hash del contenido original
+            sizes: Tamaños esperados
+
+        Returns:
+            list: Tamaños que faltan (vacío si la foto ya existe completa)
+        """
+        names = [thumbnail_filename(picture_hash, size) for size in sizes]
+        stored = set()
+        async for doc in self.files_collection.find(
+            {"filename": {"$in": names}, "metadata.deleting": {"$exists": False}}, {"filename": 1}
+        ):
+            stored.add(doc["filename"])
+        return [size for size, name in zip(sizes, names) if name not in stored]
+
+    async def stored_sizes(self, picture_hash: str) -> List[int]:
+        """
+        Tamaños guardados de una foto (pueden no coincidir con PROFILE_PICTURE_SIZES
+        si la configuración cambió después de subirla)
+
+        Args:
+            picture_hash: Hash del contenido original
+
+        Returns:
+            list: Lados de las miniaturas, de menor a mayor
+        """
+        sizes = set()
+        async for doc in self.files_collection.find(
+            {"metadata.hash": picture_hash, "metadata.deleting": {"$exists": False}}, {"metadata.size": 1}
+        ):
+            sizes.add(doc["metadata"]["size"])
+        return sorted(sizes)
+
+    async def save_thumbnails(self, picture_hash: str, user_id: str, thumbnails: Dict[int, bytes]) -> None:
+        """
+        Guardar miniaturas en GridFS
+
+        Args:
+            picture_hash: Hash del contenido original
+            user_id: Usuario que subió la foto
+            thumbnails: Miniatura WebP por tamaño
+        """
+        for size, data in thumbnails.items():
+            await self.bucket.upload_from_stream(
+                thumbnail_filename(picture_hash, size),
+                data,
+                metadata={
+                    "hash": picture_hash,
+                    "size": size,
+                    "user_id": user_id,
+                    "content_type": THUMBNAIL_CONTENT_TYPE,
+                },
+            )
+        await self._remove_duplicates(picture_hash, list(thumbnails))
+
+    async def _remove_duplicates(self, picture_hash: str, sizes: List[int]) -> None:
+        """
+        Dejar una sola copia de cada miniatura
+
+        Dos subidas simultáneas de la misma foto ven los mismos tamaños
+        ausentes y suben ambas; todas conservan la copia con el _id menor.
+        """
+        names = [thumbnail_filename(picture_hash, size) for size in sizes]
+        kept = set()
+        cursor = self.files_collection.find(
+            {"filename": {"$in": names}, "metadata.deleting": {"$exists": False}}, {"filename": 1}
+        ).sort("_id", ASCENDING)
+        async for doc in cursor:
+            if doc["filename"] not in kept:
+                kept.add(doc["filename"])
+                continue
+            try:
+                await self.bucket.delete(doc["_id"])
+            except NoFile:
+                pass
+
+    async def open_thumbnail(self, picture_hash: str, size: int) -> Optional[AsyncIOMotorGridOut]:
+        """
+        Abrir una miniatura para leerla por chunks
+
+        Args:
+            picture_hash: Hash del contenido original
+            size: Lado de la miniatura
+
+        Returns:
+            AsyncIOMotorGridOut o None si no existe
+        """
+        try:
+            return await self.bucket.open_download_stream_by_name(thumbnail_filename(picture_hash, size))
+        except NoFile:
+            return None
+
+    async def mark_for_deletion(self, picture_hash: str) -> Tuple[ObjectId, List[ObjectId]]:
+        """
+        Marcar las miniaturas de una foto antes de comprobar si alguien la usa
+
+        Args:
+            picture_hash: Hash del contenido original
+
+        Returns:
+            tuple: Marca aplicada e IDs de los archivos marcados
+        """
+        mark = ObjectId()
+        file_ids = [doc["_id"] async for doc in self.files_collection.find({"metadata.hash": picture_hash}, {"_id": 1})]
+        if file_ids:
+            await self.files_collection.update_many(
+                {"_id": {"$in": file_ids}},
+                {"$set": {"metadata.deleting": mark, "metadata.deleting_at": datetime.utcnow()}}
+            )
+        return mark, file_ids
+
+    async def unmark(self, mark: ObjectId, file_ids: List[ObjectId]) -> None:
+        """
+        Quitar la marca de eliminación (la foto sigue en uso)
+
+        Args:
+            mark: Marca devuelta por mark_for_deletion
+            file_ids: Archivos marcados
+        """
+        if file_ids:
+            await self.files_collection.update_many(
+                {"_id": {"$in": file_ids}, "metadata.deleting": mark},
+                {"$unset": {"metadata.deleting": "", "metadata.deleting_at": ""}}
+            )
+
+    async def delete_marked(self, mark: ObjectId, file_ids: List[ObjectId]) -> int:
+        """
+        Eliminar las miniaturas que siguen con la marca indicada
+
+        Si otra eliminación de la misma foto volvió a marcarlas, decide ella.
+
+        Args:
+            mark: Marca devuelta por mark_for_deletion
+            file_ids: Archivos marcados
+
+        Returns:
+            int: Número de archivos eliminados
+        """
+        if not file_ids:
+            return 0
+        deleted = 0
+        async for doc in self.files_collection.find({"_id": {"$in": file_ids}, "metadata.deleting": mark}, {"_id": 1}):
+            try:
+                await self.bucket.delete(doc["_id"])
+                deleted += 1
+            except NoFile:
+                pass
+        return deleted
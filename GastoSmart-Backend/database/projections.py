@@ -0,0 +1,67 @@
+"""
+Proyecciones de MongoDB y selección de campos (sparse fieldsets)
+
+Cada operación lee solo los campos que necesita. Los listados aceptan además
+el parámetro `fields=amount,date,category`, que se traduce a una proyección
+para reducir el tamaño en la red, la decodificación BSON y la serialización.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+def projection(fields: Iterable[str]) -> Dict[str, int]:
+    """
+    Proyección de inclusión para una lista de campos
+
+    Args:
+        fields: Campos a incluir (el _id siempre se incluye)
+
+    Returns:
+        dict: Proyección de MongoDB
+    """
+    return {field: 1 for field in fields}
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Interpretar el parámetro fields de un listado
+
+    Args:
+        fields: Campos separados por coma (p. ej. "amount,date,category")
+        allowed: Campos que expone el modelo de respuesta
+
+    Returns:
+        list: Campos pedidos sin duplicados (sin "id", que siempre se devuelve),
+              o None si no se pidió ninguno
+
+    Raises:
+        ValueError: Si se pide un campo que no existe
+    """
+    if not fields:
+        return None
+
+    allowed = set(allowed)
+    selected = []
+    for field in (part.strip() for part in fields.split(",")):
+        if not field or field == "id" or field in selected:
+            continue
+        if field not in allowed:
+            raise ValueError(f"Campo no válido en fields: {field}")
+        selected.append(field)
+    return selected or None
+
+def select_fields(data: Dict, fields: Optional[List[str]]) -> Dict:
+    """
+    Reducir una respuesta ya construida a id más los campos pedidos
+
+    Args:
+        data: Respuesta completa
+        fields: Campos pedidos (None para devolver todo)
+
+    Returns:
+        dict: Respuesta con solo los campos pedidos
+    """
+    if not fields:
+        return data
+    selected = {"id": data["id"]} if "id" in data else {}
+    for field in fields:
+        selected[field] = data.get(field)
+    return selected
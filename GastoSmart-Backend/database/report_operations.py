@@ -10,6 +10,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 from bson import ObjectId
 import asyncio  
+import os
+import logging
 from collections import defaultdict
 
 from models.report import (
@@ -19,6 +21,24 @@ from models.report import (
     FinancialReport, ReportType, ReportFilter, ReportStats
 )
 from models.transaction import TransactionType
+from database.rollup_operations import RollupOperations, month_period, month_range
+from database.data_version_operations import DataVersionOperations
+from database.projections import projection, select_fields
+
+logger = logging.getLogger(__name__)
+
+# Límite de consultas de reportes concurrentes por proceso (protege el pool de MongoDB)
+REPORT_QUERY_CONCURRENCY = int(os.getenv("REPORT_QUERY_CONCURRENCY", "20"))
+_report_query_slots = asyncio.Semaphore(REPORT_QUERY_CONCURRENCY)
+
+# Solo se leen los campos de los modelos de respuesta (sin _id ni metadatos internos)
+REPORT_PROJECTION = {**projection(FinancialReport.model_fields), "_id": 0}
+MONTHLY_SUMMARY_PROJECTION = {**projection(MonthlySummary.model_fields), "_id": 0}
+
+async def _bounded(awaitable):
+    """Ejecutar una consulta de reporte dentro del límite de concurrencia"""
+    async with _report_query_slots:
+        return await awaitable
 
 class ReportOperations:
     """Clase para operaciones de reportes financieros"""
@@ -28,46 +48,62 @@ class ReportOperations:
         self.transactions_collection = db.transactions
         self.goals_collection = db.goals
         self.reports_collection = db.reports
+        self.rollups = RollupOperations(db.monthly_rollups)
+        self.versions = DataVersionOperations(db.data_versions)
+
+    @staticmethod
+    def _spans_whole_months(start_date: date, end_date: date) -> bool:
+        """Indica si el rango empieza el día 1 y termina el último día de un mes"""
+        return start_date.day == 1 and (end_date + timedelta(days=1)).day == 1
+
+    async def _load_rollups(
+        self,
+        user_id: str,
+        first_period: int,
+        last_period: int,
+        transaction_type: Optional[str] = None,
+        prefetched: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtener acumulados de un rango, reutilizando los ya cargados si se pasan
+
+        Args:
+            user_id: ID del usuario
+            first_period: Primer período incluido
+            last_period: Último período incluido
+            transaction_type: Tipo de transacción (opcional)
+            prefetched: Acumulados cargados previamente que cubren el rango (opcional)
+
+        Returns:
+            List[dict]: Acumulados del rango
+        """
+        if prefetched is None:
+            return await self.rollups.get_rollups(user_id, first_period, last_period, transaction_type)
+        return [
+            rollup for rollup in prefetched
+            if first_period <= rollup["period"] <= last_period
+            and (transaction_type is None or rollup["type"] == transaction_type)
+        ]
     
-    async def generate_monthly_summary(self, user_id: str, year: int, month: int) -> MonthlySummary:
+    async def generate_monthly_summary(
+        self, user_id: str, year: int, month: int, rollups: Optional[List[Dict[str, Any]]] = None
+    ) -> MonthlySummary:
         """Genera un resumen mensual para un usuario"""
-        print(f"DEBUG generate_monthly_summary - user_id: {user_id}, year: {year}, month: {month}")
-    
-        # Calcular fechas del mes
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        logger.debug("generate_monthly_summary - user_id: %s, year: %s, month: %s", user_id, year, month)
     
-        print(f"DEBUG generate_monthly_summary - Buscando transacciones entre {start_date} y {end_date}")
-    
-        # Obtener transacciones del mes
-        query = {
-            "user_id": user_id,
-            "date": {
-                "$gte": start_date,
-                "$lte": end_date
-            }
-        }
-        print(f"DEBUG generate_monthly_summary - Query: {query}")
+        # Leer los acumulados del mes (uno por tipo y categoría)
+        period = month_period(year, month)
+        rollups = await self._load_rollups(user_id, period, period, prefetched=rollups)
+        logger.debug("generate_monthly_summary - acumulados del mes: %d", len(rollups))
 
-        # Usar agregación
-        pipeline = [
-            {"$match": query},
-            {
-                "$group": {
-                    "_id": "$type",
-                    "total_amount": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-    
-        # Ejecutar agregación y esperar resultados
-        cursor = self.transactions_collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
-        print(f"DEBUG generate_monthly_summary - Resultados agregación: {results}")
+        # Sumar las categorías de cada tipo
+        results = defaultdict(lambda: {"_id": None, "total_amount": 0.0, "count": 0})
+        for rollup in rollups:
+            totals = results[rollup["type"]]
+            totals["_id"] = rollup["type"]
+            totals["total_amount"] += rollup["total_amount"]
+            totals["count"] += rollup["count"]
+        results = list(results.values())
     
         # Calcular totales desde agregación
         total_income = 0.0
@@ -117,7 +153,7 @@ class ReportOperations:
                 "user_id": user_id,
                 "report_type": ReportType.MONTHLY_SUMMARY,
                 "month": f"{year}-{month:02d}"
-            })
+            }, MONTHLY_SUMMARY_PROJECTION)
             
             if summary:
                 return MonthlySummary(**summary)
@@ -129,35 +165,55 @@ class ReportOperations:
             print(f"Error en get_monthly_summary: {str(e)}")
             raise
     
-    async def generate_expense_category_report(self, user_id: str, start_date: date, end_date: date) -> ExpenseCategoryReport:
+    async def generate_expense_category_report(
+        self, user_id: str, start_date: date, end_date: date, rollups: Optional[List[Dict[str, Any]]] = None
+    ) -> ExpenseCategoryReport:
         """
         Genera reporte de gastos por categoría
         Implementa RQF-009: Gráfico de gastos por categoría
         """
-        # Obtener gastos en el período
-        query = {
-            "user_id": user_id,
-            "type": "expense",  # Usar string, no enum
-            "date": {
-                "$gte": datetime.combine(start_date, datetime.min.time()),
-                "$lte": datetime.combine(end_date, datetime.max.time())
-            }
-        }
-        # Usar agregación como goal_operations.py
-        pipeline = [
-            {"$match": query},
-            {
-                "$group": {
-                    "_id": "$category",
-                    "total_amount": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
+        if self._spans_whole_months(start_date, end_date):
+            # Meses completos: sumar los acumulados por categoría
+            rollups = await self._load_rollups(
+                user_id,
+                month_period(start_date.year, start_date.month),
+                month_period(end_date.year, end_date.month),
+                "expense",
+                prefetched=rollups
+            )
+            by_category = defaultdict(lambda: {"total_amount": 0.0, "count": 0})
+            for rollup in rollups:
+                by_category[rollup["category"]]["total_amount"] += rollup["total_amount"]
+                by_category[rollup["category"]]["count"] += rollup["count"]
+            results = sorted(
+                ({"_id": category, **totals} for category, totals in by_category.items()),
+                key=lambda result: result["total_amount"],
+                reverse=True
+            )
+        else:
+            # Rango parcial: agregar las transacciones del período
+            query = {
+                "user_id": user_id,
+                "type": "expense",  # Usar string, no enum
+                "date": {
+                    "$gte": datetime.combine(start_date, datetime.min.time()),
+                    "$lte": datetime.combine(end_date, datetime.max.time())
                 }
-            },
-            {"$sort": {"total_amount": -1}}
-        ]
-        
-        cursor = self.transactions_collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
+            }
+            pipeline = [
+                {"$match": query},
+                {
+                    "$group": {
+                        "_id": "$category",
+                        "total_amount": {"$sum": "$amount"},
+                        "count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"total_amount": -1}}
+            ]
+
+            cursor = self.transactions_collection.aggregate(pipeline)
+            results = await cursor.to_list(length=None)
         
         # Procesar resultados de agregación
         category_totals = defaultdict(lambda: {"amount": 0.0, "count": 0})
@@ -264,48 +320,24 @@ class ReportOperations:
             average_daily_expense=average_daily_expense
         )
     
-    async def generate_income_trend_report(self, user_id: str, months: int = 8) -> IncomeTrendReport:
+    async def generate_income_trend_report(
+        self, user_id: str, months: int = 8, rollups: Optional[List[Dict[str, Any]]] = None
+    ) -> IncomeTrendReport:
         """Genera reporte de tendencia de ingresos"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months * 30)
         
-        # Obtener ingresos del período
-        query = {
-            "user_id": user_id,
-            "type": "income",  # Usar string, no enum
-            "date": {
-                "$gte": start_date,
-                "$lte": end_date
-            }
-        }
-        # Usar agregación como goal_operations.py
-        pipeline = [
-            {"$match": query},
-            {
-                "$group": {
-                    "_id": {
-                        "year": {"$year": "$date"},
-                        "month": {"$month": "$date"}
-                    },
-                    "total_amount": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
+        # Obtener los acumulados de ingresos de los meses del reporte
+        periods = [month_period(year, month) for year, month in month_range(end_date, months)]
+        rollups = await self._load_rollups(user_id, min(periods), max(periods), "income", prefetched=rollups)
         
-        cursor = self.transactions_collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
-        
-        # Procesar resultados de agregación
+        # Sumar las categorías de cada mes
         monthly_totals = defaultdict(lambda: {"amount": 0.0, "count": 0})
         
-        for result in results:
-            month_key = f"{result['_id']['year']}-{result['_id']['month']:02d}"
-            amount = result["total_amount"]
-            count = result["count"]
-            monthly_totals[month_key]["amount"] = amount
-            monthly_totals[month_key]["count"] = count
+        for rollup in rollups:
+            month_key = f"{rollup['year']}-{rollup['month']:02d}"
+            monthly_totals[month_key]["amount"] += rollup["total_amount"]
+            monthly_totals[month_key]["count"] += rollup["count"]
         
         # Crear datos mensuales
         monthly_data = []
@@ -346,50 +378,29 @@ class ReportOperations:
             growth_rate=growth_rate
         )
     
-    async def generate_savings_evolution_report(self, user_id: str, months: int = 8) -> SavingsEvolutionReport:
+    async def generate_savings_evolution_report(
+        self, user_id: str, months: int = 8, rollups: Optional[List[Dict[str, Any]]] = None
+    ) -> SavingsEvolutionReport:
         """Genera reporte de evolución de ahorros"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months * 30)
         
-        # Obtener transacciones del período
-        query = {
-            "user_id": user_id,
-            "date": {
-                "$gte": start_date,
-                "$lte": end_date
-            }
-        }
-        # Usar agregación como goal_operations.py
-        pipeline = [
-            {"$match": query},
-            {
-                "$group": {
-                    "_id": {
-                        "year": {"$year": "$date"},
-                        "month": {"$month": "$date"},
-                        "type": "$type"
-                    },
-                    "total_amount": {"$sum": "$amount"}
-                }
-            },
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
-        
-        cursor = self.transactions_collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
+        # Obtener los acumulados de los meses del reporte
+        periods = [month_period(year, month) for year, month in month_range(end_date, months)]
+        rollups = await self._load_rollups(user_id, min(periods), max(periods), prefetched=rollups)
         
-        # Procesar resultados de agregación
+        # Sumar ingresos y gastos de cada mes
         monthly_savings = defaultdict(lambda: {"income": 0.0, "expenses": 0.0})
         
-        for result in results:
-            month_key = f"{result['_id']['year']}-{result['_id']['month']:02d}"
-            amount = result["total_amount"]
-            transaction_type = result["_id"]["type"]
+        for rollup in rollups:
+            month_key = f"{rollup['year']}-{rollup['month']:02d}"
+            amount = rollup["total_amount"]
+            transaction_type = rollup["type"]
             
             if transaction_type == "income":
-                monthly_savings[month_key]["income"] = amount
+                monthly_savings[month_key]["income"] += amount
             elif transaction_type == "expense":
-                monthly_savings[month_key]["expenses"] = amount
+                monthly_savings[month_key]["expenses"] += amount
         
         # Crear datos mensuales
         monthly_data = []
@@ -437,6 +448,40 @@ class ReportOperations:
             savings_growth_rate=savings_growth_rate
         )
     
+    async def generate_comprehensive_report(
+        self, user_id: str, year: int, month: int, week_start: date, months: int = 8
+    ) -> Dict[str, Any]:
+        """
+        Genera los cinco reportes del tablero con dos consultas concurrentes
+
+        Los acumulados de todos los meses involucrados se leen una sola vez y
+        alimentan el resumen mensual, las categorías, la tendencia de ingresos
+        y la evolución de ahorros. Los gastos diarios (que necesitan el detalle
+        por día) se agregan en paralelo.
+        """
+        start_date = date(year, month, 1)
+        if month == 12:
+            end_date = date(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = date(year, month + 1, 1) - timedelta(days=1)
+
+        periods = [month_period(year, month)]
+        periods += [month_period(y, m) for y, m in month_range(datetime.now(), months)]
+
+        rollups, daily_expenses = await asyncio.gather(
+            _bounded(self.rollups.get_rollups(user_id, min(periods), max(periods))),
+            _bounded(self.generate_daily_expenses_report(user_id, week_start))
+        )
+
+        return {
+            "monthly_summary": await self.generate_monthly_summary(user_id, year, month, rollups),
+            "expense_categories": await self.generate_expense_category_report(user_id, start_date, end_date, rollups),
+            "daily_expenses": daily_expenses,
+            "income_trend": await self.generate_income_trend_report(user_id, months, rollups),
+            "savings_evolution": await self.generate_savings_evolution_report(user_id, months, rollups),
+            "generated_at": datetime.now()
+        }
+    
     async def save_report(self, report: FinancialReport) -> str:
         """Guarda un reporte en la base de datos"""
         report_dict = report.dict()
@@ -444,19 +489,26 @@ class ReportOperations:
         report_dict["created_at"] = datetime.now()
         
         result = await self.reports_collection.insert_one(report_dict)
+        # Los listados y estadísticas de reportes guardados usan la versión en su ETag
+        await self.versions.bump(report.user_id)
         return str(result.inserted_id)
     
-    async def get_user_reports(self, user_id: str, limit: int = 10) -> List[FinancialReport]:
-        """Obtiene reportes del usuario"""
+    async def get_user_reports(
+        self, user_id: str, limit: int = 10, fields: Optional[List[str]] = None
+    ) -> List[FinancialReport]:
+        """Obtiene reportes del usuario (con fields, diccionarios con solo esos campos)"""
         # Usar agregación como goal_operations.py
         pipeline = [
             {"$match": {"user_id": user_id}},
             {"$sort": {"created_at": -1}},
-            {"$limit": limit}
+            {"$limit": limit},
+            {"$project": {**projection(fields), "_id": 0} if fields else REPORT_PROJECTION}
         ]
         cursor = self.reports_collection.aggregate(pipeline)
         reports = await cursor.to_list(length=None)
         
+        if fields:
+            return [select_fields(report, fields) for report in reports]
         return [FinancialReport(**report) for report in reports]
     
     async def search_reports(self, user_id: str, query: str, report_types: Optional[List[ReportType]] = None) -> List[FinancialReport]:
@@ -475,7 +527,8 @@ class ReportOperations:
         # Usar agregación como goal_operations.py
         pipeline = [
             {"$match": search_filter},
-            {"$limit": 20}
+            {"$limit": 20},
+            {"$project": REPORT_PROJECTION}
         ]
         cursor = self.reports_collection.aggregate(pipeline)
         reports = await cursor.to_list(length=None)
@@ -487,6 +540,7 @@ class ReportOperations:
         
         last_report = await self.reports_collection.find_one(
             {"user_id": user_id},
+            {"created_at": 1},
             sort=[("created_at", -1)]
         )
         
@@ -516,4 +570,7 @@ class ReportOperations:
             "_id": ObjectId(report_id),
             "user_id": user_id
         })
-        return result.deleted_count > 0
+        if result.deleted_count == 0:
+            return False
+        await self.versions.bump(user_id)
+        return True
@@ -0,0 +1,348 @@
+"""
+Operaciones de Base de Datos para Acumulados Mensuales
+
+Este archivo mantiene la colección `monthly_rollups`: un documento por
+(user_id, año, mes, tipo, categoría) con la suma y el conteo de las
+transacciones correspondientes. Se actualiza con $inc en cada escritura
+de transacciones y abonos, y los reportes la leen en lugar de volver a
+agregar meses de transacciones.
+"""
+
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReplaceOne
+import logging
+import uuid
+
+from database.data_version_operations import DataVersionOperations
+from database.indexes import INDEX_REGISTRY, build_index_models
+
+logger = logging.getLogger(__name__)
+
+# Veces que se vuelve a calcular un usuario que sigue escribiendo durante la regeneración
+REBUILD_MAX_PASSES = 5
+
+def month_period(year: int, month: int) -> int:
+    """
+    Clave numérica ordenable de un mes (p. ej. 2025-03 -> 202503)
+
+    Args:
+        year: Año
+        month: Mes (1-12)
+
+    Returns:
+        int: Período año*100 + mes
+    """
+    return year * 100 + month
+
+def month_range(end_date: datetime, months: int) -> List[Tuple[int, int]]:
+    """
+    Meses (año, mes) que cubren los reportes de tendencia
+
+    Reproduce el recorrido de los reportes: desde end_date hacia atrás en
+    pasos de 30 días.
+
+    Args:
+        end_date: Fecha final del reporte
+        months: Número de meses
+
+    Returns:
+        List[Tuple[int, int]]: Pares (año, mes), del más reciente al más antiguo
+    """
+    keys = []
+    for i in range(months):
+        current = end_date - timedelta(days=i * 30)
+        keys.append((current.year, current.month))
+    return keys
+
+class RollupOperations:
+    """
+    Clase para manejar los acumulados mensuales de transacciones
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        """
+        Inicializar operaciones de acumulados
+
+        Args:
+            collection: Colección MongoDB para acumulados mensuales
+        """
+        self.collection = collection
+
+    async def apply(self, transaction_doc: Dict[str, Any], sign: int = 1) -> None:
+        """
+        Sumar (o restar) una transacción a su acumulado mensual
+
+        Args:
+            transaction_doc: Documento de la transacción
+            sign: 1 al crear la transacción, -1 al eliminarla
+        """
+        tx_date = transaction_doc.get("date")
+        if not isinstance(tx_date, datetime):
+            return
+
+        await self.collection.update_one(
+            {
+                "user_id": transaction_doc["user_id"],
+                "period": month_period(tx_date.year, tx_date.month),
+                "type": transaction_doc["type"],
+                "category": transaction_doc["category"]
+            },
+            {
+                "$inc": {"total_amount": sign * transaction_doc["amount"], "count": sign},
+                "$set": {"updated_at": datetime.now()},
+                "$setOnInsert": {"year": tx_date.year, "month": tx_date.month}
+            },
+            upsert=True
+        )
+
+    async def move(self, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        """
+        Trasladar una transacción actualizada entre acumulados
+
+        Args:
+            before: Documento antes de la actualización
+            after: Documento después de la actualización
+        """
+        unchanged = all(before.get(field) == after.get(field) for field in ("amount", "category", "type"))
+        same_month = (
+            isinstance(before.get("date"), datetime) and isinstance(after.get("date"), datetime)
+            and (before["date"].year, before["date"].month) == (after["date"].year, after["date"].month)
+        )
+        if unchanged and same_month:
+            return
+
+        await self.apply(before, -1)
+        await self.apply(after, 1)
+
+    async def get_rollups(
+        self,
+        user_id: str,
+        first_period: int,
+        last_period: int,
+        transaction_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtener los acumulados de un rango de meses
+
+        Args:
+            user_id: ID del usuario
+            first_period: Primer período incluido (año*100 + mes)
+            last_period: Último período incluido (año*100 + mes)
+            transaction_type: Tipo de transacción (opcional)
+
+        Returns:
+            List[dict]: Documentos de acumulados con conteo positivo
+        """
+        query = {
+            "user_id": user_id,
+            "period": {"$gte": first_period, "$lte": last_period},
+            "count": {"$gt": 0}
+        }
+        if transaction_type:
+            query["type"] = transaction_type
+
+        return await self.collection.find(
+            query,
+            {"_id": 0, "year": 1, "month": 1, "period": 1, "type": 1, "category": 1, "total_amount": 1, "count": 1}
+        ).to_list(length=None)
+
+    def _rebuild_pipeline(self, scope: Dict[str, Any], rebuilt_at: datetime) -> List[Dict[str, Any]]:
+        """
+        Agregación que calcula los acumulados a partir de las transacciones
+
+        Args:
+            scope: Filtro de usuario ({} para todos)
+            rebuilt_at: Marca de tiempo de los acumulados generados
+
+        Returns:
+            List[dict]: Etapas de la agregación (sin etapa de salida)
+        """
+        return [
+            {"$match": {**scope, "date": {"$type": "date"}}},
+            {
+                "$group": {
+                    "_id": {
+                        "user_id": "$user_id",
+                        "year": {"$year": "$date"},
+                        "month": {"$month": "$date"},
+                        "type": "$type",
+                        "category": "$category"
+                    },
+                    "total_amount": {"$sum": "$amount"},
+                    "count": {"$sum": 1}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "user_id": "$_id.user_id",
+                    "year": "$_id.year",
+                    "month": "$_id.month",
+                    "period": {"$add": [{"$multiply": ["$_id.year", 100]}, "$_id.month"]},
+                    "type": "$_id.type",
+                    "category": "$_id.category",
+                    "total_amount": 1,
+                    "count": 1,
+                    "updated_at": {"$literal": rebuilt_at}
+                }
+            }
+        ]
+
+    async def rebuild(
+        self,
+        transactions_collection: AsyncIOMotorCollection,
+        user_id: Optional[str] = None,
+        versions: Optional[DataVersionOperations] = None
+    ) -> int:
+        """
+        Regenerar los acumulados desde cero a partir de las transacciones
+
+        La colección nunca queda vacía mientras se regenera: la regeneración
+        completa se construye en una colección temporal que luego reemplaza a
+        la actual con renameCollection, y la de un usuario reemplaza sus
+        documentos uno a uno. Los usuarios que escribieron durante la
+        regeneración completa se vuelven a calcular después del reemplazo,
+        repitiendo la búsqueda hasta que una pasada no encuentre escrituras
+        nuevas.
+        Al final se incrementa la versión de datos de cada usuario afectado,
+        de modo que la caché de reportes y los ETags no sirvan cifras viejas.
+
+        Args:
+            transactions_collection: Colección MongoDB de transacciones
+            user_id: Regenerar solo este usuario (opcional)
+            versions: Versiones de datos (por defecto, la colección data_versions)
+
+        Returns:
+            int: Número de acumulados generados
+        """
+        if versions is None:
+            versions = DataVersionOperations(self.collection.database.data_versions)
+
+        if user_id:
+            total = await self._rebuild_user(transactions_collection, user_id, versions)
+            await versions.bump(user_id)
+            return total
+
+        started = datetime.now()
+        previous_users = set(await self.collection.distinct("user_id"))
+
+        # Colección temporal con los mismos índices (renameCollection los conserva)
+        database = self.collection.database
+        temporary = database[f"{self.collection.name}_rebuild_{uuid.uuid4().hex[:8]}"]
+        await temporary.create_indexes(build_index_models(INDEX_REGISTRY[self.collection.name]))
+        try:
+            pipeline = self._rebuild_pipeline({}, started) + [{"$out": temporary.name}]
+            await transactions_collection.aggregate(pipeline).to_list(length=None)
+            await temporary.rename(self.collection.name, dropTarget=True)
+        except Exception:
+            await temporary.drop()
+            raise
+
+        # Escrituras que llegaron a la colección anterior durante la agregación
+        # (y las que lleguen mientras se recalculan esos usuarios)
+        changed = set()
+        since = started
+        for _ in range(REBUILD_MAX_PASSES):
+            pass_started = datetime.now()
+            pending = await versions.collection.distinct("_id", {"updated_at": {"$gte": since}})
+            if not pending:
+                break
+            for changed_user in pending:
+                await self._rebuild_user(transactions_collection, changed_user, versions)
+            changed.update(pending)
+            since = pass_started
+        else:
+            logger.warning("Acumulados regenerados con escrituras aún en curso tras %d pasadas", REBUILD_MAX_PASSES)
+
+        users = previous_users | set(await self.collection.distinct("user_id")) | changed
+        await versions.bump_many(users)
+
+        total = await self.collection.count_documents({})
+        logger.info(f"Acumulados mensuales regenerados: {total} ({len(users)} usuarios)")
+        return total
+
+    async def _rebuild_user(
+        self,
+        transactions_collection: AsyncIOMotorCollection,
+        user_id: str,
+        versions: DataVersionOperations
+    ) -> int:
+        """
+        Regenerar los acumulados de un usuario sin vaciarlos antes
+
+        Un $inc que llega después de la agregación quedaría pisado por el
+        reemplazo; las escrituras incrementan la versión de datos del usuario,
+        así que se compara antes y después y se repite si cambió.
+
+        Args:
+            transactions_collection: Colección MongoDB de transacciones
+            user_id: ID del usuario
+            versions: Versiones de datos
+
+        Returns:
+            int: Número de acumulados generados
+        """
+        for _ in range(REBUILD_MAX_PASSES):
+            version = await versions.get_version(user_id)
+            total = await self._replace_user_rollups(transactions_collection, user_id)
+            if await versions.get_version(user_id) == version:
+                return total
+        logger.warning("Acumulados del usuario %s regenerados con escrituras aún en curso", user_id)
+        return total
+
+    async def _replace_user_rollups(self, transactions_collection: AsyncIOMotorCollection, user_id: str) -> int:
+        """
+        Reemplazar los acumulados de un usuario por los calculados ahora
+
+        Cada acumulado se reemplaza en su lugar; después se borran los que ya
+        no tienen transacciones (los anteriores a la regeneración que no se
+        reemplazaron ni recibieron $inc entre tanto).
+
+        Args:
+            transactions_collection: Colección MongoDB de transacciones
+            user_id: ID del usuario
+
+        Returns:
+            int: Número de acumulados generados
+        """
+        rebuilt_at = datetime.now()
+        docs = await transactions_collection.aggregate(
+            self._rebuild_pipeline({"user_id": user_id}, rebuilt_at)
+        ).to_list(length=None)
+
+        if docs:
+            await self.collection.bulk_write([
+                ReplaceOne(
+                    {"user_id": doc["user_id"], "period": doc["period"], "type": doc["type"], "category": doc["category"]},
+                    doc,
+                    upsert=True
+                )
+                for doc in docs
+            ], ordered=False)
+        await self.collection.delete_many({"user_id": user_id, "updated_at": {"$lt": rebuilt_at}})
+        return len(docs)
+
+    async def ensure_backfilled(self, transactions_collection: AsyncIOMotorCollection) -> bool:
+        """
+        Generar los acumulados si la colección está vacía y hay transacciones
+
+        Al desplegar los acumulados por primera vez los reportes leerían
+        totales en cero; se llama al iniciar la aplicación, antes de atender
+        peticiones.
+
+        Args:
+            transactions_collection: Colección MongoDB de transacciones
+
+        Returns:
+            bool: True si se regeneraron los acumulados
+        """
+        if await self.collection.find_one({}, {"_id": 1}) is not None:
+            return False
+        if await transactions_collection.find_one({"date": {"$type": "date"}}, {"_id": 1}) is None:
+            return False
+
+        logger.info("monthly_rollups vacía: generando acumulados desde las transacciones")
+        await self.rebuild(transactions_collection)
+        return True
@@ -10,26 +10,94 @@ from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorCollection
 from models.transaction import (
     Transaction, TransactionCreate, TransactionResponse, 
-    TransactionUpdate, TransactionFilter, TransactionSort, TransactionStats
+    TransactionUpdate, TransactionFilter, TransactionSort, TransactionStats,
+    TransactionPage
 )
-from bson import ObjectId
+from bson import ObjectId, json_util
+from pymongo import ReturnDocument
+from config.regional import parse_currency
+from database.rollup_operations import RollupOperations
+from database.data_version_operations import DataVersionOperations
+from database.projections import projection, select_fields
+import base64
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Campos de ordenamiento permitidos (cada uno tiene índice {user_id, campo, _id})
+SORT_FIELDS = {
+    "date": "date",
+    "amount": "amount",
+    "category": "category",
+    "created_at": "created_at"
+}
+
+# Campos que expone TransactionResponse; los listados solo leen estos
+RESPONSE_PROJECTION = {
+    "user_id": 1, "type": 1, "amount": 1, "category": 1, "description": 1,
+    "date": 1, "created_at": 1, "updated_at": 1, "currency": 1
+}
+
+def encode_cursor(field: str, order: int, value: Any, doc_id: ObjectId) -> str:
+    """
+    Codificar la posición de la última transacción de una página
+
+    Args:
+        field: Campo de ordenamiento activo
+        order: 1 ascendente, -1 descendente
+        value: Valor del campo en la última transacción
+        doc_id: _id de la última transacción (desempate)
+
+    Returns:
+        str: Cursor opaco en base64 url-safe
+    """
+    payload = json_util.dumps({"f": field, "o": order, "v": value, "id": doc_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decodificar un cursor generado por encode_cursor
+
+    Args:
+        cursor: Cursor opaco recibido del cliente
+
+    Returns:
+        dict: {"f": campo, "o": orden, "v": valor, "id": ObjectId}
+
+    Raises:
+        ValueError: Si el cursor está malformado
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if not isinstance(payload.get("id"), ObjectId) or payload.get("o") not in (1, -1):
+            raise ValueError("estructura inválida")
+        return payload
+    except Exception as e:
+        raise ValueError(f"Cursor de paginación inválido: {e}")
+
 class TransactionOperations:
     """
     Clase para manejar operaciones de base de datos de transacciones
     """
     
-    def __init__(self, collection: AsyncIOMotorCollection):
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        rollups_collection: Optional[AsyncIOMotorCollection] = None,
+        versions_collection: Optional[AsyncIOMotorCollection] = None
+    ):
         """
         Inicializar operaciones de transacciones
         
         Args:
             collection: Colección MongoDB para transacciones
+            rollups_collection: Colección MongoDB para acumulados mensuales (opcional)
+            versions_collection: Colección MongoDB para versiones de datos (opcional)
         """
         self.collection = collection
+        self.rollups = RollupOperations(rollups_collection) if rollups_collection is not None else None
+        self.versions = DataVersionOperations(versions_collection) if versions_collection is not None else None
     
     async def create_transaction(self, user_id: str, transaction_data: TransactionCreate) -> TransactionResponse:
         """
@@ -61,9 +129,13 @@ class TransactionOperations:
             
             # Insertar en la base de datos
             result = await self.collection.insert_one(transaction_doc)
+            if self.rollups is not None:
+                await self.rollups.apply(transaction_doc)
+            if self.versions is not None:
+                await self.versions.bump(user_id)
             
             # Obtener la transacción creada
-            created_transaction = await self.collection.find_one({"_id": result.inserted_id})
+            created_transaction = await self.collection.find_one({"_id": result.inserted_id}, RESPONSE_PROJECTION)
             
             return self._document_to_response(created_transaction)
             
@@ -86,7 +158,7 @@ class TransactionOperations:
             transaction_doc = await self.collection.find_one({
                 "_id": ObjectId(transaction_id),
                 "user_id": user_id
-            })
+            }, RESPONSE_PROJECTION)
             
             return self._document_to_response(transaction_doc) if transaction_doc else None
             
@@ -116,58 +188,181 @@ class TransactionOperations:
             List[TransactionResponse]: Lista de transacciones
         """
         try:
-            # Construir filtro de consulta
-            query = {"user_id": user_id}
-            
-            if filters:
-                if filters.type:
-                    query["type"] = filters.type.value
-                if filters.category:
-                    query["category"] = {"$regex": filters.category, "$options": "i"}
-                if filters.date_from or filters.date_to:
-                    date_filter = {}
-                    if filters.date_from:
-                        date_filter["$gte"] = filters.date_from
-                    if filters.date_to:
-                        date_filter["$lte"] = filters.date_to
-                    query["date"] = date_filter
-                if filters.amount_min or filters.amount_max:
-                    amount_filter = {}
-                    if filters.amount_min:
-                        amount_filter["$gte"] = filters.amount_min
-                    if filters.amount_max:
-                        amount_filter["$lte"] = filters.amount_max
-                    query["amount"] = amount_filter
-            
-            # Construir ordenamiento
-            sort_criteria = []
-            if sort:
-                field_mapping = {
-                    "date": "date",
-                    "amount": "amount",
-                    "category": "category",
-                    "created_at": "created_at"
-                }
-                sort_field = field_mapping.get(sort.field, "date")
-                sort_order = 1 if sort.order == "asc" else -1
-                sort_criteria.append((sort_field, sort_order))
-            else:
-                # Ordenamiento por defecto: fecha descendente
-                sort_criteria.append(("date", -1))
-            
-            # Ejecutar consulta
-            cursor = self.collection.find(query).sort(sort_criteria).skip(skip).limit(limit)
-            transactions = []
-            
-            async for doc in cursor:
-                transactions.append(self._document_to_response(doc))
-            
-            return transactions
+            page = await self.get_user_transactions_page(
+                user_id, limit=limit, filters=filters, sort=sort, skip=skip
+            )
+            return page.transactions
             
         except Exception as e:
             logger.error(f"Error al obtener transacciones del usuario {user_id}: {e}")
             return []
     
+    async def get_user_transactions_page(
+        self,
+        user_id: str,
+        limit: int = 100,
+        filters: Optional[TransactionFilter] = None,
+        sort: Optional[TransactionSort] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        as_dicts: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> TransactionPage:
+        """
+        Obtener una página de transacciones con paginación por cursor (keyset)
+        
+        En lugar de saltar documentos con skip, el cursor guarda el valor del
+        campo de ordenamiento y el _id de la última transacción devuelta, y la
+        siguiente página continúa con un predicado de rango sobre el índice
+        {user_id, campo, _id}. Así la página 500 cuesta lo mismo que la 1.
+        
+        Args:
+            user_id: ID del usuario
+            limit: Límite de transacciones a devolver
+            filters: Filtros a aplicar
+            sort: Criterios de ordenamiento
+            cursor: Cursor devuelto por la página anterior (opcional)
+            skip: Número de transacciones a saltar (solo sin cursor)
+            as_dicts: Devolver diccionarios listos para serializar en vez de modelos
+            fields: Campos a devolver (solo con as_dicts; None para todos)
+            
+        Returns:
+            TransactionPage: Transacciones y cursor de la siguiente página
+            
+        Raises:
+            ValueError: Si el cursor es inválido o no corresponde al ordenamiento
+        """
+        query = self._build_query(user_id, filters)
+        
+        # Construir ordenamiento (con _id como desempate estable)
+        sort_field = SORT_FIELDS.get(sort.field, "date") if sort else "date"
+        sort_order = 1 if sort and sort.order == "asc" else -1
+        sort_criteria = [(sort_field, sort_order), ("_id", sort_order)]
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            if position["f"] != sort_field or position["o"] != sort_order:
+                raise ValueError("El cursor no corresponde al ordenamiento solicitado")
+            
+            # Continuar estrictamente después de la última transacción devuelta
+            operator = "$gt" if sort_order == 1 else "$lt"
+            query["$or"] = [
+                {sort_field: {operator: position["v"]}},
+                {sort_field: position["v"], "_id": {operator: position["id"]}}
+            ]
+        
+        # Ejecutar consulta pidiendo un documento extra para saber si hay más
+        # El campo de ordenamiento se lee siempre: lo necesita el cursor de la siguiente página
+        read_projection = {**projection(fields), sort_field: 1} if fields else RESPONSE_PROJECTION
+        db_cursor = self.collection.find(query, read_projection).sort(sort_criteria)
+        if skip and not cursor:
+            db_cursor = db_cursor.skip(skip)
+        docs = await db_cursor.limit(limit + 1).to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(sort_field, sort_order, last.get(sort_field), last["_id"])
+        
+        if as_dicts:
+            # Los diccionarios ya tienen la forma de TransactionResponse: no se validan de nuevo
+            return TransactionPage.model_construct(
+                transactions=[self._document_to_dict(doc, fields) for doc in docs],
+                next_cursor=next_cursor
+            )
+        
+        return TransactionPage(
+            transactions=[self._document_to_response(doc) for doc in docs],
+            next_cursor=next_cursor
+        )
+    
+    async def search_transactions(
+        self,
+        user_id: str,
+        query: str,
+        skip: int = 0,
+        limit: int = 50,
+        as_dicts: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> List[TransactionResponse]:
+        """
+        Buscar transacciones por texto en la base de datos
+        
+        Usa el índice de texto {user_id, description, category} con
+        stemming en español y ordena por relevancia (y luego por fecha).
+        Si el término es numérico también coincide con el monto exacto.
+        skip/limit se aplican sobre las coincidencias.
+        
+        Args:
+            user_id: ID del usuario
+            query: Término de búsqueda
+            skip: Número de coincidencias a saltar
+            limit: Límite de coincidencias a devolver
+            as_dicts: Devolver diccionarios listos para serializar en vez de modelos
+            fields: Campos a devolver (solo con as_dicts; None para todos)
+            
+        Returns:
+            List[TransactionResponse]: Transacciones ordenadas por relevancia
+        """
+        text_clause = {"$text": {"$search": query}}
+        
+        # Coincidencia exacta por monto si el término es un número ("50000", "$50.000")
+        try:
+            amount = parse_currency(query.strip())
+        except ValueError:
+            amount = None
+        
+        if amount is not None:
+            search_filter = {"user_id": user_id, "$or": [text_clause, {"amount": amount}]}
+        else:
+            search_filter = {"user_id": user_id, **text_clause}
+        
+        cursor = self.collection.find(
+            search_filter,
+            {**(projection(fields) if fields else RESPONSE_PROJECTION), "score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"}), ("date", -1)]).skip(skip).limit(limit)
+        
+        docs = await cursor.to_list(length=limit)
+        if as_dicts:
+            return [self._document_to_dict(doc, fields) for doc in docs]
+        return [self._document_to_response(doc) for doc in docs]
+    
+    def _build_query(self, user_id: str, filters: Optional[TransactionFilter] = None) -> Dict[str, Any]:
+        """
+        Construir el filtro de consulta de transacciones de un usuario
+        
+        Args:
+            user_id: ID del usuario
+            filters: Filtros a aplicar
+            
+        Returns:
+            dict: Filtro de MongoDB
+        """
+        query = {"user_id": user_id}
+        
+        if filters:
+            if filters.type:
+                query["type"] = filters.type.value
+            if filters.category:
+                query["category"] = {"$regex": filters.category, "$options": "i"}
+            if filters.date_from or filters.date_to:
+                date_filter = {}
+                if filters.date_from:
+                    date_filter["$gte"] = filters.date_from
+                if filters.date_to:
+                    date_filter["$lte"] = filters.date_to
+                query["date"] = date_filter
+            if filters.amount_min or filters.amount_max:
+                amount_filter = {}
+                if filters.amount_min:
+                    amount_filter["$gte"] = filters.amount_min
+                if filters.amount_max:
+                    amount_filter["$lte"] = filters.amount_max
+                query["amount"] = amount_filter
+        
+        return query
+    
     async def update_transaction(
         self, 
         transaction_id: str, 
@@ -200,20 +395,22 @@ class TransactionOperations:
             
             update_doc["updated_at"] = datetime.now()
             
-            # Actualizar en la base de datos
-            result = await self.collection.update_one(
+            # Actualizar en la base de datos conservando el documento anterior
+            previous_transaction = await self.collection.find_one_and_update(
                 {"_id": ObjectId(transaction_id), "user_id": user_id},
-                {"$set": update_doc}
+                {"$set": update_doc},
+                projection=RESPONSE_PROJECTION,
+                return_document=ReturnDocument.BEFORE
             )
             
-            if result.modified_count == 0:
+            if previous_transaction is None:
                 return None
             
-            # Obtener la transacción actualizada
-            updated_transaction = await self.collection.find_one({
-                "_id": ObjectId(transaction_id),
-                "user_id": user_id
-            })
+            updated_transaction = {**previous_transaction, **update_doc}
+            if self.rollups is not None:
+                await self.rollups.move(previous_transaction, updated_transaction)
+            if self.versions is not None:
+                await self.versions.bump(user_id)
             
             return self._document_to_response(updated_transaction)
             
@@ -233,12 +430,21 @@ class TransactionOperations:
             bool: True si se eliminó correctamente
         """
         try:
-            result = await self.collection.delete_one({
+            # Solo los campos que necesita el acumulado mensual
+            deleted_transaction = await self.collection.find_one_and_delete({
                 "_id": ObjectId(transaction_id),
                 "user_id": user_id
-            })
+            }, projection={"user_id": 1, "type": 1, "category": 1, "amount": 1, "date": 1})
+            
+            if deleted_transaction is None:
+                return False
+            
+            if self.rollups is not None:
+                await self.rollups.apply(deleted_transaction, -1)
+            if self.versions is not None:
+                await self.versions.bump(user_id)
             
-            return result.deleted_count > 0
+            return True
             
         except Exception as e:
             logger.error(f"Error al eliminar transacción {transaction_id}: {e}")
@@ -272,45 +478,48 @@ class TransactionOperations:
                     date_range["$lte"] = date_to
                 date_filter["date"] = date_range
             
-            # Pipeline de agregación
+            # Una sola pasada: totales, conteos y extremos por tipo
             pipeline = [
                 {"$match": date_filter},
                 {
                     "$group": {
                         "_id": "$type",
                         "total_amount": {"$sum": "$amount"},
-                        "count": {"$sum": 1}
+                        "count": {"$sum": 1},
+                        "min_amount": {"$min": "$amount"},
+                        "max_amount": {"$max": "$amount"}
                     }
                 }
             ]
             
             # Ejecutar agregación
             results = await self.collection.aggregate(pipeline).to_list(length=None)
+            by_type = {result["_id"]: result for result in results}
             
             # Procesar resultados
-            total_income = 0.0
-            total_expense = 0.0
-            income_count = 0
-            expense_count = 0
-            
-            for result in results:
-                if result["_id"] == "income":
-                    total_income = result["total_amount"]
-                    income_count = result["count"]
-                elif result["_id"] == "expense":
-                    total_expense = result["total_amount"]
-                    expense_count = result["count"]
-            
-            # Obtener total de transacciones
-            total_count = await self.collection.count_documents(date_filter)
+            income = by_type.get("income", {})
+            expense = by_type.get("expense", {})
+            goal_contribution = by_type.get("goal_contribution", {})
+            
+            total_income = income.get("total_amount", 0.0)
+            total_expense = expense.get("total_amount", 0.0)
+            
+            # Totales generales a partir de los grupos (sin volver a contar)
+            total_count = sum(result["count"] for result in results)
+            total_amount = sum(result["total_amount"] for result in results)
             
             return TransactionStats(
                 total_income=total_income,
                 total_expense=total_expense,
                 balance=total_income - total_expense,
                 transaction_count=total_count,
-                income_count=income_count,
-                expense_count=expense_count,
+                income_count=income.get("count", 0),
+                expense_count=expense.get("count", 0),
+                total_goal_contributions=goal_contribution.get("total_amount", 0.0),
+                goal_contribution_count=goal_contribution.get("count", 0),
+                min_amount=min((result["min_amount"] for result in results), default=0.0),
+                max_amount=max((result["max_amount"] for result in results), default=0.0),
+                average_amount=total_amount / total_count if total_count else 0.0,
                 period_start=date_from,
                 period_end=date_to
             )
@@ -366,3 +575,32 @@ class TransactionOperations:
             updated_at=doc.get("updated_at"),
             currency=doc.get("currency", "COP")
         )
+    
+    @staticmethod
+    def _document_to_dict(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Convertir documento MongoDB a un diccionario con la forma de TransactionResponse
+        
+        Ruta rápida de los listados: evita construir y validar un modelo por
+        documento; la respuesta se serializa directamente con orjson.
+        
+        Args:
+            doc: Documento de MongoDB (con RESPONSE_PROJECTION o la de fields)
+            fields: Campos a devolver además de id (None para todos)
+            
+        Returns:
+            dict: Transacción lista para serializar
+        """
+        amount = doc.get("amount")
+        return select_fields({
+            "id": str(doc["_id"]),
+            "user_id": doc.get("user_id"),
+            "type": doc.get("type"),
+            "amount": float(amount) if amount is not None else None,
+            "category": doc.get("category"),
+            "description": doc.get("description"),
+            "date": doc.get("date"),
+            "created_at": doc.get("created_at"),
+            "updated_at": doc.get("updated_at"),
+            "currency": doc.get("currency", "COP")
+        }, fields)
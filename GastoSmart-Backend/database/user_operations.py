@@ -8,24 +8,48 @@ relacionadas con los usuarios en la base de datos MongoDB.
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from typing import Optional, List
-from datetime import datetime
-import bcrypt
+from datetime import datetime, timedelta
+from services.password_hasher import password_hasher
+from services.token_revocation import revocation_list
+from services.auth_service import ACCESS_TOKEN_EXPIRE_HOURS
+from services.user_cache import user_cache
+from database.projections import projection, select_fields
 from models.user import User, UserCreate, UserResponse, UserLogin, BudgetUpdate, VerificationCodeRequest, VerificationCodeConfirm
 
+# Campos que expone UserResponse; el resto del documento no se lee
+USER_RESPONSE_PROJECTION = {
+    "first_name": 1, "last_name": 1, "email": 1, "initial_budget": 1, "budget_period": 1,
+    "budget_configured": 1, "registration_date": 1, "is_active": 1, "email_verified": 1,
+    "last_access": 1, "currency": 1, "timezone": 1
+}
+
+# El login necesita además la contraseña y el estado de bloqueo
+LOGIN_PROJECTION = {**USER_RESPONSE_PROJECTION, "password": 1, "failed_login_attempts": 1, "locked_until": 1}
+
 class UserOperations:
     """
     Clase para manejar operaciones de usuarios en la base de datos
     """
     
-    def __init__(self, database: AsyncIOMotorDatabase):
+    def __init__(self, database: AsyncIOMotorDatabase, email_service=None):
         """
         Inicializar operaciones de usuario
         
         Args:
             database: Instancia de la base de datos MongoDB
+            email_service: EmailService compartido (se crea al primer uso si no se pasa)
         """
         self.database = database
         self.collection = database.users  # Colección 'users'
+        self._email_service = email_service
+    
+    @property
+    def email_service(self):
+        """EmailService de estas operaciones (uno solo por instancia)"""
+        if self._email_service is None:
+            from services.email_service import EmailService
+            self._email_service = EmailService(self.database)
+        return self._email_service
     
     async def create_user(self, user_data: UserCreate) -> UserResponse:
         """
@@ -43,13 +67,13 @@ class UserOperations:
         # Verificar si el correo ya existe
         existing_user = await self.collection.find_one({
             "email": user_data.email
-        })
+        }, {"_id": 1})
         
         if existing_user:
             raise ValueError("El correo electrónico ya está registrado")
         
         # Encriptar contraseña
-        hashed_password = self._hash_password(user_data.password)
+        hashed_password = await self._hash_password(user_data.password)
         
         # Crear documento de usuario (INACTIVO hasta verificar email)
         user_doc = {
@@ -72,7 +96,7 @@ class UserOperations:
         result = await self.collection.insert_one(user_doc)
         
         # Obtener el usuario creado
-        created_user = await self.collection.find_one({"_id": result.inserted_id})
+        created_user = await self.collection.find_one({"_id": result.inserted_id}, USER_RESPONSE_PROJECTION)
         
         return self._user_doc_to_response(created_user)
     
@@ -89,7 +113,7 @@ class UserOperations:
         user_doc = await self.collection.find_one({
             "email": email,
             "is_active": True
-        })
+        }, USER_RESPONSE_PROJECTION)
         
         if user_doc:
             return self._user_doc_to_response(user_doc)
@@ -107,7 +131,7 @@ class UserOperations:
         """
         user_doc = await self.collection.find_one({
             "email": email
-        })
+        }, USER_RESPONSE_PROJECTION)
         
         if user_doc:
             return self._user_doc_to_response(user_doc)
@@ -124,12 +148,9 @@ class UserOperations:
             UserResponse o None si no se encuentra
         """
         try:
-            user_doc = await self.collection.find_one({
-                "_id": ObjectId(user_id),
-                "is_active": True
-            })
+            user_doc = await user_cache.get(self.collection, user_id)
             
-            if user_doc:
+            if user_doc and user_doc.get("is_active") is True:
                 return self._user_doc_to_response(user_doc)
             return None
         except Exception:
@@ -153,7 +174,7 @@ class UserOperations:
         # Buscar usuario por correo (incluyendo inactivos para verificar bloqueo)
         user_doc = await self.collection.find_one({
             "email": login_data.email
-        })
+        }, LOGIN_PROJECTION)
         
         if not user_doc:
             print(f"[DEBUG] User does not exist in database")
@@ -186,7 +207,7 @@ class UserOperations:
         print(f"[DEBUG] User is_active: {user_doc.get('is_active')}, email_verified: {user_doc.get('email_verified')}")
         
         # Verificar contraseña
-        password_valid = self._verify_password(login_data.password, user_doc["password"])
+        password_valid = await self._verify_password(login_data.password, user_doc["password"])
         print(f"[DEBUG] Password valid: {password_valid}")
         
         if password_valid:
@@ -199,6 +220,7 @@ class UserOperations:
                     "locked_until": None
                 }}
             )
+            user_cache.invalidate(str(user_doc["_id"]))
             
             return self._user_doc_to_response(user_doc)
         else:
@@ -254,6 +276,7 @@ class UserOperations:
                     }
                 }
             )
+            user_cache.invalidate(user_id)
             
             if result.modified_count > 0:
                 return await self.get_user_by_id(user_id)
@@ -279,6 +302,7 @@ class UserOperations:
                     "email_verified": True
                 }}
             )
+            user_cache.invalidate_email(email)
             return result.modified_count > 0
         except Exception:
             return False
@@ -298,26 +322,43 @@ class UserOperations:
                 {"_id": ObjectId(user_id)},
                 {"$set": {"is_active": False}}
             )
-            return result.modified_count > 0
+            user_cache.invalidate(user_id)
+            if result.modified_count == 0:
+                return False
+            
+            # Invalidar los tokens ya emitidos (el modo sin estado no relee el usuario)
+            await revocation_list.revoke_user(self.database, user_id, timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS))
+            return True
         except Exception:
             return False
     
-    async def get_all_users(self, skip: int = 0, limit: int = 100) -> List[UserResponse]:
+    async def get_all_users(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[List[str]] = None
+    ) -> List[UserResponse]:
         """
         Obtener todos los usuarios (con paginación)
         
         Args:
             skip: Número de usuarios a saltar
             limit: Límite de usuarios a devolver
+            fields: Campos a devolver además de id; con fields se devuelven
+                    diccionarios con solo esos campos en vez de modelos
             
         Returns:
             Lista de usuarios
         """
-        cursor = self.collection.find({"is_active": True}).skip(skip).limit(limit)
+        read_projection = projection(fields) if fields else USER_RESPONSE_PROJECTION
+        cursor = self.collection.find({"is_active": True}, read_projection).skip(skip).limit(limit)
         users = []
         
         async for user_doc in cursor:
-            users.append(self._user_doc_to_response(user_doc))
+            if fields:
+                users.append(select_fields({"id": str(user_doc["_id"]), **user_doc}, fields))
+            else:
+                users.append(self._user_doc_to_response(user_doc))
         
         return users
     
@@ -325,19 +366,20 @@ class UserOperations:
         """
         Enviar código de verificación por correo
         
+        El correo se entrega en segundo plano (ver services/email_queue.py);
+        el estado de entrega queda en el documento del código.
+        
         Args:
             email: Correo electrónico del usuario
             purpose: Propósito del código ('registration' o 'password_recovery')
             user_name: Nombre del usuario (opcional)
             
         Returns:
-            bool: True si se envió correctamente
+            bool: True si el correo quedó en cola de envío
         """
         try:
-            from services.email_service import EmailService
-            email_service = EmailService(self.database)
-            code = await email_service.generate_verification_code(email, purpose)
-            return await email_service.send_verification_email(email, code, purpose, user_name)
+            code_id, code = await self.email_service.create_verification_code(email, purpose)
+            return await self.email_service.send_verification_email(email, code, purpose, user_name, code_id)
         except Exception:
             return False
     
@@ -354,9 +396,7 @@ class UserOperations:
             dict: {"valid": bool, "message": str, "attempts_left": int}
         """
         try:
-            from services.email_service import EmailService
-            email_service = EmailService(self.database)
-            result = await email_service.verify_code(email, code, purpose)
+            result = await self.email_service.verify_code(email, code, purpose)
             
             # Si la verificación es exitosa y es para registro, activar la cuenta
             if result["valid"] and purpose == "registration":
@@ -392,6 +432,7 @@ class UserOperations:
                     }
                 }
             )
+            user_cache.invalidate_email(email)
             return result.modified_count > 0
         except Exception:
             return False
@@ -411,7 +452,7 @@ class UserOperations:
             print(f"[DEBUG] Updating password for email: {email}")
             
             # Encriptar la nueva contraseña
-            hashed_password = self._hash_password(new_password)
+            hashed_password = await self._hash_password(new_password)
             print(f"[DEBUG] Password hashed successfully")
             
             # Actualizar la contraseña y activar la cuenta en la base de datos
@@ -426,15 +467,16 @@ class UserOperations:
                     }
                 }
             )
+            user_cache.invalidate_email(email)
             print(f"[DEBUG] Update result - matched: {result.matched_count}, modified: {result.modified_count}")
             return result.modified_count > 0
         except Exception as e:
             print(f"[DEBUG] Exception in update_password: {str(e)}")
             return False
     
-    def _hash_password(self, password: str) -> str:
+    async def _hash_password(self, password: str) -> str:
         """
-        Encriptar contraseña usando bcrypt
+        Encriptar contraseña usando bcrypt (en el pool de hilos, sin bloquear el event loop)
         
         Args:
             password: Contraseña en texto plano
@@ -442,13 +484,11 @@ class UserOperations:
         Returns:
             Contraseña encriptada
         """
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return await password_hasher.hash_password(password)
     
-    def _verify_password(self, password: str, hashed_password: str) -> bool:
+    async def _verify_password(self, password: str, hashed_password: str) -> bool:
         """
-        Verificar contraseña
+        Verificar contraseña (en el pool de hilos, sin bloquear el event loop)
         
         Args:
             password: Contraseña en texto plano
@@ -457,7 +497,7 @@ class UserOperations:
         Returns:
             True si la contraseña es correcta
         """
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return await password_hasher.verify_password(password, hashed_password)
     
     def _user_doc_to_response(self, user_doc: dict) -> UserResponse:
         """
@@ -5,12 +5,17 @@ Este archivo contiene las operaciones de base de datos para gestionar
 la información básica del perfil de usuario en GastoSmart.
 """
 
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional, Dict, Any
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridOut
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 from bson import ObjectId
 import re
 
+from services.user_cache import user_cache
+from services.profile_pictures import (
+    PROFILE_PICTURE_SIZES, is_external_url, decode_picture, content_hash, thumbnail_renderer
+)
+from database.profile_picture_operations import ProfilePictureOperations, thumbnail_url
 from models.user_settings import (
     UserSettingsUpdate, UserSettingsResponse, UserProfilePictureUpdate,
     UserSettingsValidation
@@ -23,6 +28,14 @@ class UserSettingsOperations:
         self.db = db
         self.users_collection = db.users
         self.user_settings_collection = db.user_settings
+        self._pictures = None
+    
+    @property
+    def pictures(self) -> ProfilePictureOperations:
+        """Operaciones de fotos en GridFS (el bucket se crea al primer uso)"""
+        if self._pictures is None:
+            self._pictures = ProfilePictureOperations(self.db)
+        return self._pictures
     
     async def get_user_settings(self, user_id: str) -> Optional[UserSettingsResponse]:
         """
@@ -35,12 +48,22 @@ class UserSettingsOperations:
             UserSettingsResponse: Información del usuario o None si no existe
         """
         try:
-            user = await self.users_collection.find_one({"_id": ObjectId(user_id)})
+            user = await user_cache.get(self.users_collection, user_id)
             if not user:
                 return None
             
             # Obtener configuración adicional si existe
-            settings = await self.user_settings_collection.find_one({"user_id": user_id})
+            settings = await self.user_settings_collection.find_one(
+                {"user_id": user_id}, {"profile_picture": 1, "profile_picture_hash": 1}
+            ) or {}
+            
+            # Las fotos subidas se sirven como miniaturas; las URLs externas se devuelven tal cual
+            picture_hash = settings.get("profile_picture_hash")
+            if picture_hash:
+                profile_picture = thumbnail_url(picture_hash, PROFILE_PICTURE_SIZES[-1])
+                profile_picture_thumbnail = thumbnail_url(picture_hash, PROFILE_PICTURE_SIZES[0])
+            else:
+                profile_picture = profile_picture_thumbnail = settings.get("profile_picture")
             
             return UserSettingsResponse(
                 id=str(user["_id"]),
@@ -51,7 +74,8 @@ class UserSettingsOperations:
                 country=user.get("country", "Colombia"),
                 country_code=user.get("country_code", "+57"),
                 is_verified=user.get("is_verified", False),
-                profile_picture=settings.get("profile_picture") if settings else None,
+                profile_picture=profile_picture,
+                profile_picture_thumbnail=profile_picture_thumbnail,
                 created_at=user.get("created_at", datetime.now()),
                 updated_at=user.get("updated_at")
             )
@@ -92,6 +116,7 @@ class UserSettingsOperations:
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
+            user_cache.invalidate(user_id)
             
             return result.modified_count > 0
             
@@ -103,31 +128,132 @@ class UserSettingsOperations:
         """
         Actualiza la foto de perfil del usuario
         
+        Las imágenes en base64 se reducen a miniaturas que se guardan en GridFS;
+        en `user_settings` solo queda el hash del contenido. Las URLs externas
+        se guardan como referencia.
+        
         Args:
             user_id: ID del usuario
             picture_update: Datos de la nueva foto
             
         Returns:
             bool: True si se actualizó correctamente, False en caso contrario
+            
+        Raises:
+            ValueError: Si la foto no es una URL ni una imagen válida
         """
+        value = picture_update.profile_picture.strip()
+        data = None
+        if is_external_url(value):
+            update = {"$set": {"profile_picture": value}, "$unset": {"profile_picture_hash": ""}}
+        else:
+            data = decode_picture(value)
+            picture_hash = await self.store_picture(user_id, data)
+            update = {"$set": {"profile_picture_hash": picture_hash}, "$unset": {"profile_picture": ""}}
+        update["$set"]["updated_at"] = datetime.now()
+        
         try:
             # Actualizar o crear configuración de usuario
-            await self.user_settings_collection.update_one(
+            previous = await self.user_settings_collection.find_one_and_update(
                 {"user_id": user_id},
-                {
-                    "$set": {
-                        "profile_picture": picture_update.profile_picture,
-                        "updated_at": datetime.now()
-                    }
-                },
+                update,
+                projection={"profile_picture_hash": 1},
                 upsert=True
             )
-            
-            return True
-            
         except Exception as e:
             print(f"Error al actualizar foto de perfil: {e}")
             return False
+        
+        if data is not None:
+            # Otro usuario pudo dejar esta misma foto y eliminar sus miniaturas entre
+            # store_picture y el guardado; ahora que la referencia existe, volver a
+            # comprobarlas (las marcadas para eliminar cuentan como ausentes)
+            await self.store_picture(user_id, data)
+        
+        previous_hash = (previous or {}).get("profile_picture_hash")
+        if previous_hash and previous_hash != update["$set"].get("profile_picture_hash"):
+            await self._delete_unreferenced_picture(previous_hash)
+        return True
+    
+    async def store_picture(self, user_id: str, data: bytes) -> str:
+        """
+        Generar y guardar las miniaturas de una imagen (si no existen ya)
+        
+        Args:
+            user_id: ID del usuario
+            data: Imagen original
+            
+        Returns:
+            str: Hash del contenido
+            
+        Raises:
+            ValueError: Si el contenido no es una imagen válida
+        """
+        picture_hash = content_hash(data)
+        missing = await self.pictures.missing_sizes(picture_hash)
+        if missing:
+            thumbnails = await thumbnail_renderer.render(data, tuple(missing))
+            await self.pictures.save_thumbnails(picture_hash, user_id, thumbnails)
+        return picture_hash
+    
+    async def _delete_unreferenced_picture(self, picture_hash: str) -> None:
+        """
+        Eliminar las miniaturas de una foto que ya no usa ningún usuario
+        
+        Las miniaturas se marcan antes de comprobar las referencias: quien guarde
+        la foto después de la comprobación las verá marcadas y las volverá a
+        subir (ver update_profile_picture), así que no queda apuntando a
+        archivos eliminados.
+        """
+        try:
+            mark, file_ids = await self.pictures.mark_for_deletion(picture_hash)
+            in_use = await self.user_settings_collection.find_one({"profile_picture_hash": picture_hash}, {"_id": 1})
+            if in_use:
+                await self.pictures.unmark(mark, file_ids)
+            else:
+                await self.pictures.delete_marked(mark, file_ids)
+        except Exception as e:
+            print(f"Error al eliminar foto de perfil anterior: {e}")
+    
+    async def open_thumbnail(self, picture_hash: str, size: int) -> Optional[Tuple[AsyncIOMotorGridOut, int]]:
+        """
+        Abrir una miniatura, con alternativa si ese tamaño no está guardado
+        
+        Las fotos subidas antes de cambiar PROFILE_PICTURE_SIZES no tienen los
+        tamaños nuevos: si se pide un tamaño configurado menor que alguno
+        guardado, se genera a partir del mayor y se guarda; si no, se sirve el
+        tamaño guardado más cercano (preferiblemente mayor).
+        
+        Args:
+            picture_hash: Hash del contenido original
+            size: Lado pedido
+            
+        Returns:
+            tuple: Archivo y lado de la miniatura servida, o None si la foto no existe
+        """
+        grid_out = await self.pictures.open_thumbnail(picture_hash, size)
+        if grid_out is not None:
+            return grid_out, size
+        
+        stored = await self.pictures.stored_sizes(picture_hash)
+        if not stored:
+            return None
+        
+        if size in PROFILE_PICTURE_SIZES and stored[-1] > size:
+            source = await self.pictures.open_thumbnail(picture_hash, stored[-1])
+            if source is not None:
+                try:
+                    thumbnails = await thumbnail_renderer.render(await source.read(), (size,))
+                    await self.pictures.save_thumbnails(picture_hash, (source.metadata or {}).get("user_id"), thumbnails)
+                except ValueError as e:
+                    print(f"Error al generar miniatura de {picture_hash}: {e}")
+                grid_out = await self.pictures.open_thumbnail(picture_hash, size)
+                if grid_out is not None:
+                    return grid_out, size
+        
+        nearest = min(stored, key=lambda stored_size: (stored_size < size, abs(stored_size - size)))
+        grid_out = await self.pictures.open_thumbnail(picture_hash, nearest)
+        return (grid_out, nearest) if grid_out is not None else None
     
     async def validate_field(self, field_name: str, field_value: str) -> Dict[str, Any]:
         """
@@ -1,13 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import os
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import uvicorn
 # Importar conexión a MongoDB
-from database.connection import connect_to_mongo, close_mongo_connection
+from database.connection import connect_to_mongo, close_mongo_connection, get_async_database
+from database.indexes import ensure_indexes
+from database.rollup_operations import RollupOperations
+from services.app_services import AppServices
+from services.password_hasher import password_hasher
+from services.email_queue import email_queue
+from services.profile_pictures import thumbnail_renderer
+from services.static_assets import static_assets
+from services.token_revocation import revocation_list
+from middleware import RequestLoggingMiddleware, MetricsMiddleware, CompressionMiddleware
+from services.metrics import registry as metrics_registry
+from middleware.request_logging import start_request_log_listener, stop_request_log_listener
+import asyncio
 
 # Cargar variables de entorno
 load_dotenv()
@@ -16,10 +26,28 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     """Manejar el ciclo de vida de la aplicación"""
     # Startup
+    start_request_log_listener()
+    # Frontend compilado en memoria con variantes precomprimidas (vacío en desarrollo)
+    await asyncio.to_thread(static_assets.load)
     await connect_to_mongo()
+    db = await get_async_database()
+    await ensure_indexes(db)
+    # Primer despliegue de los acumulados: generarlos antes de servir reportes
+    await RollupOperations(db.monthly_rollups).ensure_backfilled(db.transactions)
+    # Operaciones compartidas por todas las peticiones (ver get_services)
+    app.state.services = AppServices(db)
+    email_queue.start()
+    await revocation_list.refresh(db)
+    revocation_task = asyncio.create_task(revocation_list.run_refresh_loop(db))
     yield
     # Shutdown
+    revocation_task.cancel()
+    # Antes de cerrar MongoDB: los envíos en curso registran su estado
+    await email_queue.stop()
     await close_mongo_connection()
+    password_hasher.shutdown()
+    thumbnail_renderer.shutdown()
+    stop_request_log_listener()
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -29,26 +57,6 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Middleware de logging para debugging
-from fastapi import Request
-import time
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    print(f"\n{'='*80}")
-    print(f"[REQUEST] {request.method} {request.url.path}")
-    print(f"[HEADERS] Authorization: {'Present' if 'authorization' in request.headers else 'Missing'}")
-    print(f"[HEADERS] Origin: {request.headers.get('origin', 'N/A')}")
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    print(f"[RESPONSE] Status: {response.status_code} | Time: {process_time:.2f}s")
-    print(f"{'='*80}\n")
-    
-    return response
-
 # Configurar CORS de forma explícita para desarrollo
 app.add_middleware(
     CORSMiddleware,
@@ -56,21 +64,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    expose_headers=["*", "X-Next-Cursor"],
     max_age=3600,
 )
 
-# NOTA: En modo desarrollo, Vite maneja los archivos estáticos
-# Solo servir archivos estáticos en producción
-if os.path.exists("../Front-end/dist"):
-    app.mount("/assets", StaticFiles(directory="../Front-end/dist/assets"), name="assets")
+# Compresión gzip/br/zstd de respuestas grandes; queda dentro del registro y las
+# métricas para que su costo se incluya en la duración medida
+app.add_middleware(CompressionMiddleware)
+
+# Registro de peticiones (método, ruta, estado y duración); se añade después de
+# CORS para quedar como capa externa y medir también las respuestas preflight
+app.add_middleware(RequestLoggingMiddleware)
+
+# Métricas por ruta y estado (expuestas en /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# NOTA: En modo desarrollo, Vite maneja los archivos estáticos. En producción
+# el build se sirve desde memoria (services/static_assets.py), cargado al iniciar
 
 # Ruta para servir el frontend React (solo en producción)
 @app.get("/")
-async def read_index():
-    if os.path.exists("../Front-end/dist/index.html"):
-        from fastapi.responses import FileResponse
-        return FileResponse("../Front-end/dist/index.html")
+async def read_index(request: Request):
+    if static_assets.index is not None:
+        return static_assets.index.response(request)
     else:
         return {"message": "Frontend en modo desarrollo. Accede a http://localhost:3000"}
 
@@ -82,6 +98,7 @@ from routers.transactions import router as transactions_router
 from routers.goals import router as goals_router
 from routers.reports import router as reports_router
 from routers.user_settings import router as user_settings_router
+from routers.admin import router as admin_router, require_admin_token, require_metrics_access
 
 # Incluir routers en la aplicación
 app.include_router(users_router)
@@ -89,6 +106,7 @@ app.include_router(transactions_router)
 app.include_router(goals_router)
 app.include_router(reports_router)
 app.include_router(user_settings_router)
+app.include_router(admin_router)
 
 # Ruta de prueba
 @app.get("/api/test")
@@ -109,6 +127,27 @@ async def list_routes():
             })
     return {"total_routes": len(routes), "routes": routes}
 
+# Ruta de debug con las estadísticas de las cachés en memoria del proceso (requiere X-Admin-Token)
+@app.get("/api/debug/cache-stats", dependencies=[Depends(require_admin_token)])
+async def cache_stats():
+    """Aciertos y fallos de las cachés de usuarios y reportes, y métricas del pool de bcrypt y de la cola de correos"""
+    from services.user_cache import user_cache
+    from services.report_cache import report_cache
+    
+    return {
+        "users": user_cache.stats(),
+        "reports": report_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "email_queue": email_queue.stats()
+    }
+
+# Métricas del proceso en formato Prometheus (peticiones, comandos de MongoDB y pool);
+# Prometheus envía X-Admin-Token con http_headers en la configuración del scrape
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """Exposición de métricas en texto para Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Ruta para obtener configuración regional
 @app.get("/api/config/regional")
 async def get_regional_config():
@@ -136,24 +175,23 @@ async def get_regional_config():
 # Ruta catch-all para servir archivos del frontend React (DEBE ir al final)
 # IMPORTANTE: Excluir rutas de API para evitar conflictos
 @app.get("/{path:path}")
-async def read_frontend(path: str):
+async def read_frontend(path: str, request: Request):
     # NO capturar rutas de API - dejar que los routers las manejen
     if path.startswith('api/'):
         # Si llegamos aquí, la ruta API no existe - retornar 404
         raise HTTPException(status_code=404, detail=f"API endpoint not found: /{path}")
     
-    # Si es un archivo estático (JS, CSS, imágenes, etc.) - solo en producción
+    # Archivo del build (JS, CSS, imágenes, etc.) - solo en producción
+    asset = static_assets.get(path)
+    if asset is not None:
+        return asset.response(request)
     if path.startswith('assets/') or path.endswith(('.js', '.css', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.woff', '.woff2', '.ttf', '.eot')):
-        static_path = f"../Front-end/dist/{path}"
-        if os.path.exists(static_path):
-            return FileResponse(static_path)
-        else:
-            # En desarrollo, Vite maneja los assets
-            raise HTTPException(status_code=404, detail=f"Asset not found: {path}")
+        # En desarrollo, Vite maneja los assets
+        raise HTTPException(status_code=404, detail=f"Asset not found: {path}")
     
     # Para todas las demás rutas, servir el index.html de React (solo en producción)
-    if os.path.exists("../Front-end/dist/index.html"):
-        return FileResponse("../Front-end/dist/index.html")
+    if static_assets.index is not None:
+        return static_assets.index.response(request)
     else:
         # En desarrollo, redirigir a Vite
         return {"message": "Accede a http://localhost:3000 para el frontend en desarrollo"}
@@ -0,0 +1,12 @@
+"""
+Paquete de Middlewares ASGI para GastoSmart
+
+Middlewares implementados directamente sobre la interfaz ASGI (sin
+BaseHTTPMiddleware) para no añadir tareas ni streams por petición.
+"""
+
+from .request_logging import RequestLoggingMiddleware
+from .metrics import MetricsMiddleware
+from .compression import CompressionMiddleware
+
+__all__ = ["RequestLoggingMiddleware", "MetricsMiddleware", "CompressionMiddleware"]
@@ -0,0 +1,212 @@
+"""
+Middleware ASGI de compresión de respuestas
+
+Los reportes completos, los listados de 1000 transacciones y los reportes
+guardados son JSON grandes y muy repetitivos. Este middleware los comprime
+con la codificación que acepte el cliente (zstd, br o gzip, según
+disponibilidad y preferencia), solo a partir de un tamaño mínimo y con
+niveles configurables. Los cuerpos muy grandes se comprimen en un hilo para
+no bloquear el event loop.
+
+No se tocan las respuestas que ya traen Content-Encoding (p. ej. el frontend
+precomprimido), las de tipos no comprimibles ni las respuestas en streaming.
+brotli y zstandard son opcionales.
+"""
+
+import os
+import gzip
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from services.static_assets import parse_accept_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tamaño mínimo del cuerpo para comprimir (por debajo no compensa)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Niveles por codificación (velocidad frente a tamaño para contenido dinámico)
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# A partir de este tamaño la compresión se ejecuta en un hilo
+COMPRESSION_THREAD_MIN_BYTES = int(os.getenv("COMPRESSION_THREAD_MIN_BYTES", str(256 * 1024)))
+
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"image/svg+xml", b"application/xml")
+
+def compressors(
+    gzip_level: int = COMPRESSION_GZIP_LEVEL,
+    brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+    zstd_level: int = COMPRESSION_ZSTD_LEVEL,
+) -> Dict[str, Callable[[bytes], bytes]]:
+    """
+    Funciones de compresión disponibles, en orden de preferencia del servidor
+
+    Args:
+        gzip_level: Nivel de gzip (1-9)
+        brotli_quality: Calidad de brotli (0-11)
+        zstd_level: Nivel de zstd (1-22)
+
+    Returns:
+        dict: Codificación -> función de compresión
+    """
+    available = {}
+    if zstandard is not None:
+        # ZstdCompressor no es seguro entre hilos: uno por respuesta
+        available["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    if brotli is not None:
+        available["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    available["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return available
+
+def choose_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Elegir la codificación de mayor q aceptada por el cliente
+
+    Args:
+        accept_encoding: Header Accept-Encoding
+        available: Codificaciones del servidor en orden de preferencia
+
+    Returns:
+        str: Codificación elegida, o None para no comprimir
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI puro que comprime respuestas completas según Accept-Encoding
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        zstd_level: int = COMPRESSION_ZSTD_LEVEL,
+        thread_min_size: int = COMPRESSION_THREAD_MIN_BYTES,
+    ):
+        """
+        Inicializar el middleware
+
+        Args:
+            app: Aplicación ASGI envuelta
+            minimum_size: Bytes mínimos del cuerpo para comprimir
+            gzip_level: Nivel de gzip
+            brotli_quality: Calidad de brotli
+            zstd_level: Nivel de zstd
+            thread_min_size: Bytes a partir de los cuales se comprime en un hilo
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_min_size = thread_min_size
+        self.compressors = compressors(gzip_level, brotli_quality, zstd_level)
+        self.encodings = list(self.compressors)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                passthrough = not _compressible(message["headers"])
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Respuesta en streaming: se envía sin comprimir
+                passthrough = True
+                await send(_with_vary(start_message))
+                await send(message)
+                return
+
+            headers = [
+                (name, value) for name, value in start_message["headers"]
+                if name not in (b"content-length", b"vary", b"etag")
+            ]
+            original = dict(start_message["headers"])
+            headers.append((b"vary", _vary(original.get(b"vary"))))
+
+            if len(body) >= self.minimum_size:
+                compress = self.compressors[encoding]
+                if len(body) >= self.thread_min_size:
+                    body = await asyncio.to_thread(compress, body)
+                else:
+                    body = compress(body)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if b"etag" in original:
+                    # Los bytes cambian: el ETag fuerte pasa a débil
+                    headers.append((b"etag", _weak_etag(original[b"etag"])))
+            elif b"etag" in original:
+                headers.append((b"etag", original[b"etag"]))
+
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+def _compressible(headers) -> bool:
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value
+    return content_type.startswith(_COMPRESSIBLE_TYPES)
+
+def _vary(current: Optional[bytes]) -> bytes:
+    if not current:
+        return b"Accept-Encoding"
+    if b"accept-encoding" in current.lower():
+        return current
+    return current + b", Accept-Encoding"
+
+def _with_vary(message: Dict) -> Dict:
+    headers = [(name, value) for name, value in message["headers"] if name != b"vary"]
+    headers.append((b"vary", _vary(dict(message["headers"]).get(b"vary"))))
+    return {**message, "headers": headers}
+
+def _weak_etag(etag: bytes) -> bytes:
+    return etag if etag.startswith(b"W/") else b"W/" + etag
@@ -0,0 +1,49 @@
+"""
+Middleware ASGI de métricas HTTP
+
+Alimenta los contadores e histogramas de services.metrics con el método, la
+plantilla de ruta, el estado y la duración de cada petición.
+"""
+
+import time
+
+from services.metrics import observe_request, http_requests_in_flight
+
+# Etiqueta para peticiones que no coinciden con ninguna ruta (evita una serie por URL)
+UNMATCHED_ROUTE = "unmatched"
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro que registra métricas de cada petición HTTP
+    """
+
+    def __init__(self, app):
+        """
+        Inicializar el middleware
+
+        Args:
+            app: Aplicación ASGI envuelta
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            observe_request(scope.get("method", ""), route, status_code, time.perf_counter() - start)
@@ -0,0 +1,135 @@
+"""
+Middleware ASGI de registro y tiempos de peticiones
+
+Registra método, plantilla de ruta (p. ej. /api/goals/{goal_id}), código de
+estado y duración de cada petición. Los registros se encolan con un
+QueueHandler y un QueueListener los escribe desde otro hilo, de modo que el
+event loop nunca espera por la salida estándar. Se puede muestrear una
+fracción de las peticiones o registrar solo las lentas.
+"""
+
+import os
+import sys
+import time
+import queue
+import random
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Configuración por variables de entorno
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "1.0"))
+REQUEST_LOG_SLOW_ONLY = os.getenv("REQUEST_LOG_SLOW_ONLY", "false").lower() in ("1", "true", "yes")
+REQUEST_LOG_SLOW_MS = float(os.getenv("REQUEST_LOG_SLOW_MS", "500"))
+
+# Registros pendientes de escribir; si la cola se llena se descartan
+REQUEST_LOG_QUEUE_SIZE = 10000
+
+request_logger = logging.getLogger("gastosmart.requests")
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta registros cuando la cola está llena en vez de bloquear"""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(REQUEST_LOG_QUEUE_SIZE)
+_listener: Optional[QueueListener] = None
+
+request_logger.addHandler(_DroppingQueueHandler(_log_queue))
+request_logger.setLevel(logging.INFO)
+request_logger.propagate = False
+
+def start_request_log_listener(stream=None) -> None:
+    """
+    Iniciar el hilo que escribe los registros encolados
+
+    Args:
+        stream: Destino de los registros (por defecto la salida estándar)
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s [REQUEST] %(message)s"))
+    _listener = QueueListener(_log_queue, handler, respect_handler_level=False)
+    _listener.start()
+
+def stop_request_log_listener() -> None:
+    """Vaciar la cola y detener el hilo de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RequestLoggingMiddleware:
+    """
+    Middleware ASGI puro que mide y registra cada petición HTTP
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float = REQUEST_LOG_SAMPLE_RATE,
+        slow_only: bool = REQUEST_LOG_SLOW_ONLY,
+        slow_threshold_ms: float = REQUEST_LOG_SLOW_MS
+    ):
+        """
+        Inicializar el middleware
+
+        Args:
+            app: Aplicación ASGI envuelta
+            sample_rate: Fracción de peticiones registradas (0.0 - 1.0); las lentas siempre se registran
+            slow_only: Registrar solo las peticiones lentas
+            slow_threshold_ms: Duración a partir de la cual una petición es lenta
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_only = slow_only
+        self.slow_threshold_ms = slow_threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._log(scope, status_code, duration_ms)
+
+    def _log(self, scope, status_code: int, duration_ms: float) -> None:
+        """
+        Encolar el registro de una petición si corresponde según muestreo y umbral
+
+        Args:
+            scope: Scope ASGI de la petición (incluye la ruta resuelta)
+            status_code: Código de estado enviado
+            duration_ms: Duración total en milisegundos
+        """
+        slow = duration_ms >= self.slow_threshold_ms
+        if self.slow_only and not slow:
+            return
+        if not slow and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        # Plantilla de la ruta para agrupar (evita un valor distinto por cada ID)
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope.get("path", "")
+
+        request_logger.info(
+            "%s %s %d %.1fms%s", scope.get("method", ""), path, status_code, duration_ms, " SLOW" if slow else ""
+        )
@@ -6,7 +6,7 @@ Este archivo define el modelo de datos para las transacciones financieras
 """
 
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -190,6 +190,16 @@ class TransactionSort(BaseModel):
     field: Literal["date", "amount", "category", "created_at"] = "date"
     order: Literal["asc", "desc"] = "desc"
 
+class TransactionPage(BaseModel):
+    """
+    Modelo para una página de transacciones con paginación por cursor
+
+    next_cursor es opaco para el cliente: se envía tal cual en la siguiente
+    petición para continuar después de la última transacción devuelta.
+    """
+    transactions: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
 class TransactionStats(BaseModel):
     """
     Modelo para estadísticas de transacciones
@@ -200,5 +210,10 @@ class TransactionStats(BaseModel):
     transaction_count: int = 0
     income_count: int = 0
     expense_count: int = 0
+    total_goal_contributions: float = 0.0
+    goal_contribution_count: int = 0
+    min_amount: float = 0.0
+    max_amount: float = 0.0
+    average_amount: float = 0.0
     period_start: Optional[datetime] = None
     period_end: Optional[datetime] = None
@@ -53,6 +53,7 @@ class UserSettingsResponse(BaseModel):
     country_code: str = Field(default="+57", description="Código de país (siempre +57)")
     is_verified: bool = Field(default=False, description="Si el usuario está verificado")
     profile_picture: Optional[str] = Field(None, description="URL de la foto de perfil")
+    profile_picture_thumbnail: Optional[str] = Field(None, description="URL de la miniatura de la foto de perfil")
     created_at: datetime = Field(..., description="Fecha de creación de la cuenta")
     updated_at: Optional[datetime] = Field(None, description="Fecha de última actualización")
 
@@ -0,0 +1,60 @@
+"""
+Rutas de API de Administración
+
+Endpoints internos para diagnóstico en producción. Solo están disponibles si
+se define ADMIN_API_TOKEN y la petición envía ese valor en X-Admin-Token.
+"""
+
+import os
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+
+from services.slow_queries import slow_query_recorder
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+# /metrics sin token (solo si el puerto no es accesible desde fuera de la red interna)
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() in ("1", "true", "yes")
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    Verificar el token de administración
+
+    Raises:
+        HTTPException: 404 si la administración está deshabilitada, 401 si el token no coincide
+    """
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de administración inválido")
+
+async def require_metrics_access(x_admin_token: Optional[str] = Header(None)):
+    """
+    Verificar el acceso a /metrics: token de administración salvo con METRICS_PUBLIC
+
+    Raises:
+        HTTPException: Igual que require_admin_token
+    """
+    if not METRICS_PUBLIC:
+        await require_admin_token(x_admin_token)
+
+@router.get("/slow-queries", dependencies=[Depends(require_admin_token)])
+async def get_slow_queries(limit: int = Query(50, ge=1, le=500, description="Máximo de formas y consultas recientes")):
+    """
+    Consultas lentas agrupadas por forma, con el resumen de su plan de ejecución
+
+    Returns:
+        dict: Umbral, formas ordenadas por tiempo total y consultas recientes
+    """
+    return slow_query_recorder.report(limit)
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin_token)])
+async def clear_slow_queries():
+    """
+    Reiniciar el registro de consultas lentas (p. ej. tras crear un índice)
+    """
+    slow_query_recorder.clear()
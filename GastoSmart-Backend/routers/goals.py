@@ -9,15 +9,17 @@ Implementa el requerimiento RQF-010: Creación de metas de ahorro.
 from fastapi import APIRouter, HTTPException, Depends, status, Query
 from typing import List, Optional
 from datetime import datetime, date
-from database.connection import get_async_database
 from database.goal_operations import GoalOperations
+from database.projections import parse_fields
 from models.goal import (
     GoalCreate, GoalResponse, GoalUpdate, GoalContribution,
     GoalStats, GoalTrend, MonthlySavings, MonthlyContribution, DailyContribution,
     GoalStatus, GoalCategory
 )
-from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from services.json_response import FastJSONResponse
+from services.app_services import AppServices, get_services
+from services.etag import query_user_data_etag, conditional_headers
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,26 +27,17 @@ logger = logging.getLogger(__name__)
 # Crear router para metas
 router = APIRouter(prefix="/api/goals", tags=["metas"])
 
-def get_goal_operations(db: AsyncIOMotorDatabase = Depends(get_async_database)) -> GoalOperations:
+async def get_goal_operations(services: AppServices = Depends(get_services)) -> GoalOperations:
     """
-    Obtener instancia de operaciones de metas
+    Obtener las operaciones de metas compartidas por la aplicación
     
     Args:
-        db: Base de datos MongoDB
+        services: Servicios creados en lifespan
         
     Returns:
         GoalOperations: Instancia para operaciones de metas
     """
-    # Usar la colección de metas y transacciones
-    goals_collection = db.goals
-    transactions_collection = db.transactions
-    
-    # Logging de información de la colección (solo una vez por instancia)
-    if not hasattr(get_goal_operations, '_logged'):
-        logger.info(f"Router de metas inicializado - Base de datos: {db.name}, Colección: goals, transactions")
-        get_goal_operations._logged = True
-    
-    return GoalOperations(goals_collection, transactions_collection)
+    return services.goals
 
 @router.post("/", response_model=GoalResponse, status_code=status.HTTP_201_CREATED)
 async def create_goal(
@@ -99,6 +92,27 @@ async def create_goal(
             detail="Error interno del servidor"
         )
 
+def _parse_goal_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Validar el parámetro fields del listado de metas
+    
+    Args:
+        fields: Campos separados por coma
+        
+    Returns:
+        list: Campos pedidos, o None para devolver todos
+        
+    Raises:
+        HTTPException: Si se pide un campo que GoalResponse no expone
+    """
+    try:
+        return parse_fields(fields, GoalResponse.model_fields.keys())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 @router.get("/", response_model=List[GoalResponse])
 async def get_goals(
     user_id: str = Query(..., description="ID del usuario"),
@@ -106,7 +120,9 @@ async def get_goals(
     category: Optional[str] = Query(None, description="Categoría de la meta"),
     skip: int = Query(0, ge=0, description="Número de metas a saltar"),
     limit: int = Query(100, ge=1, le=1000, description="Límite de metas a devolver"),
-    goal_ops: GoalOperations = Depends(get_goal_operations)
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p. ej. name,current_amount,target_amount)"),
+    goal_ops: GoalOperations = Depends(get_goal_operations),
+    etag: str = Depends(query_user_data_etag)
 ):
     """
     Obtener metas del usuario con filtros
@@ -117,7 +133,9 @@ async def get_goals(
         category: Filtrar por categoría
         skip: Número de metas a saltar (paginación)
         limit: Límite de metas a devolver
+        fields: Campos a devolver además de id (todos si se omite)
         goal_ops: Operaciones de metas
+        etag: ETag de los datos del usuario (304 si no cambiaron)
         
     Returns:
         List[GoalResponse]: Lista de metas filtradas
@@ -149,10 +167,13 @@ async def get_goals(
             status=status_enum,
             category=category_enum,
             skip=skip,
-            limit=limit
+            limit=limit,
+            as_dicts=True,
+            fields=_parse_goal_fields(fields)
         )
         
-        return goals
+        # Respuesta directa con orjson: los diccionarios ya tienen la forma de GoalResponse
+        return FastJSONResponse(goals, headers=conditional_headers(etag))
         
     except HTTPException:
         raise
@@ -162,7 +183,7 @@ async def get_goals(
             detail="Error al obtener metas"
         )
 
-@router.get("/{goal_id}", response_model=GoalResponse)
+@router.get("/{goal_id}", response_model=GoalResponse, dependencies=[Depends(query_user_data_etag)])
 async def get_goal(
     goal_id: str,
     user_id: str = Query(..., description="ID del usuario"),
@@ -306,39 +327,19 @@ async def set_goal_as_main(
     try:
         logger.info(f"POST /goals/{goal_id}/set-main - user_id: {user_id}")
         
-        # Primero, desmarcar todas las metas como principales
-        await goal_ops.collection.update_many(
-            {"user_id": user_id, "is_main": True},
-            {"$set": {"is_main": False, "updated_at": datetime.now()}}
-        )
-        
-        # Establecer la meta específica como principal
-        result = await goal_ops.collection.update_one(
-            {"_id": ObjectId(goal_id), "user_id": user_id},
-            {"$set": {"is_main": True, "updated_at": datetime.now()}}
-        )
-        
-        if result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meta no encontrada o no pertenece al usuario"
-            )
-        
-        # Obtener la meta actualizada
-        updated_goal = await goal_ops.collection.find_one({
-            "_id": ObjectId(goal_id),
-            "user_id": user_id
-        })
+        updated_goal = await goal_ops.set_main_goal(goal_id, user_id)
         
         if not updated_goal:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meta no encontrada después de actualización"
+                detail="Meta no encontrada o no pertenece al usuario"
             )
         
         logger.info(f"Meta {goal_id} establecida como principal para usuario {user_id}")
-        return goal_ops._document_to_response(updated_goal)
+        return updated_goal
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error estableciendo meta {goal_id} como principal: {e}")
         raise HTTPException(
@@ -428,7 +429,7 @@ async def delete_goal(
             detail="Meta no encontrada"
         )
 
-@router.get("/stats/summary", response_model=GoalStats)
+@router.get("/stats/summary", response_model=GoalStats, dependencies=[Depends(query_user_data_etag)])
 async def get_goal_stats(
     user_id: str = Query(..., description="ID del usuario"),
     goal_ops: GoalOperations = Depends(get_goal_operations)
@@ -482,7 +483,7 @@ async def get_goal_trends(
             detail="Error al obtener tendencias"
         )
 
-@router.get("/analytics/monthly-savings", response_model=List[MonthlySavings])
+@router.get("/analytics/monthly-savings", response_model=List[MonthlySavings], dependencies=[Depends(query_user_data_etag)])
 async def get_monthly_savings(
     user_id: str = Query(..., description="ID del usuario"),
     months: int = Query(6, ge=1, le=24, description="Número de meses a obtener"),
@@ -509,7 +510,7 @@ async def get_monthly_savings(
             detail="Error al obtener ahorro mensual"
         )
 
-@router.get("/analytics/monthly-contributions", response_model=List[MonthlyContribution])
+@router.get("/analytics/monthly-contributions", response_model=List[MonthlyContribution], dependencies=[Depends(query_user_data_etag)])
 async def get_monthly_contributions(
     user_id: str = Query(..., description="ID del usuario"),
     months: int = Query(6, ge=1, le=24, description="Número de meses a obtener"),
@@ -538,7 +539,7 @@ async def get_monthly_contributions(
             detail="Error al obtener abonos mensuales"
         )
 
-@router.get("/analytics/daily-contributions/{goal_id}", response_model=List[DailyContribution])
+@router.get("/analytics/daily-contributions/{goal_id}", response_model=List[DailyContribution], dependencies=[Depends(query_user_data_etag)])
 async def get_daily_contributions_by_goal(
     goal_id: str,
     user_id: str = Query(..., description="ID del usuario"),
@@ -11,7 +11,11 @@ from datetime import datetime, date, timedelta
 from bson import ObjectId
 
 from database.connection import get_async_database
-from database.report_operations import ReportOperations
+from services.report_cache import CachedReportOperations
+from services.app_services import AppServices, get_services
+from services.json_response import FastJSONResponse
+from database.projections import parse_fields
+from services.etag import user_data_etag, conditional_headers
 from models.report import (
     MonthlySummary, ExpenseCategoryReport, DailyExpensesReport,
     IncomeTrendReport, SavingsEvolutionReport, FinancialReport,
@@ -23,6 +27,18 @@ from services.auth_service import get_current_user
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
+async def get_report_operations(services: AppServices = Depends(get_services)) -> CachedReportOperations:
+    """
+    Obtener las operaciones de reportes compartidas por la aplicación
+    
+    Args:
+        services: Servicios creados en lifespan
+        
+    Returns:
+        CachedReportOperations: Instancia para operaciones de reportes
+    """
+    return services.reports
+
 # Agregar manejador explícito de OPTIONS para debugging
 @router.options("/{path:path}")
 async def options_handler(path: str):
@@ -30,12 +46,12 @@ async def options_handler(path: str):
     print(f"DEBUG OPTIONS - Petición OPTIONS recibida para: /api/reports/{path}")
     return {"message": "OPTIONS OK"}
 
-@router.get("/monthly-summary/{year}/{month}", response_model=MonthlySummary)
+@router.get("/monthly-summary/{year}/{month}", response_model=MonthlySummary, dependencies=[Depends(user_data_etag)])
 async def get_monthly_summary(
     year: int,
     month: int,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """
     Obtiene resumen financiero mensual
@@ -56,7 +72,6 @@ async def get_monthly_summary(
         )
     
     try:
-        report_ops = ReportOperations(db)
         summary = await report_ops.generate_monthly_summary(
             current_user["id"], year, month
         )
@@ -71,12 +86,12 @@ async def get_monthly_summary(
             detail=f"Error al generar resumen mensual: {str(e)}"
         )
 
-@router.get("/expense-categories", response_model=ExpenseCategoryReport)
+@router.get("/expense-categories", response_model=ExpenseCategoryReport, dependencies=[Depends(user_data_etag)])
 async def get_expense_categories_report(
     start_date: Optional[date] = Query(None, description="Fecha de inicio"),
     end_date: Optional[date] = Query(None, description="Fecha de fin"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """
     Obtiene reporte de gastos por categoría
@@ -92,7 +107,6 @@ async def get_expense_categories_report(
             end_date = start_date.replace(month=start_date.month + 1) - timedelta(days=1)
     
     try:
-        report_ops = ReportOperations(db)
         report = await report_ops.generate_expense_category_report(
             current_user["id"], start_date, end_date
         )
@@ -103,11 +117,11 @@ async def get_expense_categories_report(
             detail=f"Error al generar reporte de categorías: {str(e)}"
         )
 
-@router.get("/daily-expenses", response_model=DailyExpensesReport)
+@router.get("/daily-expenses", response_model=DailyExpensesReport, dependencies=[Depends(user_data_etag)])
 async def get_daily_expenses_report(
     week_start: Optional[date] = Query(None, description="Inicio de la semana"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Obtiene reporte de gastos diarios de una semana"""
     # Si no se proporciona fecha, usar la semana actual
@@ -116,7 +130,6 @@ async def get_daily_expenses_report(
         week_start = today - timedelta(days=today.weekday())
     
     try:
-        report_ops = ReportOperations(db)
         report = await report_ops.generate_daily_expenses_report(
             current_user["id"], week_start
         )
@@ -127,15 +140,14 @@ async def get_daily_expenses_report(
             detail=f"Error al generar reporte de gastos diarios: {str(e)}"
         )
 
-@router.get("/income-trend", response_model=IncomeTrendReport)
+@router.get("/income-trend", response_model=IncomeTrendReport, dependencies=[Depends(user_data_etag)])
 async def get_income_trend_report(
     months: int = Query(8, ge=1, le=24, description="Número de meses a incluir"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Obtiene reporte de tendencia de ingresos"""
     try:
-        report_ops = ReportOperations(db)
         report = await report_ops.generate_income_trend_report(
             current_user["id"], months
         )
@@ -146,15 +158,14 @@ async def get_income_trend_report(
             detail=f"Error al generar reporte de tendencia de ingresos: {str(e)}"
         )
 
-@router.get("/savings-evolution", response_model=SavingsEvolutionReport)
+@router.get("/savings-evolution", response_model=SavingsEvolutionReport, dependencies=[Depends(user_data_etag)])
 async def get_savings_evolution_report(
     months: int = Query(8, ge=1, le=24, description="Número de meses a incluir"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Obtiene reporte de evolución de ahorros"""
     try:
-        report_ops = ReportOperations(db)
         report = await report_ops.generate_savings_evolution_report(
             current_user["id"], months
         )
@@ -165,12 +176,12 @@ async def get_savings_evolution_report(
             detail=f"Error al generar reporte de evolución de ahorros: {str(e)}"
         )
 
-@router.get("/comprehensive", response_model=dict)
+@router.get("/comprehensive", response_model=dict, dependencies=[Depends(user_data_etag)])
 async def get_comprehensive_report(
     year: int = Query(None, description="Año del reporte"),
     month: int = Query(None, description="Mes del reporte"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Obtiene reporte completo con todos los datos"""
     # Si no se proporcionan fechas, usar el mes actual
@@ -180,46 +191,14 @@ async def get_comprehensive_report(
         month = datetime.now().month
     
     try:
-        report_ops = ReportOperations(db)
-        
-        # Generar todos los reportes
-        monthly_summary = await report_ops.generate_monthly_summary(
-            current_user["id"], year, month
-        )
-        
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
-        
-        expense_categories = await report_ops.generate_expense_category_report(
-            current_user["id"], start_date, end_date
-        )
-        
         # Usar lunes de la semana actual para gastos diarios
         today = date.today()
         week_start = today - timedelta(days=today.weekday())
-        daily_expenses = await report_ops.generate_daily_expenses_report(
-            current_user["id"], week_start
-        )
         
-        income_trend = await report_ops.generate_income_trend_report(
-            current_user["id"], 8
+        # Generar todos los reportes (una lectura de acumulados + gastos diarios en paralelo)
+        return await report_ops.generate_comprehensive_report(
+            current_user["id"], year, month, week_start, 8
         )
-        
-        savings_evolution = await report_ops.generate_savings_evolution_report(
-            current_user["id"], 8
-        )
-        
-        return {
-            "monthly_summary": monthly_summary,
-            "expense_categories": expense_categories,
-            "daily_expenses": daily_expenses,
-            "income_trend": income_trend,
-            "savings_evolution": savings_evolution,
-            "generated_at": datetime.now()
-        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -229,13 +208,25 @@ async def get_comprehensive_report(
 @router.get("/user-reports", response_model=List[FinancialReport])
 async def get_user_reports(
     limit: int = Query(10, ge=1, le=50, description="Límite de reportes"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p. ej. report_type,period_start,generated_at)"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations),
+    etag: str = Depends(user_data_etag)
 ):
     """Obtiene lista de reportes del usuario"""
     try:
-        report_ops = ReportOperations(db)
-        reports = await report_ops.get_user_reports(str(current_user["id"]), limit)
+        selected_fields = parse_fields(fields, FinancialReport.model_fields.keys())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    try:
+        reports = await report_ops.get_user_reports(str(current_user["id"]), limit, selected_fields)
+        if selected_fields:
+            # Respuesta parcial: no se valida contra FinancialReport completo
+            return FastJSONResponse(reports, headers=conditional_headers(etag))
         return reports
     except Exception as e:
         raise HTTPException(
@@ -247,11 +238,10 @@ async def get_user_reports(
 async def search_reports(
     search_request: ReportSearchRequest,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Busca reportes por criterios"""
     try:
-        report_ops = ReportOperations(db)
         reports = await report_ops.search_reports(
             current_user["id"], 
             search_request.query,
@@ -277,14 +267,13 @@ async def search_reports(
             detail=f"Error al buscar reportes: {str(e)}"
         )
 
-@router.get("/stats", response_model=ReportStats)
+@router.get("/stats", response_model=ReportStats, dependencies=[Depends(user_data_etag)])
 async def get_report_stats(
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Obtiene estadísticas de reportes del usuario"""
     try:
-        report_ops = ReportOperations(db)
         stats = await report_ops.get_report_stats(str(current_user["id"]))
         return stats
     except Exception as e:
@@ -297,11 +286,10 @@ async def get_report_stats(
 async def export_report_to_pdf(
     export_request: PDFExportRequest,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Exporta reporte a PDF"""
     try:
-        report_ops = ReportOperations(db)
         financial_report = None
         
         # Generar el reporte según el tipo solicitado
@@ -411,7 +399,7 @@ async def export_report_to_pdf(
 async def delete_report(
     report_id: str,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    report_ops: CachedReportOperations = Depends(get_report_operations)
 ):
     """Elimina un reporte"""
     try:
@@ -421,7 +409,6 @@ async def delete_report(
                 detail="ID de reporte inválido"
             )
         
-        report_ops = ReportOperations(db)
         deleted = await report_ops.delete_report(report_id, str(current_user["id"]))
         
         if not deleted:
@@ -439,7 +426,7 @@ async def delete_report(
             detail=f"Error al eliminar reporte: {str(e)}"
         )
 
-@router.get("/categories", response_model=List[str])
+@router.get("/categories", response_model=List[str], dependencies=[Depends(user_data_etag)])
 async def get_expense_categories(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_async_database)
@@ -461,7 +448,7 @@ async def get_expense_categories(
             detail=f"Error al obtener categorías: {str(e)}"
         )
 
-@router.get("/months-available", response_model=List[dict])
+@router.get("/months-available", response_model=List[dict], dependencies=[Depends(user_data_etag)])
 async def get_available_months(
     current_user: dict = Depends(get_current_user),
     db = Depends(get_async_database)
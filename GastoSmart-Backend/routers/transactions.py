@@ -9,31 +9,34 @@ Implementa el requerimiento RQF-005: Registro de ingreso.
 from fastapi import APIRouter, HTTPException, Depends, status, Query
 from typing import List, Optional
 from datetime import datetime
-from database.connection import get_async_database
 from database.transaction_operations import TransactionOperations
+from database.projections import parse_fields
 from models.transaction import (
     TransactionCreate, TransactionResponse, TransactionUpdate,
     TransactionFilter, TransactionSort, TransactionStats
 )
-from motor.motor_asyncio import AsyncIOMotorDatabase
 from services.auth_service import get_current_user
+from services.json_response import FastJSONResponse
+from services.app_services import AppServices, get_services
+from services.etag import user_data_etag
 
 # Crear router para transacciones
 router = APIRouter(prefix="/api/transactions", tags=["transacciones"])
 
-def get_transaction_operations(db: AsyncIOMotorDatabase = Depends(get_async_database)) -> TransactionOperations:
+# Campos que se pueden pedir con fields= en los listados
+RESPONSE_FIELDS = TransactionResponse.model_fields.keys()
+
+async def get_transaction_operations(services: AppServices = Depends(get_services)) -> TransactionOperations:
     """
-    Obtener instancia de operaciones de transacciones
+    Obtener las operaciones de transacciones compartidas por la aplicación
     
     Args:
-        db: Base de datos MongoDB
+        services: Servicios creados en lifespan
         
     Returns:
         TransactionOperations: Instancia para operaciones de transacciones
     """
-    # Usar la colección de transacciones
-    transactions_collection = db.transactions
-    return TransactionOperations(transactions_collection)
+    return services.transactions
 
 @router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
@@ -98,6 +101,8 @@ async def get_transactions(
     amount_max: Optional[float] = Query(None, ge=0, description="Monto máximo"),
     sort_by: str = Query("date", description="Campo por el cual ordenar"),
     sort_order: str = Query("desc", description="Orden de clasificación (asc/desc)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p. ej. amount,date,category)"),
     transaction_ops: TransactionOperations = Depends(get_transaction_operations)
 ):
     """
@@ -107,9 +112,13 @@ async def get_transactions(
     y opciones de ordenamiento, incluyendo el algoritmo merge-sort
     implementado en el frontend.
     
+    La paginación recomendada es por cursor: si hay más resultados, la
+    respuesta incluye el header X-Next-Cursor, que se envía como `cursor`
+    para obtener la siguiente página con el mismo costo que la primera.
+    
     Args:
         user_id: ID del usuario
-        skip: Número de transacciones a saltar (paginación)
+        skip: Número de transacciones a saltar (paginación, ignorado con cursor)
         limit: Límite de transacciones a devolver
         transaction_type: Filtrar por tipo de transacción
         category: Filtrar por categoría
@@ -119,6 +128,8 @@ async def get_transactions(
         amount_max: Monto máximo
         sort_by: Campo por el cual ordenar
         sort_order: Orden de clasificación
+        cursor: Cursor opaco de paginación
+        fields: Campos a devolver además de id (todos si se omite)
         transaction_ops: Operaciones de transacciones
         
     Returns:
@@ -139,17 +150,28 @@ async def get_transactions(
         
         # Construir ordenamiento
         sort = TransactionSort(field=sort_by, order=sort_order)
+        selected_fields = parse_fields(fields, RESPONSE_FIELDS)
         
-        transactions = await transaction_ops.get_user_transactions(
+        page = await transaction_ops.get_user_transactions_page(
             user_id=current_user["id"],
-            skip=skip,
             limit=limit,
             filters=filters,
-            sort=sort
+            sort=sort,
+            cursor=cursor,
+            skip=skip,
+            as_dicts=True,
+            fields=selected_fields
         )
         
-        return transactions
+        # Respuesta directa con orjson: los diccionarios ya tienen la forma de TransactionResponse
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+        return FastJSONResponse(page.transactions, headers=headers)
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -255,7 +277,7 @@ async def delete_transaction(
             detail="Transacción no encontrada"
         )
 
-@router.get("/stats/summary", response_model=TransactionStats)
+@router.get("/stats/summary", response_model=TransactionStats, dependencies=[Depends(user_data_etag)])
 async def get_transaction_stats(
     current_user: dict = Depends(get_current_user),
     date_from: Optional[datetime] = Query(None, description="Fecha de inicio del período"),
@@ -314,55 +336,51 @@ async def get_categories(
             detail="Error al obtener categorías"
         )
 
-@router.get("/search/query")
+@router.get("/search/query", response_model=List[TransactionResponse])
 async def search_transactions(
     current_user: dict = Depends(get_current_user),
     query: str = Query(..., min_length=1, description="Término de búsqueda"),
     skip: int = Query(0, ge=0, description="Número de transacciones a saltar"),
     limit: int = Query(50, ge=1, le=100, description="Límite de transacciones a devolver"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p. ej. amount,date,category)"),
     transaction_ops: TransactionOperations = Depends(get_transaction_operations)
 ):
     """
     Buscar transacciones por texto
     
     Realiza una búsqueda de texto en categorías y descripciones
-    de las transacciones del usuario.
+    de las transacciones del usuario directamente en la base de datos,
+    ordenada por relevancia. Los términos numéricos también buscan
+    por monto exacto.
     
     Args:
         user_id: ID del usuario
         query: Término de búsqueda
-        skip: Número de transacciones a saltar
-        limit: Límite de transacciones a devolver
+        skip: Número de coincidencias a saltar
+        limit: Límite de coincidencias a devolver
+        fields: Campos a devolver además de id (todos si se omite)
         transaction_ops: Operaciones de transacciones
         
     Returns:
         List[TransactionResponse]: Lista de transacciones que coinciden con la búsqueda
     """
     try:
-        # Crear filtro de búsqueda
-        search_filter = TransactionFilter()
-        
-        # Realizar búsqueda en categorías y descripciones
-        transactions = await transaction_ops.get_user_transactions(
+        transactions = await transaction_ops.search_transactions(
             user_id=current_user["id"],
+            query=query,
             skip=skip,
             limit=limit,
-            filters=search_filter
+            as_dicts=True,
+            fields=parse_fields(fields, RESPONSE_FIELDS)
         )
         
-        # Filtrar por término de búsqueda en el frontend
-        # (En una implementación real, esto se haría en la base de datos)
-        filtered_transactions = []
-        query_lower = query.lower()
-        
-        for transaction in transactions:
-            if (query_lower in transaction.category.lower() or
-                (transaction.description and query_lower in transaction.description.lower()) or
-                query_lower in str(transaction.amount)):
-                filtered_transactions.append(transaction)
-        
-        return filtered_transactions
+        return FastJSONResponse(transactions)
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -5,12 +5,15 @@ Este archivo define los endpoints REST para la gestión básica del perfil
 de usuario en GastoSmart.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from datetime import datetime
 
-from database.connection import get_async_database
 from database.user_settings_operations import UserSettingsOperations
+from services.app_services import AppServices, get_services
+from services.etag import etag_matches
+from services.profile_pictures import THUMBNAIL_CONTENT_TYPE
 from models.user_settings import (
     UserSettingsUpdate, UserSettingsResponse, UserProfilePictureUpdate
 )
@@ -18,16 +21,33 @@ from services.auth_service import get_current_user
 
 router = APIRouter(prefix="/api/user-settings", tags=["user-settings"])
 
+# Las URLs de miniaturas incluyen el hash del contenido: nunca cambian
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Miniatura de otro tamaño servida como alternativa: cambia si se vuelve a subir la foto
+FALLBACK_CACHE_CONTROL = "public, max-age=3600"
+
+async def get_user_settings_operations(services: AppServices = Depends(get_services)) -> UserSettingsOperations:
+    """
+    Obtener las operaciones de ajustes compartidas por la aplicación
+    
+    Args:
+        services: Servicios creados en lifespan
+        
+    Returns:
+        UserSettingsOperations: Instancia para operaciones de ajustes
+    """
+    return services.user_settings
+
 @router.get("/profile", response_model=UserSettingsResponse)
 async def get_user_profile(
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    settings_ops: UserSettingsOperations = Depends(get_user_settings_operations)
 ):
     """
     Obtiene la información personal del usuario
     """
     try:
-        settings_ops = UserSettingsOperations(db)
         user_settings = await settings_ops.get_user_settings(str(current_user["id"]))
         
         if not user_settings:
@@ -50,14 +70,12 @@ async def get_user_profile(
 async def update_user_profile(
     settings_update: UserSettingsUpdate,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    settings_ops: UserSettingsOperations = Depends(get_user_settings_operations)
 ):
     """
     Actualiza la información personal del usuario
     """
     try:
-        settings_ops = UserSettingsOperations(db)
-        
         # Validar que al menos un campo sea proporcionado
         if not any([
             settings_update.first_name,
@@ -101,17 +119,17 @@ async def update_user_profile(
 
 @router.put("/profile-picture")
 async def update_profile_picture(
-    profile_picture: str,
+    picture_update: UserProfilePictureUpdate,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    settings_ops: UserSettingsOperations = Depends(get_user_settings_operations)
 ):
     """
     Actualiza la foto de perfil del usuario
+    
+    Acepta una URL o una imagen en base64 (data URL). Las imágenes se
+    reducen a miniaturas que se sirven desde GET /profile-picture/{hash}/{size}.
     """
     try:
-        settings_ops = UserSettingsOperations(db)
-        
-        picture_update = UserProfilePictureUpdate(profile_picture=profile_picture)
         success = await settings_ops.update_profile_picture(
             current_user["id"], picture_update
         )
@@ -124,6 +142,11 @@ async def update_profile_picture(
         
         return {"message": "Foto de perfil actualizada exitosamente"}
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -132,18 +155,57 @@ async def update_profile_picture(
             detail=f"Error al actualizar foto de perfil: {str(e)}"
         )
 
+@router.get("/profile-picture/{picture_hash}/{size}")
+async def get_profile_picture(
+    request: Request,
+    picture_hash: str = Path(..., pattern=r"^[0-9a-f]{32}$", description="Hash del contenido de la foto"),
+    size: int = Path(..., description="Lado de la miniatura en píxeles"),
+    services: AppServices = Depends(get_services)
+):
+    """
+    Sirve una miniatura de foto de perfil
+    
+    No requiere token (se usa desde etiquetas <img>); la URL solo se conoce a
+    través del perfil. El contenido se lee de GridFS por chunks y, como la URL
+    identifica el contenido, se responde con ETag fuerte y caché inmutable.
+    Si ese tamaño no está guardado (fotos subidas con otro
+    PROFILE_PICTURE_SIZES) se genera o se sirve el más cercano.
+    """
+    thumbnail = await services.user_settings.open_thumbnail(picture_hash, size)
+    if thumbnail is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Foto de perfil no encontrada"
+        )
+    grid_out, served_size = thumbnail
+    
+    etag = f'"{picture_hash}-{served_size}"'
+    cache_control = IMMUTABLE_CACHE_CONTROL if served_size == size else FALLBACK_CACHE_CONTROL
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    async def chunks():
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    
+    headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(chunks(), media_type=THUMBNAIL_CONTENT_TYPE, headers=headers)
+
 @router.post("/validate-field")
 async def validate_field(
     field_name: str,
     field_value: str,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_async_database)
+    settings_ops: UserSettingsOperations = Depends(get_user_settings_operations)
 ):
     """
     Valida un campo específico
     """
     try:
-        settings_ops = UserSettingsOperations(db)
         validation_result = await settings_ops.validate_field(field_name, field_value)
         
         return validation_result
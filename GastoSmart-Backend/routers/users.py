@@ -5,13 +5,18 @@ Este archivo contiene todos los endpoints REST para manejar operaciones
 relacionadas con usuarios en GastoSmart.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Query
 from fastapi.security import HTTPBearer
-from typing import List
+from typing import List, Optional
 from database.connection import get_async_database
 from database.user_operations import UserOperations
+from database.projections import parse_fields
 from models.user import UserCreate, UserResponse, UserLogin, BudgetUpdate, VerificationCodeRequest, VerificationCodeConfirm
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from services.auth_service import get_current_user
+from services.token_revocation import revocation_list
+from services.json_response import FastJSONResponse
+from services.app_services import AppServices, get_services
 
 # Crear router para usuarios
 router = APIRouter(prefix="/api/users", tags=["usuarios"])
@@ -19,17 +24,17 @@ router = APIRouter(prefix="/api/users", tags=["usuarios"])
 # Configurar autenticación 
 security = HTTPBearer()
 
-def get_user_operations(db: AsyncIOMotorDatabase = Depends(get_async_database)) -> UserOperations:
+async def get_user_operations(services: AppServices = Depends(get_services)) -> UserOperations:
     """
-    Obtener instancia de operaciones de usuario
+    Obtener las operaciones de usuario compartidas por la aplicación
     
     Args:
-        db: Base de datos MongoDB
+        services: Servicios creados en lifespan
         
     Returns:
         UserOperations: Instancia para operaciones de usuario
     """
-    return UserOperations(db)
+    return services.users
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(
@@ -117,10 +122,10 @@ async def login_user(
             )
         
         # Importar función de creación de token
-        from services.auth_service import create_access_token
+        from services.auth_service import create_user_token
         
-        # Crear token JWT
-        access_token = create_access_token(data={"sub": user.id})
+        # Crear token JWT (incluye los claims que usan los handlers)
+        access_token = create_user_token(user)
         
         print(f"[DEBUG] Login successful for user: {user.email}")
         
@@ -157,6 +162,21 @@ async def login_user(
             detail="Error interno del servidor"
         )
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_user(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_async_database)
+):
+    """
+    Cerrar sesión revocando el token actual
+    
+    Args:
+        current_user: Usuario autenticado (incluye el jti del token)
+        db: Base de datos MongoDB
+    """
+    if current_user.get("jti"):
+        await revocation_list.revoke_token(db, current_user["jti"], current_user["token_expires_at"])
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
@@ -189,6 +209,7 @@ async def get_user(
 async def get_all_users(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p. ej. first_name,email)"),
     user_ops: UserOperations = Depends(get_user_operations)
 ):
     """
@@ -197,12 +218,24 @@ async def get_all_users(
     Args:
         skip: Número de usuarios a saltar
         limit: Límite de usuarios a devolver
+        fields: Campos a devolver además de id (todos si se omite)
         user_ops: Operaciones de usuario
         
     Returns:
         List[UserResponse]: Lista de usuarios
     """
-    users = await user_ops.get_all_users(skip=skip, limit=limit)
+    try:
+        selected_fields = parse_fields(fields, UserResponse.model_fields.keys())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    users = await user_ops.get_all_users(skip=skip, limit=limit, fields=selected_fields)
+    if selected_fields:
+        # Respuesta parcial: no se valida contra UserResponse completo
+        return FastJSONResponse(users)
     return users
 
 @router.put("/{user_id}/budget", response_model=UserResponse)
@@ -302,7 +335,7 @@ async def send_verification_code(
         # Para registro, verificar que el correo no esté ya verificado
         if request.purpose == "registration":
             # Buscar usuario incluyendo los inactivos
-            user_doc = await user_ops.collection.find_one({"email": request.email})
+            user_doc = await user_ops.collection.find_one({"email": request.email}, {"email_verified": 1})
             if user_doc and user_doc.get("email_verified", False):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -312,7 +345,7 @@ async def send_verification_code(
         # Para recuperación de contraseña, verificar que el usuario existe
         elif request.purpose == "password_recovery":
             # Verificación directa en la base de datos para mejor rendimiento
-            user_doc = await user_ops.collection.find_one({"email": request.email})
+            user_doc = await user_ops.collection.find_one({"email": request.email}, {"_id": 1})
             if not user_doc:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
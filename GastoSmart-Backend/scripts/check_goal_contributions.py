@@ -0,0 +1,105 @@
+"""
+Script de Verificación: Abonos Concurrentes a Metas
+
+Este script crea una meta temporal, dispara cientos de abonos en paralelo
+contra GoalOperations.contribute_to_goal y comprueba que ningún abono se
+pierda y que el monto acumulado nunca supere el objetivo. Al terminar
+elimina la meta y sus transacciones.
+
+Ejecutar con: python -m scripts.check_goal_contributions [--contributions 500] [--amount 1000]
+"""
+
+import asyncio
+import argparse
+import sys
+import logging
+from datetime import date
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_async_database
+from database.goal_operations import GoalOperations
+from models.goal import GoalCreate, GoalContribution, GoalCategory
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHECK_USER_ID = "concurrency-check-user"
+
+async def check_contributions(contributions: int, amount: float) -> int:
+    """
+    Verificar abonos concurrentes sobre una misma meta
+
+    El objetivo se fija en la mitad de los abonos disparados, de modo que
+    la mitad debe aceptarse y la otra mitad rechazarse por exceder el monto.
+
+    Args:
+        contributions: Número de abonos en paralelo
+        amount: Monto de cada abono
+
+    Returns:
+        int: Código de salida (0 si no hay abonos perdidos ni sobrepasos)
+    """
+    await connect_to_mongo()
+    db = await get_async_database()
+    goal_ops = GoalOperations(db.goals, db.transactions, db.monthly_rollups, db.data_versions)
+    goal_id = None
+
+    try:
+        expected_accepted = contributions // 2
+        target_amount = expected_accepted * amount
+
+        goal = await goal_ops.create_goal(CHECK_USER_ID, GoalCreate(
+            name="Verificación de concurrencia",
+            category=GoalCategory.SAVINGS,
+            target_amount=target_amount,
+            target_date=date.today().replace(year=date.today().year + 1),
+            current_amount=0.0
+        ))
+        goal_id = goal.id
+
+        async def contribute():
+            try:
+                return await goal_ops.contribute_to_goal(goal_id, CHECK_USER_ID, GoalContribution(amount=amount))
+            except ValueError:
+                return None
+
+        results = await asyncio.gather(*[contribute() for _ in range(contributions)])
+        accepted = sum(1 for result in results if result is not None)
+
+        final_goal = await goal_ops.get_goal_by_id(goal_id, CHECK_USER_ID)
+        recorded = await db.transactions.count_documents({"user_id": CHECK_USER_ID, "goal_id": goal_id})
+
+        logger.info(f"Abonos aceptados: {accepted}/{contributions} (esperados {expected_accepted})")
+        logger.info(f"Monto final: {final_goal.current_amount:,.0f} / objetivo {target_amount:,.0f}")
+        logger.info(f"Transacciones registradas: {recorded}")
+        logger.info(f"Estado: {final_goal.status} - progreso {final_goal.progress_percentage:.1f}%")
+
+        failures = []
+        if final_goal.current_amount > target_amount:
+            failures.append("el monto acumulado supera el objetivo")
+        if final_goal.current_amount != accepted * amount:
+            failures.append("el monto acumulado no coincide con los abonos aceptados (incrementos perdidos)")
+        if accepted != expected_accepted:
+            failures.append("el número de abonos aceptados no es el esperado")
+        if recorded != accepted:
+            failures.append("las transacciones registradas no coinciden con los abonos aceptados")
+
+        for failure in failures:
+            logger.error(f"FALLO: {failure}")
+        return 1 if failures else 0
+
+    finally:
+        if goal_id:
+            await goal_ops.delete_goal(goal_id, CHECK_USER_ID)
+        await db.transactions.delete_many({"user_id": CHECK_USER_ID})
+        await db.monthly_rollups.delete_many({"user_id": CHECK_USER_ID})
+        await db.data_versions.delete_one({"_id": CHECK_USER_ID})
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verificar abonos concurrentes a una meta")
+    parser.add_argument("--contributions", type=int, default=500, help="Número de abonos en paralelo")
+    parser.add_argument("--amount", type=float, default=1000.0, help="Monto de cada abono")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(check_contributions(args.contributions, args.amount)))
@@ -0,0 +1,130 @@
+"""
+Servidor SMTP local para desarrollo y pruebas
+
+Reemplaza a Gmail al probar el registro y los códigos de verificación: acepta
+cualquier remitente y destinatario, no usa TLS ni autenticación y muestra
+cada correo recibido (destinatario, asunto y código) junto con el número de
+conexión, para comprobar que la cola de correos reutiliza sus conexiones.
+Con --fail-rate responde 451 a una fracción de los mensajes para ejercitar
+los reintentos.
+
+Ejecutar con: python -m scripts.local_smtp [--port 1025] [--fail-rate 0.3]
+
+y el backend con:
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_STARTTLS=false USE_CREDENTIALS=false uvicorn main:app
+"""
+
+import re
+import random
+import asyncio
+import argparse
+import logging
+from email import message_from_bytes, policy
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+logger = logging.getLogger(__name__)
+
+_CODE_PATTERN = re.compile(rb'class="code">(\d{6})<')
+
+class LocalSMTPServer:
+    """
+    Servidor SMTP mínimo (EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+    """
+
+    def __init__(self, fail_rate: float = 0.0):
+        """
+        Inicializar el servidor
+
+        Args:
+            fail_rate: Fracción de mensajes rechazados con 451 (error transitorio)
+        """
+        self.fail_rate = fail_rate
+        self.connections = 0
+        self.messages = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        connection = self.connections
+        sent_on_connection = 0
+        recipients = []
+
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode("ascii"))
+            await writer.drain()
+
+        await reply("220 localhost GastoSmart local SMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command[:4].upper()
+
+                if verb in ("EHLO", "HELO"):
+                    await reply("250-localhost")
+                    await reply("250-8BITMIME")
+                    await reply("250 SMTPUTF8")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[1].strip(" <>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = bytearray()
+                    while True:
+                        chunk = await reader.readline()
+                        if chunk in (b".\r\n", b".\n", b""):
+                            break
+                        data += chunk[1:] if chunk.startswith(b"..") else chunk
+                    if random.random() < self.fail_rate:
+                        logger.info(f"[conexión {connection}] 451 simulado para {', '.join(recipients)}")
+                        await reply("451 Simulated temporary failure")
+                        continue
+                    self.messages += 1
+                    sent_on_connection += 1
+                    self._show(connection, sent_on_connection, recipients, bytes(data))
+                    await reply("250 OK")
+                elif verb == "RSET":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "NOOP":
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+    def _show(self, connection: int, number: int, recipients, data: bytes) -> None:
+        message = message_from_bytes(data, policy=policy.default)
+        body = message.get_body().get_content().encode("utf-8")
+        code = _CODE_PATTERN.search(body)
+        logger.info(
+            f"[conexión {connection}, correo {number}] Para: {', '.join(recipients)} | "
+            f"Asunto: {message['Subject']} | Código: {code.group(1).decode() if code else '-'}"
+        )
+
+async def main(host: str, port: int, fail_rate: float):
+    smtp = LocalSMTPServer(fail_rate)
+    server = await asyncio.start_server(smtp.handle, host, port)
+    logger.info(f"SMTP local escuchando en {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor SMTP local para probar el envío de correos")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha")
+    parser.add_argument("--port", type=int, default=1025, help="Puerto de escucha")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fracción de mensajes rechazados con 451")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.host, args.port, args.fail_rate))
+    except KeyboardInterrupt:
+        pass
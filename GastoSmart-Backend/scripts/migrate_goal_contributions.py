@@ -8,27 +8,26 @@ Ejecutar con: python -m scripts.migrate_goal_contributions
 """
 
 import asyncio
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 import logging
 
+from database.connection import (
+    connect_to_mongo, close_mongo_connection, get_async_database, DATABASE_NAME
+)
+from database.rollup_operations import RollupOperations
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuración de MongoDB
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "gastosmart")
-
 async def migrate_contributions():
     """
     Migrar contribuciones a metas mal etiquetadas
     """
     try:
         # Conectar a MongoDB
-        client = AsyncIOMotorClient(MONGODB_URI)
-        db = client[DATABASE_NAME]
+        await connect_to_mongo()
+        db = await get_async_database()
         transactions_collection = db.transactions
         goals_collection = db.goals
         
@@ -85,11 +84,13 @@ async def migrate_contributions():
         affected_users = set([trans["user_id"] for trans in suspicious_transactions])
         logger.info(f"Usuarios afectados: {len(affected_users)}")
         
+        # El cambio de tipo mueve montos entre acumulados mensuales
+        rollup_ops = RollupOperations(db.monthly_rollups)
         for user_id in affected_users:
             logger.info(f"Recalculando estadísticas para usuario: {user_id}")
-            # Aquí se podrían recalcular los totales si fuera necesario
+            await rollup_ops.rebuild(transactions_collection, user_id)
         
-        client.close()
+        await close_mongo_connection()
         logger.info("Migración finalizada exitosamente")
         
     except Exception as e:
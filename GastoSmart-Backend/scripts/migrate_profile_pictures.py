@@ -0,0 +1,75 @@
+"""
+Script de Migración: Fotos de Perfil a GridFS
+
+Las fotos de perfil se guardaban en base64 dentro de `user_settings`. Este
+script genera las miniaturas de cada foto guardada así, las sube a GridFS y
+deja en el documento solo el hash del contenido. Las URLs externas no se
+modifican. Se puede ejecutar varias veces: solo procesa los documentos que
+aún tienen la imagen en línea.
+
+Ejecutar con: python -m scripts.migrate_profile_pictures [--dry-run]
+"""
+
+import asyncio
+import argparse
+import logging
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_async_database
+from database.indexes import ensure_indexes
+from database.user_settings_operations import UserSettingsOperations
+from services.profile_pictures import is_external_url, decode_picture, thumbnail_renderer
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def migrate_profile_pictures(dry_run: bool = False):
+    """
+    Mover las fotos en línea a GridFS
+
+    Args:
+        dry_run: Solo contar los documentos que se migrarían
+    """
+    await connect_to_mongo()
+    try:
+        db = await get_async_database()
+        await ensure_indexes(db)
+        settings_ops = UserSettingsOperations(db)
+
+        migrated = skipped = failed = 0
+        cursor = db.user_settings.find(
+            {"profile_picture": {"$type": "string"}},
+            {"user_id": 1, "profile_picture": 1}
+        )
+        async for doc in cursor:
+            picture = doc["profile_picture"]
+            if is_external_url(picture.strip()):
+                skipped += 1
+                continue
+            if dry_run:
+                migrated += 1
+                continue
+            try:
+                picture_hash = await settings_ops.store_picture(doc["user_id"], decode_picture(picture))
+            except ValueError as e:
+                logger.warning(f"Foto inválida para el usuario {doc['user_id']}: {e}")
+                failed += 1
+                continue
+            await db.user_settings.update_one(
+                {"_id": doc["_id"], "profile_picture": picture},
+                {"$set": {"profile_picture_hash": picture_hash}, "$unset": {"profile_picture": ""}}
+            )
+            migrated += 1
+
+        accion = "Se migrarían" if dry_run else "Migradas"
+        logger.info(f"{accion} {migrated} fotos; {skipped} URLs externas sin cambios; {failed} inválidas")
+    finally:
+        thumbnail_renderer.shutdown()
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mover las fotos de perfil en base64 a GridFS")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar los documentos a migrar")
+    args = parser.parse_args()
+
+    asyncio.run(migrate_profile_pictures(args.dry_run))
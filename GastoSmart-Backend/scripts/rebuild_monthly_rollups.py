@@ -0,0 +1,53 @@
+"""
+Script de Mantenimiento: Regenerar Acumulados Mensuales
+
+Este script vuelve a calcular la colección monthly_rollups a partir de las
+transacciones, en una colección temporal que reemplaza a la actual (los
+reportes nunca la ven vacía), e incrementa la versión de datos de cada
+usuario para invalidar la caché de reportes y los ETags. Al iniciar, la
+aplicación ya la genera si está vacía; el script se usa después de
+modificar transacciones por fuera de TransactionOperations.
+
+Ejecutar con: python -m scripts.rebuild_monthly_rollups [--user-id ID]
+"""
+
+import asyncio
+import argparse
+import logging
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_async_database
+from database.indexes import ensure_indexes
+from database.rollup_operations import RollupOperations
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def rebuild_rollups(user_id: str = None):
+    """
+    Regenerar los acumulados mensuales
+
+    Args:
+        user_id: Regenerar solo este usuario (opcional)
+    """
+    await connect_to_mongo()
+    try:
+        db = await get_async_database()
+
+        # La regeneración por usuario reemplaza con ReplaceOne sobre el índice único de la
+        # clave del acumulado; la completa ($out a una colección temporal y
+        # renameCollection) crea los índices registrados en la temporal
+        await ensure_indexes(db)
+
+        total = await RollupOperations(db.monthly_rollups).rebuild(db.transactions, user_id)
+        alcance = f"usuario {user_id}" if user_id else "todos los usuarios"
+        logger.info(f"Regeneración completada para {alcance}: {total} acumulados")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerar la colección monthly_rollups")
+    parser.add_argument("--user-id", help="Regenerar solo los acumulados de este usuario")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_rollups(args.user_id))
@@ -0,0 +1,63 @@
+"""
+Script de Verificación: Índices de Consultas Canónicas
+
+Este script ejecuta explain() sobre cada consulta canónica declarada en
+database/indexes.py y termina con error si alguna usa COLLSCAN.
+
+Ejecutar con: python -m scripts.verify_indexes [--ensure]
+"""
+
+import asyncio
+import argparse
+import sys
+import logging
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_async_database
+from database.indexes import ensure_indexes, verify_canonical_queries
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def verify_indexes(ensure: bool) -> int:
+    """
+    Verificar los planes de ejecución de las consultas canónicas
+
+    Args:
+        ensure: Crear los índices del registro antes de verificar
+
+    Returns:
+        int: Código de salida (0 si ninguna consulta usa COLLSCAN)
+    """
+    await connect_to_mongo()
+    try:
+        db = await get_async_database()
+
+        if ensure:
+            await ensure_indexes(db)
+
+        results = await verify_canonical_queries(db)
+
+        failures = 0
+        for result in results:
+            if result["collscan"]:
+                failures += 1
+                logger.error(f"COLLSCAN  {result['collection']:<20} {result['name']}")
+            else:
+                logger.info(f"IXSCAN    {result['collection']:<20} {result['name']}")
+
+        if failures:
+            logger.error(f"{failures} de {len(results)} consultas canónicas usan COLLSCAN")
+            return 1
+
+        logger.info(f"Las {len(results)} consultas canónicas usan índices")
+        return 0
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verificar índices de las consultas canónicas")
+    parser.add_argument("--ensure", action="store_true", help="Crear los índices antes de verificar")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(verify_indexes(args.ensure)))
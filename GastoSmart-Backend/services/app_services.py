@@ -0,0 +1,65 @@
+"""
+Servicios compartidos por toda la aplicación
+
+Las clases *Operations no guardan estado por petición (solo colecciones), así
+que se crean una sola vez en `lifespan` y se guardan en `app.state.services`.
+Las dependencias de los routers devuelven estas instancias en lugar de
+construir operaciones, ConnectionConfig y FastMail en cada petición.
+"""
+
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from database.connection import get_async_database
+from database.data_version_operations import DataVersionOperations
+from database.transaction_operations import TransactionOperations
+from database.goal_operations import GoalOperations
+from database.user_operations import UserOperations
+from database.user_settings_operations import UserSettingsOperations
+from database.profile_picture_operations import ProfilePictureOperations
+from services.report_cache import CachedReportOperations
+from services.email_service import EmailService
+
+class AppServices:
+    """
+    Operaciones y servicios de larga vida de la aplicación
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """
+        Crear todas las operaciones sobre la base de datos
+
+        Args:
+            db: Base de datos MongoDB
+        """
+        self.db = db
+        self.email = EmailService(db)
+        self.versions = DataVersionOperations(db.data_versions)
+        self.transactions = TransactionOperations(db.transactions, db.monthly_rollups, db.data_versions)
+        self.goals = GoalOperations(db.goals, db.transactions, db.monthly_rollups, db.data_versions)
+        self.reports = CachedReportOperations(db)
+        self.users = UserOperations(db, self.email)
+        self.user_settings = UserSettingsOperations(db)
+
+    @property
+    def profile_pictures(self) -> ProfilePictureOperations:
+        """Operaciones de fotos de perfil (compartidas con user_settings)"""
+        return self.user_settings.pictures
+
+async def get_services(request: Request) -> AppServices:
+    """
+    Dependencia: servicios creados en lifespan
+
+    Si la aplicación se ejecuta sin lifespan (p. ej. con un transporte ASGI
+    en scripts), se crean en la primera petición.
+
+    Args:
+        request: Petición HTTP
+
+    Returns:
+        AppServices: Servicios de la aplicación
+    """
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        services = request.app.state.services = AppServices(await get_async_database())
+    return services
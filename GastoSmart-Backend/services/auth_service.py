@@ -8,14 +8,23 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from bson import ObjectId
 import os
+import uuid
 
 from database.connection import get_async_database
+from services.token_revocation import revocation_list
+from services.user_cache import user_cache
 
 # Configuración JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "gastosmart-secret-key-change-in-production")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
 
+# Modo sin estado: confiar en los claims del token en lugar de leer el usuario en cada petición
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+
+# Claims del usuario que se incluyen en el token (lo que usan los handlers)
+USER_CLAIMS = ("email", "is_active", "email_verified", "budget_configured")
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Crea un token JWT
@@ -34,11 +43,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
     
-    to_encode.update({"exp": expire})
+    # iat con fracción de segundo: se compara con el instante exacto de revocación del usuario
+    issued_at = (datetime.utcnow() - datetime(1970, 1, 1)).total_seconds()
+    to_encode.update({"exp": expire, "iat": issued_at, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     
     return encoded_jwt
 
+def create_user_token(user) -> str:
+    """
+    Crea el token de sesión de un usuario con sus claims embebidos
+    
+    Args:
+        user: Usuario autenticado (UserResponse)
+        
+    Returns:
+        str: Token JWT codificado
+    """
+    claims = {"sub": user.id}
+    for claim in USER_CLAIMS:
+        claims[claim] = getattr(user, claim)
+    return create_access_token(data=claims)
+
+def _user_from_claims(payload: dict) -> dict:
+    """
+    Construye el contexto del usuario a partir de los claims del token
+    
+    Args:
+        payload: Claims decodificados
+        
+    Returns:
+        dict: Usuario con la misma forma que el documento leído de MongoDB
+    """
+    user = {claim: payload[claim] for claim in USER_CLAIMS}
+    user["_id"] = ObjectId(payload["sub"])
+    user["id"] = payload["sub"]
+    return user
+
 async def get_current_user(
     authorization: Optional[str] = Header(None),
     db = Depends(get_async_database)
@@ -83,9 +124,20 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Tokens cerrados con logout o de usuarios desactivados
+    if revocation_list.is_revoked(payload):
+        raise credentials_exception
+    
+    # Token con claims embebidos: no es necesario leer el usuario
+    if AUTH_STATELESS and all(claim in payload for claim in USER_CLAIMS):
+        user = _user_from_claims(payload)
+        user["jti"] = payload.get("jti")
+        user["token_expires_at"] = datetime.utcfromtimestamp(payload["exp"])
+        return user
+    
     # Obtener usuario de la base de datos
     try:
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await user_cache.get(db.users, user_id)
         if user is None:
             raise credentials_exception
         
@@ -95,6 +147,8 @@ async def get_current_user(
         
         # Convertir ObjectId a string
         user["id"] = str(user["_id"])
+        user["jti"] = payload.get("jti")
+        user["token_expires_at"] = datetime.utcfromtimestamp(payload["exp"])
         
         return user
         
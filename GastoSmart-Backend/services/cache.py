@@ -0,0 +1,102 @@
+"""
+Caché en memoria con límite de entradas (LRU) y expiración (TTL)
+
+Cada proceso de uvicorn mantiene su propia instancia. Las claves deben
+incluir todo lo que determina el valor (p. ej. la versión de datos del
+usuario), de modo que nunca sea necesario invalidar entradas a mano.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class TTLCache:
+    """
+    Caché LRU con tiempo de vida por entrada
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 300):
+        """
+        Inicializar la caché
+
+        Args:
+            max_entries: Número máximo de entradas antes de expulsar la menos usada
+            ttl_seconds: Segundos que una entrada se considera válida
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtener un valor si existe y no ha expirado
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            Any: Valor almacenado o None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Guardar un valor, expulsando la entrada menos usada si se excede el límite
+
+        Args:
+            key: Clave de la entrada
+            value: Valor a almacenar
+        """
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Eliminar una entrada si existe
+
+        Args:
+            key: Clave de la entrada
+        """
+        self._entries.pop(key, None)
+
+    def items(self):
+        """Pares (clave, valor) almacenados, incluidas entradas aún no purgadas por TTL"""
+        return [(key, value) for key, (_, value) in self._entries.items()]
+
+    def clear(self) -> None:
+        """Eliminar todas las entradas"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de uso de la caché
+
+        Returns:
+            dict: Entradas, capacidad, aciertos y fallos
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0
+        }
@@ -0,0 +1,321 @@
+"""
+Cola de envío de correos en segundo plano
+
+Antes, el registro y /send-verification-code esperaban el envío completo:
+conexión TCP, STARTTLS y autenticación con el servidor SMTP en cada correo.
+Ahora los correos se encolan y un grupo acotado de workers los envía; cada
+worker mantiene abierta su propia conexión SMTP y la reutiliza entre
+correos (se reabre si estuvo inactiva demasiado tiempo o si el servidor la
+cerró).
+
+Los fallos transitorios (conexión, timeouts y respuestas 4xx) se reintentan
+con espera exponencial; las respuestas 5xx se dan por definitivas. Si el
+trabajo tiene un documento asociado (p. ej. en `verification_codes`), el
+estado de entrega se guarda en él: delivery_status (queued, retrying, sent o
+failed), delivery_attempts, delivery_error y delivered_at.
+
+Para desarrollo y pruebas: python -m scripts.local_smtp
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+import aiosmtplib
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger(__name__)
+
+# Servidor SMTP (por defecto Gmail con STARTTLS)
+MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "true").lower() in ("1", "true", "yes")
+MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "false").lower() in ("1", "true", "yes")
+MAIL_USERNAME = os.getenv("MAIL_USERNAME", "gastosmart.app@gmail.com")
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "gastosmart")
+MAIL_FROM = os.getenv("MAIL_FROM", "gastosmart.app@gmail.com")
+USE_CREDENTIALS = os.getenv("USE_CREDENTIALS", "true").lower() in ("1", "true", "yes")
+VALIDATE_CERTS = os.getenv("VALIDATE_CERTS", "true").lower() in ("1", "true", "yes")
+MAIL_TIMEOUT_SECONDS = float(os.getenv("MAIL_TIMEOUT_SECONDS", "30"))
+
+# Workers (y conexiones SMTP) simultáneos y tamaño máximo de la cola
+EMAIL_QUEUE_WORKERS = int(os.getenv("EMAIL_QUEUE_WORKERS", "2"))
+EMAIL_QUEUE_MAX_SIZE = int(os.getenv("EMAIL_QUEUE_MAX_SIZE", "1000"))
+
+# Reintentos: intentos totales y espera base (se duplica en cada intento)
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+
+# Una conexión inactiva más tiempo que esto se reabre (los servidores cierran las ociosas)
+EMAIL_SMTP_IDLE_SECONDS = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
+
+# Tiempo máximo para vaciar la cola al apagar la aplicación
+EMAIL_QUEUE_DRAIN_SECONDS = float(os.getenv("EMAIL_QUEUE_DRAIN_SECONDS", "5"))
+
+class EmailJob:
+    """
+    Correo pendiente de envío y documento donde registrar su entrega
+    """
+
+    __slots__ = ("message", "collection", "document_id", "attempts")
+
+    def __init__(
+        self,
+        message: EmailMessage,
+        collection: Optional[AsyncIOMotorCollection] = None,
+        document_id: Optional[ObjectId] = None
+    ):
+        self.message = message
+        self.collection = collection
+        self.document_id = document_id
+        self.attempts = 0
+
+class SMTPConnection:
+    """
+    Conexión SMTP persistente de un worker
+    """
+
+    def __init__(self, queue: "EmailQueue"):
+        self._queue = queue
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=MAIL_SERVER,
+            port=MAIL_PORT,
+            username=MAIL_USERNAME if USE_CREDENTIALS else None,
+            password=MAIL_PASSWORD if USE_CREDENTIALS else None,
+            use_tls=MAIL_SSL_TLS,
+            start_tls=MAIL_STARTTLS,
+            validate_certs=VALIDATE_CERTS,
+            timeout=MAIL_TIMEOUT_SECONDS,
+        )
+        # connect() hace EHLO, STARTTLS y login según la configuración
+        await smtp.connect()
+        self._queue.connections_opened += 1
+        return smtp
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Enviar un correo reutilizando la conexión abierta
+
+        Args:
+            message: Correo a enviar
+
+        Raises:
+            aiosmtplib.SMTPException: Si el envío falla
+        """
+        idle = time.monotonic() - self._last_used
+        if self._smtp is not None and (not self._smtp.is_connected or idle > EMAIL_SMTP_IDLE_SECONDS):
+            await self.close()
+        if self._smtp is None:
+            self._smtp = await self._connect()
+
+        try:
+            # Si el servidor rechaza el mensaje, aiosmtplib envía RSET y la conexión sigue sirviendo
+            await self._smtp.send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, OSError):
+            # La conexión no sirve: el reintento abrirá una nueva
+            await self.close()
+            raise
+        finally:
+            self._last_used = time.monotonic()
+
+    async def close(self) -> None:
+        """Cerrar la conexión (QUIT si sigue abierta)"""
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except aiosmtplib.SMTPException:
+            smtp.close()
+
+def _is_permanent(error: Exception) -> bool:
+    """Las respuestas 5xx no mejoran reintentando"""
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code >= 500
+
+class EmailQueue:
+    """
+    Cola en memoria con un grupo acotado de workers SMTP
+    """
+
+    def __init__(
+        self,
+        workers: int = EMAIL_QUEUE_WORKERS,
+        max_size: int = EMAIL_QUEUE_MAX_SIZE,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_base_seconds: float = EMAIL_RETRY_BASE_SECONDS,
+    ):
+        """
+        Inicializar la cola
+
+        Args:
+            workers: Número de workers (y de conexiones SMTP)
+            max_size: Correos en espera como máximo
+            max_attempts: Intentos por correo antes de darlo por fallido
+            retry_base_seconds: Espera antes del primer reintento
+        """
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retry_handles = set()
+        # El event loop solo guarda referencias débiles a las tareas
+        self._record_tasks = set()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.rejected = 0
+        self.connections_opened = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Arrancar los workers en el event loop actual"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"email-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, drain_seconds: float = EMAIL_QUEUE_DRAIN_SECONDS) -> None:
+        """
+        Detener los workers esperando un tiempo a que se vacíe la cola
+
+        Los reintentos programados que aún no volvieron a la cola se
+        descartan; su documento queda en estado "retrying".
+
+        Args:
+            drain_seconds: Segundos máximos de espera
+        """
+        if not self.running:
+            return
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Cola de correos detenida con %d correos pendientes", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Estados "failed" de reintentos que no cupieron en la cola
+        await asyncio.gather(*self._record_tasks, return_exceptions=True)
+
+    def submit(self, job: EmailJob) -> bool:
+        """
+        Encolar un correo sin esperar su envío
+
+        Args:
+            job: Correo y documento de seguimiento
+
+        Returns:
+            bool: False si la cola está llena
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    async def _worker(self) -> None:
+        connection = SMTPConnection(self)
+        try:
+            while True:
+                job = await self._queue.get()
+                try:
+                    await self._deliver(connection, job)
+                except Exception:
+                    logger.exception("Error inesperado en la cola de correos")
+                finally:
+                    self._queue.task_done()
+        finally:
+            await connection.close()
+
+    async def _deliver(self, connection: SMTPConnection, job: EmailJob) -> None:
+        job.attempts += 1
+        try:
+            await connection.send(job.message)
+        except (aiosmtplib.SMTPException, OSError) as e:
+            error = f"{type(e).__name__}: {e}"
+            if _is_permanent(e) or job.attempts >= self.max_attempts:
+                self.failed += 1
+                logger.warning("Correo a %s no entregado tras %d intentos: %s", job.message["To"], job.attempts, error)
+                await self._record(job, {"delivery_status": "failed", "delivery_error": error})
+            else:
+                self.retries += 1
+                await self._record(job, {"delivery_status": "retrying", "delivery_error": error})
+                self._schedule_retry(job)
+            return
+
+        self.sent += 1
+        await self._record(job, {"delivery_status": "sent", "delivery_error": None, "delivered_at": datetime.utcnow()})
+
+    def _schedule_retry(self, job: EmailJob) -> None:
+        # Espera exponencial con jitter; el worker queda libre mientras tanto
+        delay = self.retry_base_seconds * (2 ** (job.attempts - 1)) * random.uniform(0.75, 1.25)
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            if not self.submit(job):
+                self.failed += 1
+                task = asyncio.ensure_future(self._record(job, {"delivery_status": "failed", "delivery_error": "Cola de correos llena"}))
+                self._record_tasks.add(task)
+                task.add_done_callback(self._record_tasks.discard)
+
+        handle = loop.call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def _record(self, job: EmailJob, fields: Dict[str, Any]) -> None:
+        """Guardar el estado de entrega en el documento del trabajo"""
+        if job.collection is None or job.document_id is None:
+            return
+        try:
+            await job.collection.update_one(
+                {"_id": job.document_id},
+                {"$set": {**fields, "delivery_attempts": job.attempts}}
+            )
+        except Exception as e:
+            logger.warning("No se pudo registrar el estado de entrega: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Métricas de la cola
+
+        Returns:
+            dict: Pendientes, enviados, fallidos, reintentos y conexiones abiertas
+        """
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "scheduled_retries": len(self._retry_handles),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "connections_opened": self.connections_opened,
+        }
+
+# Instancia compartida por toda la aplicación
+email_queue = EmailQueue()
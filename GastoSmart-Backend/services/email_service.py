@@ -2,89 +2,98 @@
     Servicio de envío de correos electrónicos
 """
 
-import os #Sistema operativo: en el proyecto leer variables de entorno
 import random #Generar códigos de verificación random
 import string #Constante con caracteres, usar para generar 6 digitos
 from datetime import datetime, timedelta #Fecha y hora - diferencia de tiempo
-from typing import Optional #Definir tipo de dato opcional, sea de tipo o none
-
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig   
-# FastMail: clase para enviar correos electrónicos
-# MessageSchema: esquema para el cuerpo del mensaje
-# ConnectionConfig: configuración para el servidor de correo SMTP
-
+from email.message import EmailMessage #Mensaje de correo (asunto, destinatario y cuerpo HTML)
+from typing import Optional, Tuple #Definir tipo de dato opcional, sea de tipo o none
 
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 #motor: motor asincronico (driver) para interactuar con la base de datos MongoDB
 
+from services.email_queue import EmailQueue, EmailJob, email_queue, MAIL_FROM
+# Los correos se envían en segundo plano: conexión SMTP reutilizada y reintentos
+
+# Vigencia del código y errores permitidos antes de invalidarlo
+VERIFICATION_CODE_MINUTES = 10
+MAX_VERIFICATION_ATTEMPTS = 3
+
 class EmailService:
-    def __init__(self, database: AsyncIOMotorDatabase):
+    def __init__(self, database: AsyncIOMotorDatabase, queue: Optional[EmailQueue] = None):
         
         # await esperar a que se complete una operación asíncrona (que toma tiempo)
         # self. Accede a metodos y atributos de la clase
         self.database = database
         self.verification_codes = database.verification_codes
+        self.queue = queue or email_queue
+        
+    async def create_verification_code(self, email: str, purpose: str) -> Tuple[ObjectId, str]:
+        """
+        Generar y guardar un código de verificación pendiente de envío
         
-        self.mail_config = ConnectionConfig(
-            #os.getenv busca una variable de entorno con el primer parametro, si no existe, usa el segundo parametro (default)
-            MAIL_USERNAME=os.getenv("MAIL_USERNAME", "gastosmart.app@gmail.com"),
-            MAIL_PASSWORD=os.getenv("MAIL_PASSWORD", "gastosmart"),
-            MAIL_FROM=os.getenv("MAIL_FROM","gastosmart.app@gmail.com"),
-            MAIL_PORT=587,
-            MAIL_SERVER="smtp.gmail.com",
-            MAIL_STARTTLS=True,
-            MAIL_SSL_TLS=False,
-            USE_CREDENTIALS=True,
-            VALIDATE_CERTS=True,
-            )
-        
-        self.fastmail = FastMail(self.mail_config)
-        
-    async def generate_verification_code(self,email:str, purpose:str) -> str:
-        # Generar el codigo de verificacion
+        Returns:
+            tuple: (ID del documento, código)
+        """
         code = ''.join(random.choices(string.digits, k=6))
-        # Generar la fecha de expiracion
-        expires_at = datetime.now() + timedelta(minutes=10)
+        # En UTC: el índice TTL de expires_at borra el documento al expirar
+        expires_at = datetime.utcnow() + timedelta(minutes=VERIFICATION_CODE_MINUTES)
         
-        # Guardar el codigo de verificacion en la base de datos
         verification_doc = {
-            "email":email,
-            "code":code,
-            "purpose":purpose,
-            "created_at":datetime.now(),
+            "email": email,
+            "code": code,
+            "purpose": purpose,
+            "created_at": datetime.utcnow(),
             "expires_at": expires_at,
             "used": False,
-            "attempts": 0
+            "attempts": 0,
+            # Estado de entrega (lo actualiza la cola de correos)
+            "delivery_status": "queued",
+            "delivery_attempts": 0
         }
         
-        await self.verification_codes.insert_one(verification_doc)
-        return code
+        result = await self.verification_codes.insert_one(verification_doc)
+        return result.inserted_id, code
     
-    async def send_verification_email(self, email:str, code:str, purpose:str, user_name:str = None) -> bool:
-        # Enviar correo electrónico con el codigo de verificacion
+    async def send_verification_email(self, email:str, code:str, purpose:str, user_name:str = None, code_id: Optional[ObjectId] = None) -> bool:
+        """
+        Encolar el correo con el código de verificación
+        
+        No espera al servidor SMTP: la cola lo envía en segundo plano y, si se
+        indica code_id, registra el estado de entrega en ese documento.
+        
+        Returns:
+            bool: True si el correo quedó en cola
+        """
         try:
-            # Determinar el asunto y el contenido según el propósito
-            if purpose == "registration":
-                subject = "Verificación de cuenta - GastoSmart"
-                template_name = "verification_registration"
-            else:
-                subject = "Recuperación de contraseña - GastoSmart"
-                template_name = "verification_recovery"
+            message = self.build_verification_message(email, code, purpose, user_name)
+            collection = self.verification_codes if code_id is not None else None
+            if self.queue.submit(EmailJob(message, collection, code_id)):
+                return True
             
-            # Crear el mensaje
-            message = MessageSchema(
-                subject=subject,
-                recipients=[email],
-                body=self._create_email_body(code,purpose,user_name),
-                subtype="html",
-            )
-            
-            # Enviar el correo electrónico
-            await self.fastmail.send_message(message)
-            return True
+            if code_id is not None:
+                await self.verification_codes.update_one(
+                    {"_id": code_id},
+                    {"$set": {"delivery_status": "failed", "delivery_error": "Cola de correos llena"}}
+                )
+            return False
         except Exception as e:
-            print(f"Error al enviar el correo electrónico: {e}")
+            print(f"Error al encolar el correo electrónico: {e}")
             return False
+    
+    def build_verification_message(self, email:str, code:str, purpose:str, user_name:str = None) -> EmailMessage:
+        # Determinar el asunto según el propósito
+        if purpose == "registration":
+            subject = "Verificación de cuenta - GastoSmart"
+        else:
+            subject = "Recuperación de contraseña - GastoSmart"
+        
+        message = EmailMessage()
+        message["From"] = MAIL_FROM
+        message["To"] = email
+        message["Subject"] = subject
+        message.set_content(self._create_email_body(code, purpose, user_name), subtype="html")
+        return message
         
     def _create_email_body(self, code:str, purpose:str, user_name:str = None) -> str:
         
@@ -138,7 +147,7 @@ class EmailService:
                     <p>{greeting}</p>
                     <p>{message}</p>
                     <div class="code">{code}</div>
-                    <p>Este código expirará en 10 minutos.</p>
+                    <p>Este código expirará en {VERIFICATION_CODE_MINUTES} minutos.</p>
                     <p>Si no solicitaste este código, por favor ignora este correo.</p>
                     <div class="footer">
                         <p>Saludos,<br> Equipo GastoSmart</p>
@@ -154,17 +163,34 @@ class EmailService:
         """
         Verificar código de verificación con control de intentos
         
+        Una sola operación atómica: find_one_and_update toma el código vigente
+        más reciente y, en el mismo paso, lo marca como usado si coincide o
+        incrementa sus intentos (y lo invalida al llegar al máximo). Dos
+        verificaciones simultáneas no pueden consumir el mismo código.
+        
         Returns:
             dict: {"valid": bool, "message": str, "attempts_left": int}
         """
         
-        # Buscar el código más reciente para este email y propósito
-        verification_doc = await self.verification_codes.find_one({
-            "email": email,
-            "purpose": purpose,
-            "used": False,
-            "expires_at": {"$gt": datetime.now()},
-        }, sort=[("created_at", -1)])
+        # $literal: el código viene del cliente y no debe interpretarse como expresión
+        matches = {"$eq": ["$code", {"$literal": code}]}
+        attempts = {"$add": [{"$ifNull": ["$attempts", 0]}, 1]}
+        
+        # Devuelve el documento previo a la actualización
+        verification_doc = await self.verification_codes.find_one_and_update(
+            {
+                "email": email,
+                "purpose": purpose,
+                "used": False,
+                "expires_at": {"$gt": datetime.utcnow()},
+            },
+            [{"$set": {
+                "attempts": {"$cond": [matches, {"$ifNull": ["$attempts", 0]}, attempts]},
+                "used": {"$or": [matches, {"$gte": [attempts, MAX_VERIFICATION_ATTEMPTS]}]},
+            }}],
+            projection={"code": 1, "attempts": 1},
+            sort=[("created_at", -1)],
+        )
         
         if not verification_doc:
             return {
@@ -173,42 +199,23 @@ class EmailService:
                 "attempts_left": 0
             }
         
-        # Verificar si el código coincide
         if verification_doc["code"] == code:
-            # Código correcto - marcar como usado
-            await self.verification_codes.update_one(
-                {"_id": verification_doc["_id"]},
-                {"$set": {"used": True}},
-            )
             return {
                 "valid": True,
                 "message": "Código verificado exitosamente",
-                "attempts_left": 3
+                "attempts_left": MAX_VERIFICATION_ATTEMPTS
             }
-        else:
-            # Código incorrecto - incrementar intentos
-            current_attempts = verification_doc.get("attempts", 0) + 1
-            attempts_left = max(0, 3 - current_attempts)
-            
-            if current_attempts >= 3:
-                # Máximo de intentos alcanzado - marcar como usado
-                await self.verification_codes.update_one(
-                    {"_id": verification_doc["_id"]},
-                    {"$set": {"used": True, "attempts": current_attempts}},
-                )
-                return {
-                    "valid": False,
-                    "message": "Máximo de intentos alcanzado. Solicita un nuevo código",
-                    "attempts_left": 0
-                }
-            else:
-                # Actualizar contador de intentos
-                await self.verification_codes.update_one(
-                    {"_id": verification_doc["_id"]},
-                    {"$set": {"attempts": current_attempts}},
-                )
-                return {
-                    "valid": False,
-                    "message": f"Código incorrecto. Te quedan {attempts_left} intentos",
-                    "attempts_left": attempts_left
-                }
\ No newline at end of file
+        
+        current_attempts = verification_doc.get("attempts", 0) + 1
+        attempts_left = max(0, MAX_VERIFICATION_ATTEMPTS - current_attempts)
+        if attempts_left == 0:
+            return {
+                "valid": False,
+                "message": "Máximo de intentos alcanzado. Solicita un nuevo código",
+                "attempts_left": 0
+            }
+        return {
+            "valid": False,
+            "message": f"Código incorrecto. Te quedan {attempts_left} intentos",
+            "attempts_left": attempts_left
+        }
@@ -0,0 +1,110 @@
+"""
+ETags de datos por usuario y respuestas 304 Not Modified
+
+El frontend vuelve a pedir los reportes, las metas y el resumen de
+transacciones en cada navegación. El ETag de estas respuestas se deriva de
+la versión de datos del usuario (ver DataVersionOperations), de la ruta con
+sus parámetros y de la fecha actual (varios reportes dependen de "hoy").
+Las dependencias de este módulo lo calculan antes de ejecutar la ruta: si
+coincide con If-None-Match se responde 304 sin más trabajo que leer la
+versión; si no, la ruta se ejecuta y la respuesta lleva el ETag.
+"""
+
+import hashlib
+from datetime import date
+from typing import Dict, List
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+
+from services.app_services import AppServices, get_services
+from services.auth_service import get_current_user
+
+# El navegador guarda la respuesta pero la revalida siempre (y no la comparte)
+DATA_CACHE_CONTROL = "private, no-cache"
+
+def parse_if_none_match(header: str) -> List[str]:
+    """
+    Interpretar If-None-Match
+
+    Args:
+        header: Valor del header
+
+    Returns:
+        list: ETags sin el prefijo W/ (If-None-Match usa comparación débil)
+    """
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Indica si If-None-Match coincide con el ETag actual"""
+    if not if_none_match:
+        return False
+    tags = parse_if_none_match(if_none_match)
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def build_data_etag(user_id: str, version: int, request: Request) -> str:
+    """
+    ETag fuerte de una respuesta derivada de los datos del usuario
+
+    Args:
+        user_id: ID del usuario
+        version: Versión de datos del usuario
+        request: Petición (ruta y parámetros de consulta)
+
+    Returns:
+        str: ETag entre comillas
+    """
+    params = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    key = f"{user_id}|{version}|{request.url.path}|{params}|{date.today().isoformat()}"
+    return f'"{version}-{hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]}"'
+
+def conditional_headers(etag: str) -> Dict[str, str]:
+    """Headers de validación para respuestas con ETag de datos"""
+    return {"ETag": etag, "Cache-Control": DATA_CACHE_CONTROL}
+
+async def _check_data_etag(request: Request, response: Response, user_id: str, services: AppServices) -> str:
+    version = await services.versions.get_version(user_id)
+    etag = build_data_etag(user_id, version, request)
+    headers = conditional_headers(etag)
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return etag
+
+async def user_data_etag(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    services: AppServices = Depends(get_services)
+) -> str:
+    """
+    Dependencia para rutas autenticadas: 304 si los datos no cambiaron
+
+    Las rutas que devuelven un Response propio deben añadir
+    conditional_headers(etag) a ese Response.
+
+    Returns:
+        str: ETag de la respuesta
+
+    Raises:
+        HTTPException: 304 si If-None-Match coincide con el ETag actual
+    """
+    return await _check_data_etag(request, response, str(current_user["id"]), services)
+
+async def query_user_data_etag(
+    request: Request,
+    response: Response,
+    user_id: str = Query(..., description="ID del usuario"),
+    services: AppServices = Depends(get_services)
+) -> str:
+    """
+    Dependencia para rutas que identifican al usuario con ?user_id= (metas)
+
+    Returns:
+        str: ETag de la respuesta
+
+    Raises:
+        HTTPException: 304 si If-None-Match coincide con el ETag actual
+    """
+    return await _check_data_etag(request, response, user_id, services)
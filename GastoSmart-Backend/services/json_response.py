@@ -0,0 +1,30 @@
+"""
+Respuesta JSON serializada con orjson
+
+orjson serializa datetime, date, UUID y enums de forma nativa y es varias
+veces más rápido que el encoder estándar. Las rutas de listados devuelven
+esta respuesta directamente con diccionarios construidos desde MongoDB, lo
+que evita crear modelos Pydantic y validarlos de nuevo contra response_model.
+"""
+
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+def _default(value: Any) -> Any:
+    """Tipos que orjson no conoce: ObjectId y modelos Pydantic"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse que renderiza con orjson
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,292 @@
+"""
+Métricas del proceso en formato de texto de Prometheus
+
+Contadores, gauges e histogramas en memoria, calculados dentro del propio
+proceso (sin agente externo) y expuestos en /metrics. Se registran:
+
+- Peticiones HTTP por método, plantilla de ruta y estado (conteo y latencia)
+- Comandos de MongoDB por colección y comando, vía un CommandListener de pymongo
+- Espera para obtener una conexión del pool y conexiones/comandos en curso
+
+Los listeners de pymongo se ejecutan en los hilos del driver, por eso cada
+métrica protege su estado con un lock.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+# Límites de los buckets (segundos)
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric(ABC):
+    """Base común: nombre, ayuda, etiquetas y lock"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Líneas de muestras de la métrica en formato de texto"""
+
+class Counter(_Metric):
+    """Contador monótono por combinación de etiquetas"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.label_names:
+            # Sin etiquetas la serie existe desde el inicio (valor 0)
+            self._values[()] = 0
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in items]
+
+class Gauge(Counter):
+    """Valor que sube y baja (p. ej. elementos en curso)"""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    """Histograma acumulado con buckets fijos"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets: Tuple[float, ...] = HTTP_LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        lines = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.label_names, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {total!r}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas que se exponen juntas
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Generar el texto de exposición de Prometheus
+
+        Returns:
+            str: Todas las métricas en formato text/plain 0.0.4
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Registro compartido por toda la aplicación
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "gastosmart_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "gastosmart_http_request_duration_seconds", "Latencia de las peticiones HTTP",
+    ("method", "route", "status"), HTTP_LATENCY_BUCKETS
+))
+http_requests_in_flight = registry.register(Gauge(
+    "gastosmart_http_requests_in_flight", "Peticiones HTTP en curso"
+))
+mongo_command_duration = registry.register(Histogram(
+    "gastosmart_mongo_command_duration_seconds", "Latencia de los comandos de MongoDB",
+    ("collection", "command"), MONGO_LATENCY_BUCKETS
+))
+mongo_command_failures = registry.register(Counter(
+    "gastosmart_mongo_command_failures_total", "Comandos de MongoDB fallidos", ("collection", "command")
+))
+mongo_commands_in_flight = registry.register(Gauge(
+    "gastosmart_mongo_commands_in_flight", "Comandos de MongoDB en curso"
+))
+mongo_pool_checkout_wait = registry.register(Histogram(
+    "gastosmart_mongo_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool",
+    (), POOL_WAIT_BUCKETS
+))
+mongo_pool_checkout_failures = registry.register(Counter(
+    "gastosmart_mongo_pool_checkout_failures_total", "Intentos fallidos de obtener una conexión", ("reason",)
+))
+mongo_pool_checked_out = registry.register(Gauge(
+    "gastosmart_mongo_pool_connections_checked_out", "Conexiones del pool en uso"
+))
+mongo_pool_connections = registry.register(Gauge(
+    "gastosmart_mongo_pool_connections", "Conexiones abiertas en el pool"
+))
+
+def observe_request(method: str, route: str, status: int, duration_seconds: float) -> None:
+    """
+    Registrar una petición HTTP terminada
+
+    Args:
+        method: Método HTTP
+        route: Plantilla de la ruta (p. ej. /api/goals/{goal_id})
+        status: Código de estado
+        duration_seconds: Duración total
+    """
+    status_text = str(status)
+    http_requests_total.inc(method, route, status_text)
+    http_request_duration.observe(duration_seconds, method, route, status_text)
+
+# Comandos cuyo primer campo no es el nombre de la colección
+_DATABASE_COMMANDS = {"ping", "hello", "ismaster", "isMaster", "buildInfo", "endSessions", "saslStart", "saslContinue"}
+
+def _command_collection(event: monitoring.CommandStartedEvent) -> str:
+    """Colección a la que apunta un comando (o '-' si es de base de datos)"""
+    if event.command_name == "getMore":
+        return str(event.command.get("collection", "-"))
+    if event.command_name in _DATABASE_COMMANDS:
+        return "-"
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else "-"
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Listener de pymongo que mide la latencia de cada comando
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+
+    def _key(self, event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self._lock:
+            self._pending[self._key(event)] = (_command_collection(event), event.command_name)
+        mongo_commands_in_flight.inc()
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            collection, command = self._pending.pop(self._key(event), ("-", event.command_name))
+        mongo_commands_in_flight.dec()
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, collection, command)
+        if failed:
+            mongo_command_failures.inc(collection, command)
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Listener de pymongo que mide la espera del pool y las conexiones en uso
+    """
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        mongo_pool_connections.inc()
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        mongo_pool_connections.dec()
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        mongo_pool_checkout_wait.observe(event.duration)
+        mongo_pool_checkout_failures.inc(str(event.reason))
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        mongo_pool_checkout_wait.observe(event.duration)
+        mongo_pool_checked_out.inc()
+
+    def connection_checked_in(self, event) -> None:
+        mongo_pool_checked_out.dec()
+
+def mongo_event_listeners() -> list:
+    """
+    Listeners a registrar en el cliente compartido de MongoDB
+
+    Returns:
+        list: Listener de comandos y listener del pool
+    """
+    return [MongoCommandMetrics(), MongoPoolMetrics()]
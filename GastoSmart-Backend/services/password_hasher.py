@@ -0,0 +1,140 @@
+"""
+Servicio de hash de contraseñas fuera del event loop
+
+bcrypt tarda del orden de 200 ms por operación con el costo por defecto.
+Ejecutarlo dentro de un handler async congela todas las demás peticiones,
+así que el hash y la verificación se envían a un pool de hilos dedicado
+(bcrypt libera el GIL mientras calcula). El tamaño del pool limita cuántas
+operaciones corren a la vez; las demás esperan en cola y ese tiempo de
+espera se mide.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+# Costo de bcrypt para hashes nuevos (los existentes conservan su costo)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Operaciones bcrypt simultáneas (por defecto, una por CPU)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+# Muestras de espera en cola conservadas para percentiles
+_WAIT_SAMPLES = 1000
+
+class PasswordHasher:
+    """
+    Hash y verificación de contraseñas en un pool de hilos acotado
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, rounds: int = BCRYPT_ROUNDS):
+        """
+        Inicializar el servicio
+
+        Args:
+            workers: Número máximo de operaciones bcrypt simultáneas
+            rounds: Costo de bcrypt para hashes nuevos
+        """
+        self.workers = max(1, workers)
+        self.rounds = rounds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+        self._operations = 0
+        self._pending = 0
+        self._max_wait = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecutar una función bcrypt en el pool registrando la espera en cola
+
+        Args:
+            func: Función bloqueante a ejecutar
+            *args: Argumentos de la función
+
+        Returns:
+            Any: Resultado de la función
+        """
+        submitted = time.perf_counter()
+
+        def timed():
+            wait = time.perf_counter() - submitted
+            self._waits.append(wait)
+            self._max_wait = max(self._max_wait, wait)
+            return func(*args)
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), timed)
+        finally:
+            self._pending -= 1
+            self._operations += 1
+
+    async def hash_password(self, password: str) -> str:
+        """
+        Encriptar contraseña usando bcrypt
+
+        Args:
+            password: Contraseña en texto plano
+
+        Returns:
+            str: Contraseña encriptada
+        """
+        hashed = await self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
+        """
+        Verificar contraseña
+
+        Args:
+            password: Contraseña en texto plano
+            hashed_password: Contraseña encriptada
+
+        Returns:
+            bool: True si la contraseña es correcta
+        """
+        return await self._run(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Métricas del pool: operaciones, pendientes y espera en cola
+
+        Returns:
+            dict: Métricas actuales (tiempos en milisegundos)
+        """
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000
+
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "operations": self._operations,
+            "pending": self._pending,
+            "queue_wait_p50_ms": percentile(0.50),
+            "queue_wait_p99_ms": percentile(0.99),
+            "queue_wait_max_ms": self._max_wait * 1000
+        }
+
+    def shutdown(self) -> None:
+        """Detener el pool de hilos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# Instancia compartida por toda la aplicación
+password_hasher = PasswordHasher()
@@ -0,0 +1,156 @@
+"""
+Procesamiento de fotos de perfil fuera del event loop
+
+Las fotos llegan como data URL o base64 y antes se guardaban tal cual en
+`user_settings`, así que cada carga del perfil leía cientos de KB. Ahora la
+imagen se decodifica, se recorta en cuadrado y se reduce a tamaños fijos
+(WebP) en un pool de hilos dedicado; las miniaturas se guardan en GridFS
+(ver ProfilePictureOperations) y el documento de ajustes solo conserva el
+hash del contenido.
+"""
+
+import io
+import os
+import re
+import base64
+import asyncio
+import hashlib
+import binascii
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+# Lados (en píxeles) de las miniaturas cuadradas que se generan
+PROFILE_PICTURE_SIZES: Tuple[int, ...] = tuple(sorted(
+    int(size) for size in os.getenv("PROFILE_PICTURE_SIZES", "64,256").split(",") if size.strip()
+))
+
+# Tamaño máximo de la imagen original ya decodificada
+PROFILE_PICTURE_MAX_BYTES = int(os.getenv("PROFILE_PICTURE_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Máximo de píxeles de la imagen original (evita imágenes comprimidas enormes)
+PROFILE_PICTURE_MAX_PIXELS = int(os.getenv("PROFILE_PICTURE_MAX_PIXELS", str(40_000_000)))
+
+# Miniaturas generadas a la vez
+PROFILE_PICTURE_WORKERS = int(os.getenv("PROFILE_PICTURE_WORKERS", "2"))
+
+THUMBNAIL_CONTENT_TYPE = "image/webp"
+THUMBNAIL_QUALITY = 85
+
+_DATA_URL = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+
+def is_external_url(value: str) -> bool:
+    """Indica si la foto es una URL externa (se guarda como referencia, sin procesar)"""
+    return value.startswith(("http://", "https://"))
+
+def decode_picture(value: str) -> bytes:
+    """
+    Decodificar una foto enviada como data URL o base64
+
+    Args:
+        value: Data URL (data:image/png;base64,...) o base64 sin prefijo
+
+    Returns:
+        bytes: Contenido de la imagen
+
+    Raises:
+        ValueError: Si no es base64 válido o supera el tamaño máximo
+    """
+    encoded = _DATA_URL.sub("", value.strip(), count=1)
+    if len(encoded) * 3 // 4 > PROFILE_PICTURE_MAX_BYTES:
+        raise ValueError("La foto de perfil supera el tamaño máximo permitido")
+    try:
+        return base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("La foto de perfil debe ser una URL o una imagen en base64")
+
+def content_hash(data: bytes) -> str:
+    """Hash del contenido original; identifica la foto y sus miniaturas"""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def render_thumbnails(data: bytes, sizes: Tuple[int, ...] = PROFILE_PICTURE_SIZES) -> Dict[int, bytes]:
+    """
+    Generar las miniaturas cuadradas de una imagen (bloqueante)
+
+    Args:
+        data: Imagen original
+        sizes: Lados de las miniaturas
+
+    Returns:
+        dict: Miniatura WebP por tamaño
+
+    Raises:
+        ValueError: Si el contenido no es una imagen válida
+    """
+    # Pillow solo se necesita al subir fotos
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if width * height > PROFILE_PICTURE_MAX_PIXELS:
+                raise ValueError("La foto de perfil tiene demasiados píxeles")
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValueError("El contenido de la foto de perfil no es una imagen válida")
+
+    # Recorte cuadrado centrado y reducción desde el tamaño mayor al menor
+    side = min(image.size)
+    left = (image.width - side) // 2
+    top = (image.height - side) // 2
+    image = image.crop((left, top, left + side, top + side))
+
+    thumbnails = {}
+    for size in sorted(sizes, reverse=True):
+        if image.width > size:
+            image = image.resize((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=THUMBNAIL_QUALITY, method=4)
+        thumbnails[size] = buffer.getvalue()
+    return thumbnails
+
+class ThumbnailRenderer:
+    """
+    Generación de miniaturas en un pool de hilos acotado
+    """
+
+    def __init__(self, workers: int = PROFILE_PICTURE_WORKERS):
+        """
+        Inicializar el servicio
+
+        Args:
+            workers: Número máximo de imágenes procesadas a la vez
+        """
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnails")
+        return self._executor
+
+    async def render(self, data: bytes, sizes: Tuple[int, ...] = PROFILE_PICTURE_SIZES) -> Dict[int, bytes]:
+        """
+        Generar las miniaturas de una imagen sin bloquear el event loop
+
+        Args:
+            data: Imagen original
+            sizes: Lados de las miniaturas
+
+        Returns:
+            dict: Miniatura WebP por tamaño
+
+        Raises:
+            ValueError: Si el contenido no es una imagen válida
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), render_thumbnails, data, sizes)
+
+    def shutdown(self) -> None:
+        """Detener el pool de hilos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# Instancia compartida por toda la aplicación
+thumbnail_renderer = ThumbnailRenderer()
@@ -0,0 +1,104 @@
+"""
+Caché de reportes financieros por usuario y versión de datos
+
+Los reportes se guardan con la clave (user_id, tipo, parámetros, versión).
+Cada escritura de transacciones o metas incrementa la versión del usuario
+(ver DataVersionOperations), así que una entrada nunca se sirve después de
+que cambien los datos que la generaron.
+"""
+
+import os
+from datetime import date
+from typing import Any, Awaitable, Callable, Hashable
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from database.report_operations import ReportOperations
+from database.data_version_operations import DataVersionOperations
+from services.cache import TTLCache
+
+# Configuración de la caché (por proceso)
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "1000"))
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "300"))
+
+report_cache = TTLCache(REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL_SECONDS)
+
+class CachedReportOperations:
+    """
+    Capa de caché delante de ReportOperations
+
+    Los generadores de reportes pasan por la caché; el resto de métodos
+    (guardar, listar, buscar, eliminar) se delegan sin cambios.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        """
+        Inicializar la capa de caché
+
+        Args:
+            db: Base de datos MongoDB
+        """
+        self.report_ops = ReportOperations(db)
+        self.versions = DataVersionOperations(db.data_versions)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.report_ops, name)
+
+    async def _cached(self, user_id: str, report_type: str, params: Hashable, builder: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Obtener un reporte de la caché o generarlo
+
+        Args:
+            user_id: ID del usuario
+            report_type: Nombre del reporte
+            params: Parámetros que determinan el reporte
+            builder: Función que genera el reporte si no está en caché
+
+        Returns:
+            Any: Reporte generado o almacenado
+        """
+        version = await self.versions.get_version(user_id)
+        key = (user_id, report_type, params, version)
+
+        report = report_cache.get(key)
+        if report is None:
+            report = await builder()
+            report_cache.set(key, report)
+        return report
+
+    async def generate_monthly_summary(self, user_id: str, year: int, month: int):
+        return await self._cached(
+            user_id, "monthly_summary", (year, month),
+            lambda: self.report_ops.generate_monthly_summary(user_id, year, month)
+        )
+
+    async def generate_expense_category_report(self, user_id: str, start_date: date, end_date: date):
+        return await self._cached(
+            user_id, "expense_category", (start_date, end_date),
+            lambda: self.report_ops.generate_expense_category_report(user_id, start_date, end_date)
+        )
+
+    async def generate_daily_expenses_report(self, user_id: str, week_start: date):
+        return await self._cached(
+            user_id, "daily_expenses", (week_start,),
+            lambda: self.report_ops.generate_daily_expenses_report(user_id, week_start)
+        )
+
+    # Los reportes de tendencia dependen de la fecha actual: se incluye en la clave
+    async def generate_income_trend_report(self, user_id: str, months: int = 8):
+        return await self._cached(
+            user_id, "income_trend", (months, date.today()),
+            lambda: self.report_ops.generate_income_trend_report(user_id, months)
+        )
+
+    async def generate_savings_evolution_report(self, user_id: str, months: int = 8):
+        return await self._cached(
+            user_id, "savings_evolution", (months, date.today()),
+            lambda: self.report_ops.generate_savings_evolution_report(user_id, months)
+        )
+
+    async def generate_comprehensive_report(self, user_id: str, year: int, month: int, week_start: date, months: int = 8):
+        return await self._cached(
+            user_id, "comprehensive", (year, month, week_start, months, date.today()),
+            lambda: self.report_ops.generate_comprehensive_report(user_id, year, month, week_start, months)
+        )
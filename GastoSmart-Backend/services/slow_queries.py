@@ -0,0 +1,413 @@
+"""
+Registro de consultas lentas con captura automática de explain
+
+Un CommandListener de pymongo detecta los comandos find/aggregate/count de
+las colecciones de la aplicación que superan un umbral. Cada uno se agrupa
+por su forma (colección, comando y filtro con los valores reemplazados por
+"?"), se registra en el log y, como máximo una vez por forma e intervalo, se
+ejecuta explain("executionStats") en segundo plano sobre el event loop.
+
+Del plan solo se conservan etapas, índices y contadores de ejecución, de
+modo que ningún valor de los documentos queda almacenado. Se consulta desde
+/api/admin/slow-queries sin activar el profiler de MongoDB.
+
+La redacción de filtros se comprueba con: python -m doctest services/slow_queries.py
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Configuración por variables de entorno
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "600"))
+SLOW_QUERY_MAX_SHAPES = int(os.getenv("SLOW_QUERY_MAX_SHAPES", "500"))
+SLOW_QUERY_RECENT = int(os.getenv("SLOW_QUERY_RECENT", "200"))
+
+# Comandos de lectura vigilados
+WATCHED_COMMANDS = {"find", "aggregate", "count"}
+
+# Colecciones vigiladas y clases de operaciones que las consultan
+COLLECTION_SOURCES = {
+    "transactions": ["TransactionOperations", "ReportOperations"],
+    "monthly_rollups": ["ReportOperations"],
+    "goals": ["GoalOperations"],
+    "users": ["UserOperations"],
+    "verification_codes": ["EmailService"],
+}
+
+# Campos del comando que no forman parte de la consulta (sesión, clúster, lectura)
+_COMMAND_METADATA = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+# Claves cuyo contenido es estructura definida en el código, no datos
+_STRUCTURAL_KEYS = {"sort", "projection", "$sort", "$project", "cursor"}
+
+# Etapas y operadores cuyo contenido son expresiones de agregación: solo ahí
+# un texto que empieza con "$" es una referencia a un campo ("$amount")
+_EXPRESSION_KEYS = {"$expr", "$group", "$addFields", "$set", "$bucket", "$bucketAuto", "$replaceRoot", "$replaceWith"}
+
+# Operadores cuyos operandos son datos aunque empiecen con "$" (se redactan siempre)
+_DATA_OPERATORS = {
+    "$literal", "$search", "$eq", "$ne", "$gt", "$gte", "$lt", "$lte",
+    "$in", "$nin", "$all", "$regex", "$options", "$regexMatch",
+}
+
+def _redact_all(value: Any) -> Any:
+    """Redactar todos los valores, incluidos los que empiezan con '$'"""
+    if isinstance(value, dict):
+        return {key: _redact_all(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and not any(isinstance(item, (dict, list, tuple)) for item in value):
+            return ["?"]
+        return [_redact_all(item) for item in value]
+    return "?"
+
+def _redact_literals(value: Any) -> Any:
+    """Conservar una estructura del código pero redactar sus operandos $literal"""
+    if isinstance(value, dict):
+        return {
+            key: (_redact_all(item) if key == "$literal" else _redact_literals(item))
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_redact_literals(item) for item in value]
+    return value
+
+def redact(value: Any, expression: bool = False) -> Any:
+    """
+    Reemplazar los valores de un filtro por "?" conservando claves y operadores
+
+    En los filtros (lenguaje de consulta) todo valor es un dato, aunque empiece
+    con "$". Solo dentro de expresiones de agregación se conservan las
+    referencias a campos, y nunca bajo $literal, $search o los operadores de
+    comparación.
+
+    >>> redact({"$text": {"$search": "$x"}})["$text"]["$search"]
+    '?'
+    >>> redact({"category": "$50.000"})
+    {'category': '?'}
+    >>> redact([{"$group": {"_id": "$category", "total": {"$sum": "$amount"}}}])
+    [{'$group': {'_id': '$category', 'total': {'$sum': '$amount'}}}]
+
+    Args:
+        value: Filtro, pipeline o valor a redactar
+        expression: True dentro de una expresión de agregación
+
+    Returns:
+        Any: Estructura con la misma forma y sin valores
+    """
+    if isinstance(value, dict):
+        redacted = {}
+        for key, item in value.items():
+            if key in _STRUCTURAL_KEYS:
+                redacted[key] = _redact_literals(item)
+            elif key in _DATA_OPERATORS:
+                redacted[key] = _redact_all(item)
+            else:
+                redacted[key] = redact(item, expression or key in _EXPRESSION_KEYS)
+        return redacted
+    if isinstance(value, (list, tuple)):
+        # Listas de valores ($in, $nin) se reducen a un solo marcador
+        if value and not expression and not any(isinstance(item, (dict, list, tuple)) for item in value):
+            return ["?"]
+        return [redact(item, expression) for item in value]
+    if expression and isinstance(value, str) and value.startswith("$"):
+        # Referencias a campos ("$amount") y variables ("$$NOW") son parte de la forma
+        return value
+    return "?"
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Forma redactada de un comando de lectura
+
+    Args:
+        command_name: find, aggregate o count
+        command: Documento del comando enviado al servidor
+
+    Returns:
+        dict: Filtro/pipeline redactado más orden y proyección
+    """
+    if command_name == "aggregate":
+        return {"pipeline": redact(command.get("pipeline", []))}
+    shape = {"filter": redact(command.get("filter", command.get("query", {})))}
+    for key in ("sort", "projection"):
+        if command.get(key):
+            shape[key] = command[key]
+    return shape
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extraer del resultado de explain solo el plan y los contadores
+
+    Args:
+        explain: Respuesta de explain("executionStats")
+
+    Returns:
+        dict: Etapas del plan ganador, índices usados y estadísticas de ejecución
+    """
+    def walk(plan, stages, indexes):
+        if not isinstance(plan, dict):
+            return
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if plan.get("indexName"):
+            indexes.append(plan["indexName"])
+        for key in ("inputStage", "queryPlan"):
+            walk(plan.get(key), stages, indexes)
+        for child in plan.get("inputStages", []):
+            walk(child, stages, indexes)
+
+    # En aggregate el plan de la consulta inicial está en la primera etapa ($cursor)
+    planner = explain.get("queryPlanner")
+    execution = explain.get("executionStats")
+    if planner is None:
+        for stage in explain.get("stages", []):
+            cursor = stage.get("$cursor") if isinstance(stage, dict) else None
+            if cursor:
+                planner = cursor.get("queryPlanner")
+                execution = cursor.get("executionStats")
+                break
+
+    stages: List[str] = []
+    indexes: List[str] = []
+    walk((planner or {}).get("winningPlan"), stages, indexes)
+    execution = execution or {}
+    return {
+        "winning_plan": stages,
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages,
+        "n_returned": execution.get("nReturned"),
+        "total_keys_examined": execution.get("totalKeysExamined"),
+        "total_docs_examined": execution.get("totalDocsExamined"),
+        "execution_time_ms": execution.get("executionTimeMillis"),
+    }
+
+def _explainable(command_name: str, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Copia del comando apta para explain (None si no se puede explicar)"""
+    if command_name == "aggregate" and any(
+        isinstance(stage, dict) and ("$out" in stage or "$merge" in stage)
+        for stage in command.get("pipeline", [])
+    ):
+        # explain con executionStats no admite etapas de escritura
+        return None
+    return {
+        key: value for key, value in command.items()
+        if not key.startswith("$") and key not in _COMMAND_METADATA
+    }
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """
+    Listener que agrupa las consultas lentas por forma y captura su plan
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+        max_shapes: int = SLOW_QUERY_MAX_SHAPES,
+        recent: int = SLOW_QUERY_RECENT
+    ):
+        """
+        Inicializar el registro
+
+        Args:
+            threshold_ms: Duración a partir de la cual una consulta es lenta
+            explain_interval: Segundos mínimos entre explain de una misma forma
+            max_shapes: Formas distintas que se conservan
+            recent: Consultas lentas individuales que se conservan
+        """
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, Tuple[str, str, Dict[str, Any]]] = {}
+        self._shapes: Dict[str, Dict[str, Any]] = {}
+        self._recent = deque(maxlen=recent)
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Indicar el cliente y el event loop con los que se ejecuta explain
+
+        Args:
+            client: Cliente asíncrono compartido de MongoDB
+            loop: Event loop de la aplicación
+        """
+        self._client = client
+        self._loop = loop
+
+    def detach(self) -> None:
+        """Dejar de ejecutar explain (al cerrar la conexión)"""
+        self._client = None
+        self._loop = None
+
+    # --- Eventos de pymongo (hilos del driver) ---
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in WATCHED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if collection not in COLLECTION_SOURCES:
+            return
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (event.database_name, collection, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event)
+
+    def _finish(self, event) -> None:
+        if event.command_name not in WATCHED_COMMANDS:
+            return
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            database, collection, command = pending
+            self.record(database, collection, event.command_name, command, duration_ms)
+
+    # --- Registro ---
+
+    def record(self, database: str, collection: str, command_name: str, command: Dict[str, Any], duration_ms: float) -> None:
+        """
+        Registrar una consulta lenta y programar su explain si corresponde
+
+        Args:
+            database: Base de datos del comando
+            collection: Colección consultada
+            command_name: find, aggregate o count
+            command: Documento del comando
+            duration_ms: Duración en milisegundos
+        """
+        shape = query_shape(command_name, command)
+        key = f"{collection}.{command_name}:{json.dumps(shape, sort_keys=True, default=str)}"
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # Descartar la forma vista hace más tiempo
+                    oldest = min(self._shapes, key=lambda k: self._shapes[k]["last_seen"])
+                    del self._shapes[oldest]
+                entry = self._shapes[key] = {
+                    "collection": collection,
+                    "command": command_name,
+                    "sources": COLLECTION_SOURCES.get(collection, []),
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "first_seen": datetime.now(),
+                    "last_seen": datetime.now(),
+                    "explain": None,
+                    "explained_at": None,
+                    "_explain_due": 0.0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = datetime.now()
+            self._recent.append({
+                "collection": collection,
+                "command": command_name,
+                "shape": shape,
+                "duration_ms": round(duration_ms, 2),
+                "at": datetime.now(),
+            })
+
+            explain_command = None
+            if now >= entry["_explain_due"] and self._loop is not None:
+                explain_command = _explainable(command_name, command)
+                if explain_command is not None:
+                    entry["_explain_due"] = now + self.explain_interval
+
+        logger.warning(f"Consulta lenta ({duration_ms:.0f} ms) {collection}.{command_name} {json.dumps(shape, default=str)}")
+
+        if explain_command is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._start_explain, key, database, explain_command)
+            except RuntimeError:
+                # El event loop ya se cerró
+                pass
+
+    def _start_explain(self, key: str, database: str, command: Dict[str, Any]) -> None:
+        """Crear la tarea de explain (se ejecuta en el event loop)"""
+        if self._client is not None:
+            asyncio.ensure_future(self._explain(key, database, command))
+
+    async def _explain(self, key: str, database: str, command: Dict[str, Any]) -> None:
+        """
+        Ejecutar explain("executionStats") y guardar el resumen en la forma
+
+        Args:
+            key: Clave de la forma
+            database: Base de datos del comando
+            command: Comando a explicar
+        """
+        try:
+            result = await self._client[database].command({"explain": command, "verbosity": "executionStats"})
+            summary = summarize_explain(result)
+        except Exception as e:
+            logger.error(f"Error al ejecutar explain de una consulta lenta: {e}")
+            summary = {"error": str(e)}
+
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is not None:
+                entry["explain"] = summary
+                entry["explained_at"] = datetime.now()
+
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        """
+        Formas lentas ordenadas por tiempo total y consultas lentas recientes
+
+        Args:
+            limit: Máximo de formas y de consultas recientes devueltas
+
+        Returns:
+            dict: Configuración, formas agregadas y consultas recientes
+        """
+        with self._lock:
+            shapes = [
+                {k: v for k, v in entry.items() if not k.startswith("_")}
+                for entry in self._shapes.values()
+            ]
+            recent = list(self._recent)[-limit:]
+
+        for entry in shapes:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 2)
+            entry["total_ms"] = round(entry["total_ms"], 2)
+            entry["max_ms"] = round(entry["max_ms"], 2)
+        shapes.sort(key=lambda entry: entry["total_ms"], reverse=True)
+
+        return {
+            "threshold_ms": self.threshold_ms,
+            "explain_interval_seconds": self.explain_interval,
+            "shapes": shapes[:limit],
+            "recent": list(reversed(recent)),
+        }
+
+    def clear(self) -> None:
+        """Olvidar todas las formas y consultas registradas"""
+        with self._lock:
+            self._shapes.clear()
+            self._recent.clear()
+
+# Instancia compartida por toda la aplicación
+slow_query_recorder = SlowQueryRecorder()
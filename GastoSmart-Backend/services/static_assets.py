@@ -0,0 +1,232 @@
+"""
+Índice en memoria del frontend compilado (Front-end/dist)
+
+Al iniciar la aplicación se recorre el directorio una sola vez: cada archivo
+queda en memoria junto con sus variantes gzip y brotli (precomprimidas con
+el nivel máximo) y un hash del contenido que se usa como ETag. Las peticiones
+ya no tocan el sistema de archivos: se elige la variante según
+Accept-Encoding, se responde 304 a If-None-Match y los archivos con hash en
+el nombre (assets/index-CjYF2Kyp.js) se marcan como inmutables.
+
+brotli es opcional: si no está instalado solo se generan variantes gzip.
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from services.etag import etag_matches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Directorio del build de Vite (relativo a GastoSmart-Backend)
+FRONTEND_DIST_DIR = os.getenv("FRONTEND_DIST_DIR", "../Front-end/dist")
+
+# Solo se precomprimen archivos de texto a partir de este tamaño
+STATIC_COMPRESS_MIN_BYTES = int(os.getenv("STATIC_COMPRESS_MIN_BYTES", "1024"))
+
+# Vite añade un hash de 8 caracteres al nombre de los archivos de assets/
+_HASHED_NAME = re.compile(r"[-.][A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+
+_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Codificaciones en orden de preferencia
+_ENCODINGS = ("br", "gzip")
+
+class StaticAsset:
+    """
+    Archivo del frontend con sus variantes comprimidas
+    """
+
+    __slots__ = ("path", "media_type", "cache_control", "etag", "variants")
+
+    def __init__(self, path: str, data: bytes, media_type: str, immutable: bool):
+        """
+        Crear el archivo y sus variantes
+
+        Args:
+            path: Ruta relativa al directorio dist (p. ej. assets/index.js)
+            data: Contenido del archivo
+            media_type: Tipo MIME
+            immutable: Si el nombre lleva hash de contenido
+        """
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+        # Codificación -> contenido ("identity" siempre presente)
+        self.variants: Dict[str, bytes] = {"identity": data}
+
+    def add_variant(self, encoding: str, data: bytes) -> None:
+        """Guardar una variante comprimida si realmente ahorra bytes"""
+        if len(data) < len(self.variants["identity"]):
+            self.variants[encoding] = data
+
+    def variant_etag(self, encoding: str) -> str:
+        """ETag fuerte de una variante (cada codificación tiene bytes distintos)"""
+        if encoding == "identity":
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+    def choose_encoding(self, accept_encoding: str) -> str:
+        """
+        Elegir la mejor variante según Accept-Encoding
+
+        Args:
+            accept_encoding: Header Accept-Encoding de la petición
+
+        Returns:
+            str: Codificación elegida ("br", "gzip" o "identity")
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in _ENCODINGS:
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return "identity"
+
+    def response(self, request: Request) -> Response:
+        """
+        Respuesta para una petición (304 si el cliente ya tiene la variante)
+
+        Args:
+            request: Petición HTTP
+
+        Returns:
+            Response: Contenido completo o 304 Not Modified
+        """
+        encoding = self.choose_encoding(request.headers.get("accept-encoding", ""))
+        etag = self.variant_etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Interpretar Accept-Encoding
+
+    Args:
+        header: Valor del header (p. ej. "gzip, br;q=0.8")
+
+    Returns:
+        dict: Calidad (q) por codificación, en minúsculas
+    """
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    return accepted
+
+def _media_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    media_type = media_type or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+def _load_asset(root: str, path: str) -> StaticAsset:
+    full_path = os.path.join(root, path)
+    with open(full_path, "rb") as f:
+        data = f.read()
+
+    media_type = _media_type(path)
+    immutable = path.startswith("assets/") and bool(_HASHED_NAME.search(path))
+    asset = StaticAsset(path, data, media_type, immutable)
+
+    if len(data) >= STATIC_COMPRESS_MIN_BYTES and media_type.startswith(_COMPRESSIBLE_TYPES):
+        # Variantes generadas por el build (vite-plugin-compression) o calculadas aquí
+        for encoding, extension, compress in (
+            ("gzip", ".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)),
+            ("br", ".br", (lambda raw: brotli.compress(raw, quality=11)) if brotli else None),
+        ):
+            if os.path.exists(full_path + extension):
+                with open(full_path + extension, "rb") as f:
+                    asset.add_variant(encoding, f.read())
+            elif compress is not None:
+                asset.add_variant(encoding, compress(data))
+    return asset
+
+class StaticAssetIndex:
+    """
+    Manifiesto en memoria del directorio dist
+    """
+
+    def __init__(self, root: str = FRONTEND_DIST_DIR):
+        """
+        Inicializar el índice (vacío hasta llamar a load)
+
+        Args:
+            root: Directorio del build del frontend
+        """
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self) -> Tuple[int, int]:
+        """
+        Leer y precomprimir todos los archivos del build (bloqueante)
+
+        Returns:
+            tuple: (número de archivos, bytes sin comprimir)
+        """
+        assets = {}
+        if os.path.isdir(self.root):
+            for directory, _, files in os.walk(self.root):
+                for name in files:
+                    if name.endswith((".gz", ".br")):
+                        continue
+                    path = os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+                    assets[path] = _load_asset(self.root, path)
+        self.assets = assets
+
+        total_bytes = sum(len(asset.variants["identity"]) for asset in assets.values())
+        if assets:
+            logger.info(f"Frontend cargado en memoria: {len(assets)} archivos, {total_bytes} bytes")
+        return len(assets), total_bytes
+
+    @property
+    def index(self) -> Optional[StaticAsset]:
+        """index.html del SPA (None en desarrollo, sin build)"""
+        return self.assets.get("index.html")
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        """
+        Buscar un archivo del build
+
+        Args:
+            path: Ruta relativa solicitada
+
+        Returns:
+            StaticAsset o None si no existe
+        """
+        return self.assets.get(path.lstrip("/"))
+
+# Instancia compartida por toda la aplicación
+static_assets = StaticAssetIndex()
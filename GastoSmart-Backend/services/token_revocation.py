@@ -0,0 +1,141 @@
+"""
+Lista de revocación de tokens JWT
+
+Los tokens revocados (logout) y los usuarios desactivados se guardan en la
+colección `revoked_tokens`, cuyos documentos expiran solos (índice TTL sobre
+expires_at) cuando el token ya no podría usarse de todas formas. Cada
+proceso mantiene una copia en memoria que se refresca periódicamente, de
+modo que validar un token no requiere consultar MongoDB.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre recargas de la lista desde MongoDB
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
+class TokenRevocationList:
+    """
+    Copia en memoria de los tokens y usuarios revocados
+    """
+
+    def __init__(self):
+        self._jtis = set()
+        self._users: Dict[str, float] = {}
+        # Revocaciones de este proceso que la próxima recarga aún debe confirmar
+        self._local_jtis = set()
+        self._local_users: Dict[str, float] = {}
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        """
+        Verificar si un token decodificado está revocado
+
+        Args:
+            payload: Claims del token
+
+        Returns:
+            bool: True si el token fue revocado o su usuario fue desactivado después de emitirlo
+        """
+        if payload.get("jti") in self._jtis:
+            return True
+        # Ambos con fracción de segundo: un token emitido tras reactivar la
+        # cuenta en el mismo segundo de la desactivación sigue siendo válido
+        revoked_at = self._users.get(payload.get("sub"))
+        return revoked_at is not None and payload.get("iat", 0) < revoked_at
+
+    async def revoke_token(self, db: AsyncIOMotorDatabase, jti: str, expires_at: datetime) -> None:
+        """
+        Revocar un token concreto (logout)
+
+        Args:
+            db: Base de datos MongoDB
+            jti: Identificador único del token
+            expires_at: Expiración del token (UTC); el registro se borra después
+        """
+        self._jtis.add(jti)
+        await db.revoked_tokens.update_one(
+            {"jti": jti},
+            {"$set": {"jti": jti, "expires_at": expires_at}},
+            upsert=True
+        )
+        # Volver a marcar por si una recarga reemplazó el conjunto durante la escritura
+        self._jtis.add(jti)
+        self._local_jtis.add(jti)
+
+    async def revoke_user(self, db: AsyncIOMotorDatabase, user_id: str, token_lifetime: timedelta) -> None:
+        """
+        Revocar todos los tokens emitidos hasta ahora para un usuario
+
+        Args:
+            db: Base de datos MongoDB
+            user_id: ID del usuario
+            token_lifetime: Vida máxima de un token (el registro dura lo mismo)
+        """
+        now = datetime.utcnow()
+        revoked_at = (now - datetime(1970, 1, 1)).total_seconds()
+        self._users[user_id] = revoked_at
+        await db.revoked_tokens.update_one(
+            {"user_id": user_id},
+            {"$set": {"user_id": user_id, "revoked_at": revoked_at, "expires_at": now + token_lifetime}},
+            upsert=True
+        )
+        self._users[user_id] = revoked_at
+        self._local_users[user_id] = revoked_at
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Recargar la lista desde MongoDB
+
+        Args:
+            db: Base de datos MongoDB
+        """
+        # Lo escrito antes de esta lectura ya está en MongoDB
+        confirmed_jtis = set(self._local_jtis)
+        confirmed_users = dict(self._local_users)
+
+        jtis = set()
+        users = {}
+        cursor = db.revoked_tokens.find(
+            {"expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "jti": 1, "user_id": 1, "revoked_at": 1}
+        )
+        async for doc in cursor:
+            if doc.get("jti"):
+                jtis.add(doc["jti"])
+            if doc.get("user_id"):
+                users[doc["user_id"]] = doc["revoked_at"]
+
+        self._local_jtis -= confirmed_jtis
+        for user_id in confirmed_users:
+            if self._local_users.get(user_id) == confirmed_users[user_id]:
+                del self._local_users[user_id]
+
+        # Conservar revocaciones locales escritas durante la lectura
+        self._jtis = jtis | self._local_jtis
+        self._users = {**users, **self._local_users}
+
+    async def run_refresh_loop(self, db: AsyncIOMotorDatabase, interval: Optional[float] = None) -> None:
+        """
+        Recargar la lista periódicamente (tarea de fondo del lifespan)
+
+        Args:
+            db: Base de datos MongoDB
+            interval: Segundos entre recargas
+        """
+        interval = interval or REVOCATION_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                logger.error(f"Error al recargar la lista de revocación: {e}")
+
+# Instancia compartida por toda la aplicación
+revocation_list = TokenRevocationList()
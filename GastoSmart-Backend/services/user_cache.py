@@ -0,0 +1,125 @@
+"""
+Caché de documentos de usuario
+
+get_current_user, los ajustes de usuario y los endpoints de presupuesto leen
+el mismo documento de `users`, a veces varias veces en una petición. Esta
+caché los sirve desde memoria con límite de entradas y TTL. Las lecturas
+concurrentes de un usuario que no está en caché comparten una sola consulta
+(single-flight), y cada escritura sobre `users` invalida la entrada.
+
+La invalidación es por proceso: con varios workers, el TTL acota cuánto
+puede tardar otro proceso en ver un cambio.
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from services.cache import TTLCache
+
+# Configuración de la caché (por proceso)
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# La caché nunca guarda la contraseña ni el estado de bloqueo (solo los usa el login)
+CACHED_USER_PROJECTION = {"password": 0, "failed_login_attempts": 0, "locked_until": 0}
+
+class UserCache:
+    """
+    Caché LRU+TTL de documentos de usuario con carga single-flight
+    """
+
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES, ttl_seconds: float = USER_CACHE_TTL_SECONDS):
+        """
+        Inicializar la caché
+
+        Args:
+            max_entries: Número máximo de usuarios en memoria
+            ttl_seconds: Segundos que un documento se considera válido
+        """
+        self._cache = TTLCache(max_entries, ttl_seconds)
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Se incrementa en cada invalidación; una carga iniciada antes no se guarda
+        self._invalidations = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    async def get(self, users_collection: AsyncIOMotorCollection, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtener el documento de un usuario (copia), consultando MongoDB si no está en caché
+
+        Args:
+            users_collection: Colección MongoDB de usuarios
+            user_id: ID del usuario
+
+        Returns:
+            dict: Copia del documento o None si no existe
+        """
+        doc = self._cache.get(user_id)
+        if doc is not None:
+            return dict(doc)
+
+        future = self._loading.get(user_id)
+        if future is not None:
+            # Ya hay una consulta en curso para este usuario: esperar su resultado
+            self.coalesced += 1
+            doc = await asyncio.shield(future)
+            return dict(doc) if doc else None
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        invalidations = self._invalidations
+        try:
+            self.loads += 1
+            doc = await users_collection.find_one({"_id": ObjectId(user_id)}, CACHED_USER_PROJECTION)
+            if doc is not None and invalidations == self._invalidations:
+                self._cache.set(user_id, doc)
+            future.set_result(doc)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Evitar el aviso si nadie más esperaba
+            raise
+        finally:
+            if self._loading.get(user_id) is future:
+                del self._loading[user_id]
+
+        return dict(doc) if doc else None
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Descartar el documento de un usuario tras una escritura
+
+        Args:
+            user_id: ID del usuario
+        """
+        self._invalidations += 1
+        self._cache.invalidate(user_id)
+        self._loading.pop(user_id, None)
+
+    def invalidate_email(self, email: str) -> None:
+        """
+        Descartar el documento de un usuario identificado por correo
+
+        Args:
+            email: Correo electrónico del usuario
+        """
+        self._invalidations += 1
+        for user_id, doc in self._cache.items():
+            if doc.get("email") == email:
+                self._cache.invalidate(user_id)
+                self._loading.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de la caché
+
+        Returns:
+            dict: Aciertos, fallos, consultas realizadas y compartidas
+        """
+        return {**self._cache.stats(), "loads": self.loads, "coalesced": self.coalesced}
+
+# Instancia compartida por toda la aplicación
+user_cache = UserCache()